@@ -0,0 +1,177 @@
+# 근사 최근접 이웃(ANN) 인덱스: HNSW / IVF-PQ
+# 증분 업데이트(삭제 포함)는 정확한 flat 인덱스(index.faiss)에서 하고,
+# 검색용 ANN 인덱스(index.<종류>.faiss)는 빌드 때 flat 인덱스의 벡터로 새로 만든다.
+# 만들 때마다 같은 폴더에 ann_report.json (recall@k, 쿼리 지연 시간, 빌드 시간, 크기)을 저장한다.
+# recall은 인덱스에 들어 있지 않은 질의로 측정한다.
+#   - query_vectors(색인하지 않은 실제 요청 사유의 임베딩)가 있으면 그 질의로 저장할 인덱스를 평가
+#   - 없으면 저장된 벡터 중 일부를 떼어 질의로 쓰고, 나머지 벡터만으로 같은 설정의 평가용 인덱스를 학습/생성해서 평가
+# 메모리 매핑 형식(mmap_store.py)의 store.json "index_file"이 ANN 인덱스를 가리키면 Lambda가 그 인덱스로 검색한다.
+
+import json
+import os
+import time
+
+import numpy as np
+
+INDEX_KINDS = ("flat", "hnsw", "ivfpq")
+DEFAULT_PARAMS = {
+    "flat": {},
+    "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 64},
+    "ivfpq": {"nlist": 100, "pq_m": 16, "nbits": 8, "nprobe": 8},
+}
+REPORT_FILE = "ann_report.json"
+IVFPQ_MIN_VECTORS = 1000
+
+
+def index_file_name(kind):
+    return f"index.{kind}.faiss"
+
+
+# 벡터 수/차원에 맞게 파라미터를 조정해서 인덱스 생성 -> (인덱스, 실제 사용한 파라미터)
+def build_index(vectors, kind, params=None):
+    import faiss
+
+    params = {**DEFAULT_PARAMS[kind], **(params or {})}
+    count, dim = vectors.shape
+    if kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+        index.add(vectors)
+        return index, params
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        index.add(vectors)
+        index.hnsw.efSearch = params["ef_search"]
+        return index, params
+
+    if kind == "ivfpq":
+        # 학습할 벡터가 너무 적으면(작은 파티션 등) 양자화 없이 flat 사용
+        if count < IVFPQ_MIN_VECTORS:
+            index, _ = build_index(vectors, "flat")
+            return index, {**params, "fallback": "flat"}
+        # faiss 권장: 클러스터당 학습 벡터 39개 이상, PQ 코드북은 2^nbits개 이상
+        nlist = max(1, min(params["nlist"], count // 39))
+        nbits = max(1, min(params["nbits"], int(np.log2(max(count // 39, 2)))))
+        pq_m = max(1, min(params["pq_m"], dim))
+        while dim % pq_m:  # 차원이 서브 양자화기 수로 나누어떨어져야 함
+            pq_m -= 1
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, nbits)
+        index.train(vectors)
+        index.add(vectors)
+        index.nprobe = min(params["nprobe"], nlist)
+        return index, {**params, "nlist": nlist, "nbits": nbits, "pq_m": pq_m, "nprobe": index.nprobe}
+
+    raise ValueError(f"지원하지 않는 인덱스 종류입니다: {kind} ({', '.join(INDEX_KINDS)})")
+
+
+def _search_one_by_one(index, queries, k):
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids[0])
+    return results, np.asarray(latencies) * 1000
+
+
+# 저장된 벡터 -> (인덱스에 넣을 벡터, 떼어 낸 질의 벡터), 질의는 최대 전체의 20%
+def holdout_split(vectors, queries=200, seed=42):
+    count = len(vectors)
+    size = min(queries, count // 5)
+    held_out = np.zeros(count, dtype=bool)
+    held_out[np.random.default_rng(seed).choice(count, size=size, replace=False)] = True
+    return vectors[~held_out], vectors[held_out]
+
+
+# index(base_vectors로 만든 인덱스)의 recall@k를 같은 벡터의 정확한 검색 결과와 비교
+# query_vectors는 base_vectors에 포함되지 않은 질의여야 함
+def evaluate(index, base_vectors, query_vectors, k=3):
+    import faiss
+
+    exact = faiss.IndexFlatL2(base_vectors.shape[1])
+    exact.add(base_vectors)
+
+    truth, exact_ms = _search_one_by_one(exact, query_vectors, k)
+    found, ann_ms = _search_one_by_one(index, query_vectors, k)
+
+    recalls = []
+    for truth_ids, found_ids in zip(truth, found):
+        truth_ids = [i for i in truth_ids if i != -1]
+        if truth_ids:
+            recalls.append(len(set(truth_ids) & set(found_ids)) / len(truth_ids))
+
+    return {
+        "k": k,
+        "queries": len(query_vectors),
+        "recall_at_k": round(float(np.mean(recalls)), 4) if recalls else None,
+        "latency_ms": {
+            "exact_mean": round(float(exact_ms.mean()), 4),
+            "ann_mean": round(float(ann_ms.mean()), 4),
+            "ann_p50": round(float(np.percentile(ann_ms, 50)), 4),
+            "ann_p99": round(float(np.percentile(ann_ms, 99)), 4),
+        },
+    }
+
+
+# 다른 종류의 ANN 인덱스/평가 결과 정리 (keep=None이면 모두 삭제)
+def remove_ann_files(store_path, keep=None):
+    for kind in INDEX_KINDS:
+        if kind != "flat" and kind != keep and os.path.exists(os.path.join(store_path, index_file_name(kind))):
+            os.remove(os.path.join(store_path, index_file_name(kind)))
+    if keep is None and os.path.exists(os.path.join(store_path, REPORT_FILE)):
+        os.remove(os.path.join(store_path, REPORT_FILE))
+
+
+# store_path의 flat 인덱스(index.faiss)로 ANN 인덱스를 만들고 평가 결과를 저장
+# query_vectors: 색인하지 않은 실제 질의 임베딩 (없으면 저장된 벡터 일부를 떼어 내서 평가)
+def build_ann(store_path, kind, params=None, k=3, queries=200, query_vectors=None):
+    import faiss
+
+    remove_ann_files(store_path, keep=kind)
+    flat = faiss.read_index(os.path.join(store_path, "index.faiss"))
+    if flat.ntotal == 0:
+        print(f"{store_path}: 벡터가 없어 ANN 인덱스를 만들지 않습니다.")
+        return None
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+
+    start = time.perf_counter()
+    index, used_params = build_index(vectors, kind, params)
+    build_seconds = time.perf_counter() - start
+
+    index_path = os.path.join(store_path, index_file_name(kind))
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+
+    if query_vectors is not None and len(query_vectors):
+        evaluation = {"query_source": "external", **evaluate(index, vectors, np.asarray(query_vectors, dtype=np.float32), k)}
+    else:
+        base_vectors, held_out = holdout_split(vectors, queries)
+        if len(held_out):
+            eval_index, _ = build_index(base_vectors, kind, params)
+            evaluation = {"query_source": "held_out", **evaluate(eval_index, base_vectors, held_out, k)}
+        else:
+            evaluation = {"query_source": None, "k": k, "queries": 0, "recall_at_k": None}
+
+    report = {
+        "kind": kind,
+        "params": used_params,
+        "count": int(flat.ntotal),
+        "dim": int(flat.d),
+        "build_seconds": round(build_seconds, 4),
+        "index_bytes": os.path.getsize(index_path),
+        "flat_index_bytes": os.path.getsize(os.path.join(store_path, "index.faiss")),
+        **evaluation,
+    }
+    with open(os.path.join(store_path, REPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if "latency_ms" in report:
+        print(
+            f"{store_path}: {kind} recall@{k}={report['recall_at_k']} ({report['query_source']} 질의 {report['queries']}개), "
+            f"지연 {report['latency_ms']['ann_mean']}ms (flat {report['latency_ms']['exact_mean']}ms)"
+        )
+    else:
+        print(f"{store_path}: {kind} 인덱스 생성 (벡터가 적어 recall 평가 생략)")
+    return report
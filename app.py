@@ -1,65 +1,74 @@
 # 서버용 api 버전
 
-from flask import Flask, request, render_template
+from flask import Flask, Response, request, render_template, jsonify, send_file, stream_with_context
+import json
+import re
 import openai
 import os
 from dotenv import load_dotenv
-import pandas as pd
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decision_cache import DecisionCache, make_key, make_version
+from decision_log import DecisionLog
+from rule_engine import get_rule_engine
+from cascade import TierStats, load_cascade
+from prompt_registry import CHAT_SYSTEM_PROMPT, chat_registry, count_tokens
+from metrics import CACHE_RESULTS, CONTENT_TYPE, StageTimer, render as render_metrics, timed
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-app = Flask(__name__)
+app = Flask(__name__, template_folder="template")
 fine_tuned_model = 'ft:gpt-3.5-turbo-1106:auton::AnKA31K3'
 
-def request_decision(request_type, request_reason):
-    messages = [
-        {"role": "system", "content": "당신은 직원 요청 승인 시스템으로, 요청 정보를 바탕으로 승인, 거절, 보류 중 하나를 판단합니다. 또한, 거절할 시 거절사유도 함께 설명해주어야 합니다."},
+# /decide/batch 동시 모델 호출 수 및 요청당 최대 항목 수
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+# 규칙으로 판단 가능한 요청은 모델 호출 없이 처리 (chat 프롬프트 기준: 회의는 참석자도 필요)
+rule_engine = get_rule_engine(prompt_kind="chat")
+
+# 요청 종류에 해당하는 카테고리 규칙만 담은 프롬프트
+prompts = chat_registry(rule_engine)
+
+# 판단 결과 캐시 (모델 id + 프롬프트가 바뀌면 버전이 달라져 기존 결과는 무효화)
+decision_cache = DecisionCache(
+    os.getenv("DECISION_CACHE_PATH", "./cache/decision_cache.sqlite3"),
+    version=make_version(fine_tuned_model, CHAT_SYSTEM_PROMPT, prompts.fingerprint()),
+    max_entries=int(os.getenv("DECISION_CACHE_MAX_ENTRIES", "10000")),
+    ttl=int(os.getenv("DECISION_CACHE_TTL", str(7 * 24 * 3600))),
+)
+
+# 로컬 분류기가 확신하는 승인 건은 모델 호출 없이 처리 (CASCADE_ENABLED=0 이면 사용 안 함)
+cascade = None
+if os.getenv("CASCADE_ENABLED", "1") != "0":
+    cascade = load_cascade(
+        rule_engine,
+        os.getenv("CASCADE_MODEL_PATH", "random_forest_model.pkl"),
+        os.getenv("CASCADE_VECTORIZER_PATH", "tfidf_vectorizer.pkl"),
+        poll_interval=float(os.getenv("MODEL_POLL_INTERVAL", "5")),
+    )
+
+# 단계별(rule / cache / classifier / llm) 처리 건수
+tier_stats = TierStats()
+
+# 판단 결과 로그 (append-only, 엑셀은 /log/export 또는 주기적 내보내기로 생성)
+# 로그가 비어 있으면 기존 user_requests.xlsx 기록을 먼저 가져온 뒤 같은 파일로 내보냄
+decision_log = DecisionLog(
+    os.getenv("DECISION_LOG_PATH", "./logs/decisions.sqlite3"),
+    export_path=os.getenv("DECISION_LOG_EXPORT_PATH", "user_requests.xlsx"),
+    export_interval=int(os.getenv("DECISION_LOG_EXPORT_INTERVAL", "0")),
+)
+
+def build_messages(request_type, request_reason):
+    _, rules_prompt = prompts.select(request_type)
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT},
         {
             "role": "user",
             "content": (
-                "다음 요청 정보를 바탕으로 승인, 거절, 보류 중 하나를 판단하세요.\n"
-                "### 승인/거절/보류 조건:\n"
-                "#### 1. (업무) 회의 (휴게 X):\n"
-                "- **승인**: 요청 사유에 **회의 내용**, **회의 장소**, **참석자**가 모두 명확히 포함되어 있을 경우.\n"
-                "- **거절**: 회의 내용, 장소, 참석자 중 하나라도 누락되거나 불명확할 경우.\n"
-                "- **보류**: 요청 정보가 명백히 불충분하여 승인 또는 거절 여부를 판단할 수 없는 경우(예: 요청 사유가 단어 하나로만 이루어진 경우).\n"
-                "- **예시**:\n"
-                "  - 승인: '화장실 고도화 미팅, 우드룸, 이승재'\n"
-                "  - 승인: '흡연 방지 회의, 5층, 이승재'\n"
-                "  - 거절: '회의 참석'\n"
-                "  - 보류: '회의'\n\n"
-                "#### 2. (비업무) 개인시간 (휴게 O):\n"
-                "- **승인**: 요청 사유가 **흡연**, **화장실** 등 명확한 개인적 이유일 경우.\n"
-                "- **거절**: 개인시간으로 보기 어려운 업무적 사유일 경우.\n"
-                "- **보류**: 요청 사유가 애매하거나 개인적 이유인지 명확하지 않을 경우.\n"
-                "- **예시**:\n"
-                "  - 승인: '흡연'\n"
-                "  - 승인: '화장실'\n"
-                "  - 거절: '문서 검토'\n"
-                "  - 보류: '시간 필요'\n\n"
-                "#### 3. (업무) 기타업무 (휴게 X):\n"
-                "- **승인**: 요청 사유가 구체적이고 명확히 설명된 경우.\n"
-                "- **거절**: 요청 사유가 구체적이지 않거나 설명이 부족할 경우.\n"
-                "- **보류**: 요청 사유가 매우 짧거나 모호하여 추가 정보가 없으면 판단이 불가능한 경우.\n"
-                "- **예시**:\n"
-                "  - 승인: '거래처 자료 전달 업무'\n"
-                "  - 거절: '업무 요청'\n"
-                "  - 보류: '업무 관련 요청'\n\n"
-                "#### 4. (업무) 출장/이동/외근 (휴게 X):\n"
-                "- **승인**: 요청 사유에 **출장/외근 장소**와 **내용**이 모두 명시되어 있고, 외근 신청서 문서번호가 'AUTON'으로 시작하며 연속된 숫자가 포함되어 있을 경우.\n"
-                "- **거절**: 장소와 내용 중 하나라도 명시되지 않거나 문서번호 형식이 맞지 않을 경우.\n"
-                "- **보류**: 요청 정보가 불충분하여 승인 또는 거절을 판단하기 명백히 어려운 경우.\n"
-                "- **예시**:\n"
-                "  - 승인: 'AUTON20240101, 서울 본사 미팅'\n"
-                "  - 거절: '출장 요청'\n"
-                "  - 보류: '서울 출장'\n\n"
-                "### 보류 기준:\n"
-                "1. 보류는 극히 제한적인 경우에만 사용합니다.\n"
-                "2. 보류는 요청 정보가 **명백히 불충분**하거나, 승인/거절을 명확히 판단할 수 없는 경우에만 선택하세요.\n"
-                "3. 승인과 거절 중 하나로 판단 가능한 경우에는 보류를 사용하지 마세요.\n\n"
-                f"요청 종류: `{request_type}`\n"
+                rules_prompt
+                + f"요청 종류: `{request_type}`\n"
                 f"요청 사유: `{request_reason}`\n\n"
                 "결정을 다음 중 하나로 작성하세요: '승인', '거절', '보류'.\n\n"
                 "결정:"
@@ -67,38 +76,179 @@ def request_decision(request_type, request_reason):
         }
     ]
 
+# 규칙 → 캐시 → 로컬 분류기 순서로 모델 호출 없이 판단 (판단할 수 없으면 None)
+def decide_locally(request_type, request_reason):
+    rule_decision = rule_engine.decide(request_type, request_reason)
+    if rule_decision is not None:
+        tier_stats.record("rule")
+        return rule_decision.decision
 
-    try:
+    cached = decision_cache.get(request_type, request_reason)
+    CACHE_RESULTS.inc(outcome="hit" if cached is not None else "miss")
+    if cached is not None:
+        tier_stats.record("cache")
+        return cached
+
+    if cascade is not None:
+        cascade_decision = cascade.decide(request_type, request_reason)
+        if cascade_decision is not None:
+            tier_stats.record("classifier")
+            return cascade_decision.decision
+    return None
+
+# 로컬 판단 → 모델 순서로 판단 (모델 호출 오류는 예외로 전달)
+def decide(request_type, request_reason):
+    local_decision = decide_locally(request_type, request_reason)
+    if local_decision is not None:
+        return local_decision
+
+    with timed("prompt_build"):
+        messages = build_messages(request_type, request_reason)
+    with timed("model_call"):
         response = openai.ChatCompletion.create(
             model=fine_tuned_model,
             messages=messages,
             max_tokens=150,
             temperature=0
         )
-        return response['choices'][0]['message']['content'].strip()
+    with timed("output_parse"):
+        decision = response['choices'][0]['message']['content'].strip()
+    tier_stats.record("llm")
+    # 오류는 캐시하지 않음
+    decision_cache.set(request_type, request_reason, decision)
+    return decision
+
+def request_decision(request_type, request_reason):
+    try:
+        return decide(request_type, request_reason)
     except Exception as e:
         return f"오류: {e}"
-    
-def save_to_excel(request_type, request_reason, decision):
-    filename = "user_requests.xlsx"
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    data = {
-        '시간': [now],
-        '요청 종류': [request_type],
-        '요청 사유': [request_reason],
-        '판단 결과': [decision]
-    }
-    df = pd.DataFrame(data)
-    
+
+DECISION_LABEL = re.compile("승인|거절|보류")
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 모델 스트림 청크 -> SSE 이벤트
+# 결정 라벨을 찾을 때까지 받은 청크는 모아 두었다가 label 이벤트를 먼저 보낸 뒤 delta로 이어서 보냄
+# (라벨이 여러 청크에 나뉘어 와도 label 이벤트가 항상 첫 이벤트, 라벨이 끝까지 없으면 finish에서 모아 둔 내용만 보냄)
+class DecisionStream:
+    def __init__(self):
+        self.text = ""
+        self._pending = ""
+        self._label_sent = False
+
+    def feed(self, delta):
+        self.text += delta
+        if self._label_sent:
+            return [sse("delta", {"text": delta})]
+        self._pending += delta
+        label = DECISION_LABEL.search(self.text)
+        if not label:
+            return []
+        self._label_sent = True
+        return [sse("label", {"label": label.group(0)})] + self.finish()
+
+    def finish(self):
+        events = [sse("delta", {"text": self._pending})] if self._pending else []
+        self._pending = ""
+        return events
+
+# 모델 호출 없이 판단한 결과의 SSE 이벤트 (label → delta → done)
+def local_stream_events(decision):
+    label = DECISION_LABEL.search(decision)
+    return [
+        sse("label", {"label": label.group(0) if label else decision}),
+        sse("delta", {"text": decision}),
+        sse("done", {"decision": decision}),
+    ]
+
+# 스트리밍 판단: 결정 라벨(승인/거절/보류)이 나오는 즉시 label 이벤트를 보내고,
+# 이후 설명은 delta 이벤트로 이어서 전송 (라벨 앞의 청크는 label 이벤트 뒤에 delta로 전송)
+def stream_decision(request_type, request_reason):
+    local_decision = decide_locally(request_type, request_reason)
+    if local_decision is not None:
+        yield from local_stream_events(local_decision)
+        with timed("log_write"):
+            decision_log.append(request_type, request_reason, local_decision)
+        return
+
+    stream = DecisionStream()
     try:
-        # 엑셀 파일이 있으면 기존에 추가 (append)
-        with pd.ExcelWriter(filename, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
-            # 추가 데이터는 헤더를 표시하지 않도록 설정 (신규 시트에는 헤더 추가 필요)
-            startrow = writer.sheets['Sheet1'].max_row if 'Sheet1' in writer.sheets else 0
-            df.to_excel(writer, index=False, header=startrow == 0, startrow=startrow)
-    except FileNotFoundError:
-        # 엑셀 파일이 없는 경우 새로 생성
-        df.to_excel(filename, index=False)
+        with timed("prompt_build"):
+            messages = build_messages(request_type, request_reason)
+        # model_call은 요청 전송과 청크 수신에 걸린 시간만 합산 (클라이언트로 이벤트를 보내는 시간 제외)
+        model_call = StageTimer("model_call")
+        try:
+            with model_call.running():
+                response = openai.ChatCompletion.create(
+                    model=fine_tuned_model,
+                    messages=messages,
+                    max_tokens=150,
+                    temperature=0,
+                    stream=True
+                )
+                chunks = iter(response)
+            while True:
+                with model_call.running():
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                delta = chunk['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    yield from stream.feed(delta)
+            yield from stream.finish()
+        finally:
+            model_call.observe()
+    except Exception as e:
+        decision = f"오류: {e}"
+        yield sse("error", {"error": decision})
+        with timed("log_write"):
+            decision_log.append(request_type, request_reason, decision)
+        return
+
+    with timed("output_parse"):
+        decision = stream.text.strip()
+    tier_stats.record("llm")
+    decision_cache.set(request_type, request_reason, decision)
+    with timed("log_write"):
+        decision_log.append(request_type, request_reason, decision)
+    yield sse("done", {"decision": decision})
+
+# 배치 판단: 동일한 요청은 한 번만 판단하고, 모델 호출은 concurrency 개까지 동시에 실행
+# 결과는 입력 순서대로 반환하며, 항목별 오류는 error 필드로 전달
+def decide_batch(items, concurrency=BATCH_CONCURRENCY):
+    results = [None] * len(items)
+    unique = {}  # 캐시 키 -> 해당 키를 가진 입력 인덱스 목록
+    for index, item in enumerate(items):
+        request_type = item.get("request_type") if isinstance(item, dict) else None
+        request_reason = item.get("request_reason") if isinstance(item, dict) else None
+        if not isinstance(request_type, str) or not isinstance(request_reason, str) or not request_reason.strip():
+            results[index] = {"index": index, "error": "request_type과 request_reason은 필수 항목입니다."}
+            continue
+        unique.setdefault(make_key(request_type, request_reason), []).append(index)
+
+    def run(indices):
+        item = items[indices[0]]
+        return decide(item["request_type"], item["request_reason"])
+
+    if unique:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(unique)))) as executor:
+            futures = {executor.submit(run, indices): indices for indices in unique.values()}
+            for future in as_completed(futures):
+                indices = futures[future]
+                try:
+                    outcome = {"decision": future.result()}
+                except Exception as e:
+                    outcome = {"error": f"오류: {e}"}
+                for index in indices:
+                    results[index] = {
+                        "index": index,
+                        "request_type": items[index]["request_type"],
+                        "request_reason": items[index]["request_reason"],
+                        **outcome,
+                    }
+    return results
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -107,8 +257,76 @@ def index():
         request_type = request.form.get("request_type")
         request_reason = request.form.get("request_reason")
         decision = request_decision(request_type, request_reason)
-        save_to_excel(request_type, request_reason, decision)
-    return render_template("index.html", decision=decision)
+        with timed("log_write"):
+            decision_log.append(request_type, request_reason, decision)
+    return render_template("index.html", decision=decision, stream_url="/decide/stream")
+
+@app.route("/decide/stream", methods=["GET"])
+def decide_stream():
+    request_type = request.args.get("request_type")
+    request_reason = request.args.get("request_reason")
+    if not request_type or not request_reason:
+        return jsonify({"error": "request_type과 request_reason은 필수 항목입니다."}), 400
+    return Response(
+        stream_with_context(stream_decision(request_type, request_reason)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route("/decide/batch", methods=["POST"])
+def decide_batch_route():
+    payload = request.get_json(silent=True) or {}
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items 목록이 필요합니다."}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"한 번에 최대 {BATCH_MAX_ITEMS}건까지 요청할 수 있습니다."}), 400
+    try:
+        concurrency = int(payload.get("concurrency", BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency는 정수여야 합니다."}), 400
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+
+    results = decide_batch(items, concurrency)
+    decided = [(r["request_type"], r["request_reason"], r["decision"]) for r in results if "decision" in r]
+    if decided:
+        with timed("log_write"):
+            decision_log.append_many(decided)
+    return jsonify({"results": results})
+
+# 판단 로그를 엑셀로 내보내서 다운로드
+@app.route("/log/export", methods=["GET"])
+def export_log():
+    return send_file(os.path.abspath(decision_log.export_xlsx()), as_attachment=True)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), mimetype=CONTENT_TYPE)
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(decision_cache.stats())
+
+@app.route("/rules/stats", methods=["GET"])
+def rules_stats():
+    return jsonify(rule_engine.stats())
+
+# 카테고리별 프롬프트 토큰 수 (시스템 메시지 포함, 요청 내용 제외)
+def prompt_token_counts():
+    system_tokens = count_tokens(CHAT_SYSTEM_PROMPT)
+    return {key: tokens + system_tokens for key, tokens in prompts.token_counts().items()}
+
+@app.route("/prompts/stats", methods=["GET"])
+def prompts_stats():
+    return jsonify(prompt_token_counts())
+
+@app.route("/cascade/stats", methods=["GET"])
+def cascade_stats():
+    report = tier_stats.report()
+    report["classifier_enabled"] = cascade is not None
+    if cascade is not None:
+        report["thresholds"] = {"default": cascade.default_threshold, **cascade.thresholds}
+    return jsonify(report)
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,280 @@
+# 비동기 서버 버전 (aiohttp)
+# app.py와 같은 라우트/템플릿을 제공하되, 모델 호출은 공유 aiohttp 세션(커넥션 풀 + keep-alive)을 통해
+# openai.ChatCompletion.acreate로 처리하여 요청마다 스레드를 점유하지 않는다.
+# 실행: python async_app.py
+
+import asyncio
+import os
+
+import aiohttp
+import openai
+from aiohttp import web
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app import (
+    BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS,
+    DecisionStream, build_messages, cascade, decide_locally, decision_cache, decision_log, fine_tuned_model,
+    local_stream_events, prompt_token_counts, rule_engine, sse, tier_stats,
+)
+from decision_cache import make_key
+from metrics import CONTENT_TYPE, StageTimer, render as render_metrics, timed
+
+# 공유 커넥션 풀 설정
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "200"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+MODEL_TIMEOUT = float(os.getenv("MODEL_TIMEOUT", "30"))
+
+templates = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), "template")),
+    autoescape=select_autoescape(["html"]),
+)
+
+# 로컬 판단(SQLite 캐시 조회, 분류기 predict_proba)과 캐시 저장(SQLite commit)은 동기 작업이므로
+# 이벤트 루프를 막지 않도록 기본 스레드 풀에서 실행
+async def decide_async(request_type, request_reason):
+    loop = asyncio.get_running_loop()
+    local_decision = await loop.run_in_executor(None, decide_locally, request_type, request_reason)
+    if local_decision is not None:
+        return local_decision
+
+    with timed("prompt_build"):
+        messages = build_messages(request_type, request_reason)
+    with timed("model_call"):
+        response = await openai.ChatCompletion.acreate(
+            model=fine_tuned_model,
+            messages=messages,
+            max_tokens=150,
+            temperature=0,
+            request_timeout=MODEL_TIMEOUT,
+        )
+    with timed("output_parse"):
+        decision = response['choices'][0]['message']['content'].strip()
+    tier_stats.record("llm")
+    await loop.run_in_executor(None, decision_cache.set, request_type, request_reason, decision)
+    return decision
+
+
+async def request_decision_async(request_type, request_reason):
+    try:
+        return await decide_async(request_type, request_reason)
+    except Exception as e:
+        return f"오류: {e}"
+
+
+def render(decision):
+    html = templates.get_template("index.html").render(decision=decision, stream_url="/decide/stream")
+    return web.Response(text=html, content_type="text/html")
+
+
+async def index(request):
+    decision = None
+    if request.method == "POST":
+        form = await request.post()
+        request_type = form.get("request_type")
+        request_reason = form.get("request_reason")
+        decision = await request_decision_async(request_type, request_reason)
+        with timed("log_write"):
+            decision_log.append(request_type, request_reason, decision)
+    return render(decision)
+
+
+# app.stream_decision과 같은 SSE 이벤트 순서 (label → delta → done, 실패하면 error)
+async def decide_stream(request):
+    request_type = request.query.get("request_type")
+    request_reason = request.query.get("request_reason")
+    if not request_type or not request_reason:
+        return web.json_response({"error": "request_type과 request_reason은 필수 항목입니다."}, status=400)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    async def send(events):
+        for event in events:
+            await response.write(event.encode("utf-8"))
+
+    loop = asyncio.get_running_loop()
+    local_decision = await loop.run_in_executor(None, decide_locally, request_type, request_reason)
+    if local_decision is not None:
+        await send(local_stream_events(local_decision))
+        with timed("log_write"):
+            decision_log.append(request_type, request_reason, local_decision)
+        return response
+
+    stream = DecisionStream()
+    try:
+        with timed("prompt_build"):
+            messages = build_messages(request_type, request_reason)
+        # model_call은 요청 전송과 청크 수신에 걸린 시간만 합산 (클라이언트로 이벤트를 보내는 시간 제외)
+        model_call = StageTimer("model_call")
+        try:
+            with model_call.running():
+                chunks = await openai.ChatCompletion.acreate(
+                    model=fine_tuned_model,
+                    messages=messages,
+                    max_tokens=150,
+                    temperature=0,
+                    stream=True,
+                    request_timeout=MODEL_TIMEOUT,
+                )
+            while True:
+                with model_call.running():
+                    chunk = await anext(chunks, None)
+                if chunk is None:
+                    break
+                delta = chunk['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    await send(stream.feed(delta))
+            await send(stream.finish())
+        finally:
+            model_call.observe()
+    except ConnectionResetError:
+        raise  # 클라이언트가 연결을 끊음
+    except Exception as e:
+        decision = f"오류: {e}"
+        await send([sse("error", {"error": decision})])
+        with timed("log_write"):
+            decision_log.append(request_type, request_reason, decision)
+        return response
+
+    with timed("output_parse"):
+        decision = stream.text.strip()
+    tier_stats.record("llm")
+    await loop.run_in_executor(None, decision_cache.set, request_type, request_reason, decision)
+    with timed("log_write"):
+        decision_log.append(request_type, request_reason, decision)
+    await send([sse("done", {"decision": decision})])
+    return response
+
+
+# app.decide_batch와 동일한 규칙: 중복 제거, 입력 순서 유지, 항목별 오류
+async def decide_batch_async(items, concurrency=BATCH_CONCURRENCY):
+    results = [None] * len(items)
+    unique = {}
+    for index, item in enumerate(items):
+        request_type = item.get("request_type") if isinstance(item, dict) else None
+        request_reason = item.get("request_reason") if isinstance(item, dict) else None
+        if not isinstance(request_type, str) or not isinstance(request_reason, str) or not request_reason.strip():
+            results[index] = {"index": index, "error": "request_type과 request_reason은 필수 항목입니다."}
+            continue
+        unique.setdefault(make_key(request_type, request_reason), []).append(index)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(indices):
+        item = items[indices[0]]
+        async with semaphore:
+            try:
+                outcome = {"decision": await decide_async(item["request_type"], item["request_reason"])}
+            except Exception as e:
+                outcome = {"error": f"오류: {e}"}
+        for index in indices:
+            results[index] = {
+                "index": index,
+                "request_type": items[index]["request_type"],
+                "request_reason": items[index]["request_reason"],
+                **outcome,
+            }
+
+    await asyncio.gather(*(run(indices) for indices in unique.values()))
+    return results
+
+
+async def decide_batch_route(request):
+    try:
+        payload = await request.json()
+    except Exception:
+        payload = {}
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return web.json_response({"error": "items 목록이 필요합니다."}, status=400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return web.json_response({"error": f"한 번에 최대 {BATCH_MAX_ITEMS}건까지 요청할 수 있습니다."}, status=400)
+    try:
+        concurrency = int(payload.get("concurrency", BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        return web.json_response({"error": "concurrency는 정수여야 합니다."}, status=400)
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+
+    results = await decide_batch_async(items, concurrency)
+    decided = [(r["request_type"], r["request_reason"], r["decision"]) for r in results if "decision" in r]
+    if decided:
+        with timed("log_write"):
+            decision_log.append_many(decided)
+    return web.json_response({"results": results})
+
+
+async def export_log(request):
+    loop = asyncio.get_running_loop()
+    export_path = await loop.run_in_executor(None, decision_log.export_xlsx)
+    return web.FileResponse(export_path, headers={
+        "Content-Disposition": f'attachment; filename="{os.path.basename(export_path)}"',
+    })
+
+
+async def metrics(request):
+    return web.Response(body=render_metrics().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def cache_stats(request):
+    return web.json_response(decision_cache.stats())
+
+
+async def rules_stats(request):
+    return web.json_response(rule_engine.stats())
+
+
+async def prompts_stats(request):
+    return web.json_response(prompt_token_counts())
+
+
+async def cascade_stats(request):
+    report = tier_stats.report()
+    report["classifier_enabled"] = cascade is not None
+    if cascade is not None:
+        report["thresholds"] = {"default": cascade.default_threshold, **cascade.thresholds}
+    return web.json_response(report)
+
+
+# openai.aiosession은 ContextVar이므로 요청 처리 태스크마다 공유 세션을 지정
+@web.middleware
+async def shared_session_middleware(request, handler):
+    openai.aiosession.set(request.app["http_session"])
+    return await handler(request)
+
+
+async def open_http_session(app):
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT)
+    app["http_session"] = aiohttp.ClientSession(connector=connector)
+
+
+async def close_http_session(app):
+    await app["http_session"].close()
+
+
+def create_app():
+    app = web.Application(middlewares=[shared_session_middleware])
+    app.on_startup.append(open_http_session)
+    app.on_cleanup.append(close_http_session)
+    app.router.add_route("GET", "/", index)
+    app.router.add_route("POST", "/", index)
+    app.router.add_get("/decide/stream", decide_stream)
+    app.router.add_post("/decide/batch", decide_batch_route)
+    app.router.add_get("/log/export", export_log)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/cache/stats", cache_stats)
+    app.router.add_get("/rules/stats", rules_stats)
+    app.router.add_get("/prompts/stats", prompts_stats)
+    app.router.add_get("/cascade/stats", cascade_stats)
+    return app
+
+
+def main():
+    web.run_app(create_app(), host='0.0.0.0', port=int(os.getenv("PORT", "5000")))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,30 @@
-from selenium import webdriver 
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By 
-from selenium.webdriver.common.keys import Keys 
-from selenium.webdriver.support.ui import WebDriverWait 
-from selenium.webdriver.support import expected_conditions as EC 
-from selenium.common.exceptions import TimeoutException 
-from selenium.webdriver.chrome.options import Options 
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
-import time 
-import pandas as pd 
-import requests 
+import time
+
+# 콜드 스타트 측정용 (모듈 import 시작 시각)
+_IMPORT_STARTED = time.perf_counter()
+
 import os 
 from dotenv import load_dotenv 
-from langchain_community.vectorstores import FAISS 
-from langchain_core.output_parsers import StrOutputParser 
-from langchain_core.prompts import PromptTemplate 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings 
 from datetime import datetime, timezone, timedelta
-from langchain.chains import LLMChain 
 import json
-from io import StringIO, BytesIO
-import boto3
-
-# faiss-cpu==1.7.4 # 버전 강제 해야 함
+import sys
+import hashlib
+from io import StringIO
+from collections import Counter
+# selenium, pandas, langchain, boto3와 numpy를 쓰는 공용 모듈(embedding_backends, retrieval, mmap_store)은
+# 처음 사용할 때 import (상태 확인 호출과 init 단계를 가볍게)
+
+# 공용 모듈(rule_engine 등)은 저장소 루트에 있음
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rule_engine import get_rule_engine
+from cascade import TierStats, load_cascade
+from prompt_registry import rag_registry
+from context_assembler import CONTEXT_CANDIDATES, ContextAssembler
+from pipeline import DecisionPipeline
+from waits import WaitEngine
+from row_extraction import ROW_EXTRACTION, extract_rows, open_detail, popup_notes
+
+# faiss-cpu==1.15.1 # 버전 강제 해야 함 (Dockerfile과 동일, mmap_store의 IO_FLAG_MMAP_IFC 읽기가 버전에 따라 다름)
 
 # 환경 변수 로드
 load_dotenv() 
@@ -36,76 +38,249 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")  # ✅ 저장할 S3 버킷 이름
 S3_FILE_NAME = "request_decision_results.csv"  # ✅ 저장할 파일 이름
 
-# ✅ Boto3 클라이언트 생성
-s3_client = boto3.client("s3")
-
-# ✅ 기존 데이터프레임 로드 함수
-def load_existing_data():
-    try:
-        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=S3_FILE_NAME)
+# ✅ 규칙 기반 판단 (decision_rules.json, rag 프롬프트 기준: 회의는 장소 + 내용)
+rule_engine = get_rule_engine(prompt_kind="rag")
+
+# ✅ 카테고리별 프롬프트 registry
+prompts = rag_registry(rule_engine)
+
+# ✅ 카테고리 필터 적용 전에 가져올 검색 후보 수
+SEARCH_FETCH_K = int(os.getenv("SEARCH_FETCH_K", "20"))
+
+# ✅ 파이프라인 모드 판단 워커 수 (0이면 행마다 읽기 -> 판단 -> 클릭을 차례로 처리, event의 "pipeline_workers"로 변경 가능)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "0"))
+
+# ✅ 로컬 분류기 cascade (확신하는 승인 건은 RAG + LLM 없이 처리, 모델은 LambdaRuntime.cascade에서 로드)
+CASCADE_MODEL_DIR = os.getenv("CASCADE_MODEL_DIR", "./model")
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "1") != "0"
+
+# ✅ 결과 CSV 컬럼
+RESULT_COLUMNS = ["Row ID", "요청 카테고리", "요청사유", "결정", "거절 사유", "저장 시간"]
+
+# ✅ LLM / 벡터 스토어 경로
+LLM_MODEL = 'gpt-4o'
+VECTORSTORE_PATH = os.getenv("VECTORSTORE_PATH", "./vectorstore")
+
+
+# ✅ warm 컨테이너 재사용: 무거운 객체는 컨테이너당 한 번, 처음 쓸 때 만들고 호출 사이에 유지
+# - LLM / 프롬프트 / boto3 클라이언트는 한 번만 생성
+# - 임베딩 / 벡터 스토어는 벡터 스토어 폴더의 파일(경로, 크기, 수정 시각)이 바뀐 경우에만 다시 로드
+# - S3 결과 CSV는 ETag가 같으면 다시 받지 않고 메모리의 데이터프레임을 사용
+class LambdaRuntime:
+    def __init__(self, vectorstore_path=VECTORSTORE_PATH):
+        self.vectorstore_path = vectorstore_path
+        self.created_at = time.time()
+        self.invocations = 0
+        self.embeddings = None
+        self.vectorstore = None
+        self.index_version = None
+        self._s3_client = None
+        self._llm = None
+        self._prompt_templates = None
+        self._cascade = None
+        self._results = None  # (ETag, S3에 저장된 데이터프레임)
+        self.import_seconds = _IMPORT_SECONDS
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            import boto3
+
+            self._s3_client = boto3.client("s3")
+        return self._s3_client
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+
+            self._llm = ChatOpenAI(model=LLM_MODEL, temperature=0)
+        return self._llm
+
+    @property
+    def cascade(self):
+        if self._cascade is None and CASCADE_ENABLED:
+            self._cascade = load_cascade(
+                rule_engine,
+                os.path.join(CASCADE_MODEL_DIR, "random_forest_model.pkl"),
+                os.path.join(CASCADE_MODEL_DIR, "tfidf_vectorizer.pkl"),
+            ) or False  # 파일이 없으면 False로 기록해서 다시 찾지 않음
+        return self._cascade or None
+
+    # 카테고리별 프롬프트 (요청 종류에 해당하는 규칙만 포함)
+    @property
+    def prompt_templates(self):
+        if self._prompt_templates is None:
+            from langchain_core.prompts import PromptTemplate
+
+            self._prompt_templates = {
+                key: PromptTemplate(input_variables=["context", "request_type", "request_reason"], template=template)
+                for key, template in prompts.templates.items()
+            }
+            # 토크나이저를 쓰므로 import 시점이 아니라 프롬프트를 처음 만들 때 한 번 출력
+            print("프롬프트 토큰 수:", prompts.token_counts())
+        return self._prompt_templates
+
+    # 벡터 스토어 폴더(partitions/ 포함)의 파일 목록으로 만든 인덱스 버전
+    def current_index_version(self):
+        if not os.path.exists(self.vectorstore_path):
+            raise ValueError("Error :: 벡터 스토어 생성 필요")
+        entries = []
+        for root, _, files in os.walk(self.vectorstore_path):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((os.path.relpath(path, self.vectorstore_path), stat.st_size, stat.st_mtime_ns))
+        return hashlib.sha256(repr(sorted(entries)).encode("utf-8")).hexdigest()[:16]
+
+    # 인덱스가 없거나 버전이 바뀐 경우에만 로드 (다시 로드했으면 True)
+    def ensure_index(self):
+        version = self.current_index_version()
+        if self.vectorstore is not None and version == self.index_version:
+            return False
+        from embedding_backends import get_embeddings
+        from mmap_store import is_mmap_store
+        from retrieval import PartitionedVectorStore
+
+        start = time.time()
+        # 인덱스를 만들 때와 같은 임베딩 백엔드 (embedding.json, 없으면 EMBEDDING_BACKEND / openai)
+        # openai는 같은 요청 사유를 /tmp 임베딩 캐시에서 재사용 (warm 컨테이너에서 원격 호출 생략)
+        embeddings = get_embeddings(store_path=self.vectorstore_path)
+        # partitions/ 폴더가 있으면 요청 카테고리 인덱스 + 공용(policy) 인덱스만 검색
+        # store.json이 있으면 pickle 없이 메모리 매핑으로 로드 (python mmap_store.py convert ./vectorstore)
+        vectorstore = PartitionedVectorStore.load(self.vectorstore_path, embeddings)
+        self.embeddings, self.vectorstore, self.index_version = embeddings, vectorstore, version
+        print(f"벡터 스토어 로드 (버전 {version}, {time.time() - start:.2f}초)")
+        print("벡터 스토어 형식:", "mmap" if is_mmap_store(self.vectorstore_path) else "pickle (index.pkl)")
+        print("카테고리별 인덱스:", sorted(vectorstore.partitions) or "없음 (전체 인덱스 + 카테고리 필터)")
+        return True
+
+    # 인덱스를 확인하고(필요하면 다시 로드) 상태 보고, 실패하면 다음 호출에서 처음부터 다시 로드
+    def health_check(self):
+        report = {
+            "container_age_seconds": round(time.time() - self.created_at, 1),
+            "import_seconds": round(self.import_seconds, 3),
+            "invocations": self.invocations,
+        }
+        try:
+            reloaded = self.ensure_index()
+            documents = self.vectorstore.full.index.ntotal
+            if documents == 0:
+                raise ValueError("벡터 스토어에 문서가 없습니다.")
+            report.update(
+                status="ok",
+                index_version=self.index_version,
+                index_reloaded=reloaded,
+                documents=documents,
+                partitions=sorted(self.vectorstore.partitions),
+            )
+        except Exception as e:
+            self.vectorstore = None
+            self.index_version = None
+            report.update(status="error", error=str(e))
+        return report
+
+    # ✅ 기존 데이터프레임 로드 (이전 호출에서 받은 ETag와 같으면 S3가 304를 돌려주고 본문은 받지 않음)
+    def load_results(self):
+        import pandas as pd
+        from botocore.exceptions import ClientError
+
+        request = {"Bucket": S3_BUCKET_NAME, "Key": S3_FILE_NAME}
+        if self._results is not None:
+            request["IfNoneMatch"] = self._results[0]
+        try:
+            response = self.s3_client.get_object(**request)
+        except self.s3_client.exceptions.NoSuchKey:
+            print("⚠️ 기존 데이터 없음, 새로운 CSV 파일 생성")
+            empty_df = pd.DataFrame(columns=RESULT_COLUMNS)
+            self.save_results(empty_df)  # 🚀 새 파일 생성 후 저장
+            return empty_df
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("304", "NotModified"):
+                raise
+            print("✅ S3 데이터 변경 없음, 이전 호출의 데이터 사용")
+            return self._results[1].copy()
         df = pd.read_csv(response["Body"])
+        self._results = (response["ETag"], df)
         print("✅ 기존 S3 데이터 로드 완료")
-        return df
-    except s3_client.exceptions.NoSuchKey:
-        print("⚠️ 기존 데이터 없음, 새로운 CSV 파일 생성")
-        empty_df = pd.DataFrame(columns=["Row ID", "요청 카테고리", "요청사유", "결정", "거절 사유", "저장 시간"])
-        save_to_s3(empty_df)  # 🚀 새 파일 생성 후 저장
-        return empty_df
+        return df.copy()
+
+    def save_results(self, df):
+        import pandas as pd
+
+        csv_buffer = StringIO()
+        df.to_csv(csv_buffer, index=False)
+        response = self.s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=S3_FILE_NAME, Body=csv_buffer.getvalue())
+        # 다음 호출에서 S3에서 읽은 것과 같은 데이터프레임을 쓰도록 저장한 CSV를 다시 파싱해서 보관
+        self._results = (response["ETag"], pd.read_csv(StringIO(csv_buffer.getvalue())))
+        print("✅ 데이터가 S3에 성공적으로 저장되었습니다!")
+
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+_runtime = None
+
 
-def save_to_s3(df):
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=S3_FILE_NAME, Body=csv_buffer.getvalue())
-    print("✅ 데이터가 S3에 성공적으로 저장되었습니다!")
+def get_runtime():
+    global _runtime
+    if _runtime is None:
+        _runtime = LambdaRuntime()
+    return _runtime
 
 
 def handler(event, context):
+    start = time.perf_counter()
+    runtime = get_runtime()
+    runtime.invocations += 1
+
+    # ✅ 상태 확인 (event에 "health_check"가 있으면 확인 결과만 반환)
+    health = runtime.health_check()
+    if isinstance(event, dict) and event.get("health_check"):
+        return {
+            "statusCode": 200 if health["status"] == "ok" else 503,
+            "body": json.dumps(health, ensure_ascii=False),
+        }
+    if health["status"] != "ok":
+        raise ValueError(f"Error :: 벡터 스토어 생성 필요 ({health['error']})")
 
     # ✅ S3에서 기존 데이터 로드
-    results_df = load_existing_data()
-
-    # LangChain 설정
-    fine_tuned_model = 'gpt-4o'
-    llm = ChatOpenAI(model=fine_tuned_model, temperature=0) 
-    embeddings = OpenAIEmbeddings() 
-
-    # 벡터 스토어 경로 설정 및 로드 
-    vectorstore_path = "./vectorstore" 
-    if os.path.exists(vectorstore_path): 
-        vectorstore = FAISS.load_local(vectorstore_path, embeddings=embeddings, allow_dangerous_deserialization=True)
-    else: 
-        raise ValueError("Error :: 벡터 스토어 생성 필요")
-
-
-    # 프롬프트 템플릿 설정
-    prompt_template = """
-    당신은 직원 요청 승인 시스템입니다. 요청 종류와 요청 사유를 바탕으로 승인, 거절 중 하나를 판단합니다. 아래 정보를 참고하여 요청을 판단하세요:
-
-    ### 문서 정보
-    {context}
-
-    ### 승인 기준:
-    1. (비업무)개인시간_흡연 등 : 개인적 활동은 모두 승인.
-    2. (업무)회의 : 장소, 내용이 포함된 경우 승인. 하나라도 누락된 경우 거절. (요청사유가 구체적이지 않아도 승인해라.)
-        - 참고로 회의실 종류에는 '3층', '1층', '2층', '4층', '5층', '로지', 'ROSY', 'CLOVER', '클로버', '우드', 'WOOD', '오션', 'OCEAN' 등 층수 또는 명사형으로 되어있다.
-        - 참고로 회의실은 사내 회의실 외 단순히 '외부장소', '자리', '데스크', '타운홀' 등과 같이 영어로도 나온다. 그래서 장소는 명사형 및 외부장소, 자리라고 되어있어도 승인해라.
-    3. (업무)기타업무 : 사유가 설명된 경우 승인.
-    4. (업무)출장,이동,외근 : 출장 관련 내용이나 장소가 명시되어 있어야 함.
-    
-    ### 요청 세부사항
-    요청 종류: {request_type}
-    요청 사유: {request_reason}
-
-    ### 결정 형식
-    결정 및 이유를 아래 형식으로 작성하세요:
-    - 결정: (승인, 거절 중 하나)
-    - 사유: (거절 이유를 간단히 설명)
-
-    결정 및 이유:
-    """
-
-    prompt = PromptTemplate(input_variables=["request_type", "request_reason"], template=prompt_template)
-    retriever = vectorstore.as_retriever(k=3)
+    results_df = runtime.load_results()
+
+    # 단계별(rule / classifier / llm) 처리 건수
+    tier_stats = TierStats()
+
+    # 검색 결과 중복 제거 + 점수 컷 + 토큰 예산으로 context 조합
+    context_assembler = ContextAssembler()
+
+    pipeline_workers = PIPELINE_WORKERS
+    if isinstance(event, dict) and "pipeline_workers" in event:
+        pipeline_workers = int(event["pipeline_workers"])
+
+    import pandas as pd
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+    llm = runtime.llm
+    cascade = runtime.cascade
+    embeddings = runtime.embeddings
+    vectorstore = runtime.vectorstore
+    prompt_templates = runtime.prompt_templates
+    # CloudWatch Logs Insights에서 metric 필드로 콜드/웜 준비 시간을 추적
+    print(json.dumps({
+        "metric": "cold_start" if runtime.invocations == 1 else "warm_start",
+        "import_seconds": round(runtime.import_seconds, 3) if runtime.invocations == 1 else 0.0,
+        "setup_seconds": round(time.perf_counter() - start, 3),
+        "index_version": runtime.index_version,
+    }))
+
+    # 사전 단계에서 한 번에 검색해 둔 문서 ((카테고리, 요청 사유) -> [(문서, 거리), ...])
+    prefetched_docs = {}
+    # 사전 단계에서 읽은 요청 (row_id -> (요청 종류, 요청 사유)), 본 처리에서 행을 다시 읽지 않음
+    collected = {}
+    # 로컬 분류기 판단 ((요청 종류, 요청 사유) -> CascadeDecision 또는 None), 사전 단계와 본 판단에서 한 번만 예측
+    cascade_decisions = {}
 
     # 요청사항을 '/' 기준으로 분리하는 함수
     def split_request_detail(request_detail):
@@ -116,19 +291,272 @@ def handler(event, context):
 
     # request_decision 함수를 수정하여 요청사유의 첫 번째 요소만 사용하도록 수정
     def request_decision(request_type, request_reason):
-        search_results = vectorstore.similarity_search(request_reason, k=3, distance_metric='cosine')
-        context = "\n".join([result.page_content for result in search_results])
+        # 규칙으로 판단 가능한 요청은 검색/LLM 호출 없이 바로 결정
+        rule_decision = rule_engine.decide(request_type, request_reason)
+        if rule_decision is not None:
+            print(f"규칙 판단 ({rule_decision.rule}): {rule_decision.decision}")
+            tier_stats.record("rule")
+            return f"- 결정: {rule_decision.decision}\n- 사유: {rule_decision.reason}"
+
+        # 로컬 분류기가 확신하는 승인 건은 검색/LLM 호출 없이 결정
+        if cascade is not None:
+            cascade_decision = cascade_decide(request_type, request_reason)
+            if cascade_decision is not None:
+                print(f"분류기 판단 (승인 확률 {cascade_decision.probability:.3f}): {cascade_decision.decision}")
+                tier_stats.record("classifier")
+                return f"- 결정: {cascade_decision.decision}\n- 사유: 로컬 분류기 승인 확률 {cascade_decision.probability:.3f}"
+
+        # 같은 카테고리의 과거 요청 행과 정책 문서만 검색
+        category = rule_engine.category_of(request_type)
+        search_results = prefetched_docs.get((category, request_reason))
+        if search_results is None:  # 사전 단계에서 못 모은 요청(다음 페이지 등)은 개별 검색
+            search_results = vectorstore.similarity_search_with_score(
+                request_reason, category, k=CONTEXT_CANDIDATES, fetch_k=SEARCH_FETCH_K
+            )
+        context = context_assembler.assemble(search_results)
         input_data = {
             "request_type": request_type,
             "request_reason": request_reason,
             "context": context
         }
-        chain = prompt | llm  
+        prompt_key, _ = prompts.select(request_type)
+        chain = prompt_templates[prompt_key] | llm  
         decision = chain.invoke(input_data)
         print("Raw decision output:", decision)
         decision_text = decision.content.strip()  
+        tier_stats.record("llm")
         return decision_text
 
+    def cascade_decide(request_type, request_reason):
+        key = (request_type, request_reason)
+        if key not in cascade_decisions:
+            cascade_decisions[key] = cascade.decide(request_type, request_reason)
+        return cascade_decisions[key]
+
+    # 요청 상세 팝업을 열고 요청 사유 목록을 읽음
+    def read_request_reason(request_detail_element):
+        driver.execute_script("arguments[0].click();", request_detail_element)
+        return read_popup_reasons()
+
+    # 열린 요청 상세 팝업에서 요청 사유 목록을 읽음
+    def read_popup_reasons():
+        popup = waits.until(
+            "popup_open", EC.visibility_of_element_located((By.CSS_SELECTOR, "div.sft-middle-item"))
+        )
+
+        # 전체보기 버튼이 있다면 클릭
+        try:
+            view_all_button = popup.find_element(By.CLASS_NAME, "sft-view-all-button")
+            if view_all_button.is_displayed():
+                view_all_button.click()
+                # print("전체보기 버튼 클릭됨")
+        except Exception as e:
+            print("전체보기 버튼이 존재하지 않거나 클릭할 수 없음:", e)
+
+        reason_elements = waits.until(
+            "popup_notes", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.sft-note")), target=popup
+        )
+
+        if ROW_EXTRACTION == "script":
+            return popup, popup_notes(driver, popup)
+        request_reason = [
+            element.text.strip()
+            for element in reason_elements
+            if element.is_displayed() and element.text.strip()
+        ]
+        return popup, request_reason
+
+    def close_popup(popup):
+        close_buttons = popup.find_elements(By.CSS_SELECTOR, "button.close")
+        if close_buttons:
+            driver.execute_script("arguments[0].click();", close_buttons[0])
+        waits.until("popup_close", EC.invisibility_of_element(popup), timeout=5)
+
+    # ✅ 사전 단계: 화면의 대기 중인 요청을 훑어서 (row_id, 요청 종류, 요청 사유) 수집
+    def collect_pending_requests():
+        pending = []
+        waits.until("table_rows", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr")))
+        for row in list_rows():
+            try:
+                request_type, request_reason, _ = read_row(row)
+            except (NoSuchElementException, StaleElementReferenceException, TimeoutException) as e:
+                print(f"사전 수집 중단 (남은 요청은 개별 처리): {e}")
+                break
+            collected[row["row_id"]] = (request_type, request_reason)
+            if request_reason:
+                pending.append((row["row_id"], request_type, request_reason))
+        return pending
+
+    # 수집한 요청 사유를 한 번에 임베딩하고 FAISS 행렬 검색
+    # 규칙이나 로컬 분류기로 결정되는 요청은 검색하지 않음 (규칙은 통계에 남기지 않는 evaluate로 확인)
+    def prefetch_contexts(pending):
+        requests = [
+            (rule_engine.category_of(request_type), request_reason) for _, request_type, request_reason in pending
+            if rule_engine.evaluate(request_type, request_reason) is None
+            and (cascade is None or cascade_decide(request_type, request_reason) is None)
+        ]
+        start = time.time()
+        prefetched_docs.update(vectorstore.batch_similarity_search(
+            requests, k=CONTEXT_CANDIDATES, fetch_k=SEARCH_FETCH_K, with_score=True
+        ))
+        print(f"사전 검색 완료: 요청 {len(pending)}건 중 {len(requests)}건, {time.time() - start:.2f}초")
+
+    # 요청 상세 팝업이 열린 상태에서 승인 -> 최종 승인
+    def approve_open_request(row_id):
+        approve_button = waits.until(
+            "approve_button", EC.element_to_be_clickable((By.XPATH, "//div[@class='sft-footer']//button[contains(text(), '승인')]"))
+        )
+        driver.execute_script("arguments[0].click();", approve_button)
+
+        final_approve_button = waits.until(
+            "approve_modal", EC.element_to_be_clickable((By.XPATH, "//sft-action-request-modal//button[contains(text(), '승인하기')]"))
+        )
+        requests_before = waits.request_count()
+        final_approve_button.click()
+        # 승인 모달이 닫히고 승인 요청/목록 갱신이 끝날 때까지
+        waits.until(
+            "approve_done", EC.invisibility_of_element_located((By.CSS_SELECTOR, "sft-action-request-modal")), required=False
+        )
+        waits.network_idle("approve_network", since=requests_before)
+        print(f"Row ID {row_id} 승인 완료.")
+
+    # ✅ S3에 저장할 결과 행 추가
+    def append_result(row_id, request_type, request_reason, decision_type, rejection_reason):
+        nonlocal results_df
+        # KST 기준 현재 시간
+        kst = timezone(timedelta(hours=9))
+        timestamp = datetime.now(kst).strftime("%Y-%m-%d %H:%M:%S")
+        new_row = pd.DataFrame({
+            "Row ID": [row_id],
+            "요청 카테고리": [request_type],
+            "요청사유": [request_reason],
+            "결정": [decision_type],
+            "거절 사유": [rejection_reason],
+            "저장 시간": [timestamp]
+        })
+        results_df = pd.concat([results_df, new_row], ignore_index=True)
+
+    # row_id로 현재 화면의 행을 다시 찾음 (승인 후 테이블이 다시 그려져도 사용 가능)
+    def find_row(row_id):
+        checkbox = driver.find_element(By.CSS_SELECTOR, f'input.sft-table-row-checkbox[sft-data-table-row-id="{row_id}"]')
+        return checkbox.find_element(By.XPATH, "./ancestor::tr")
+
+    # 행의 요청 종류를 읽고 요청 상세 팝업을 열어 요청 사유 목록을 읽음
+    def open_request_detail(row):
+        request_detail_element = row.find_element(By.CSS_SELECTOR, "td.sft-request-tags-table div.sft-request-detail")
+        request_type = split_request_detail(request_detail_element.text.strip())
+        popup, request_reason = read_request_reason(request_detail_element)
+        return request_type, popup, request_reason
+
+    # 현재 화면의 행 목록 -> [{"row_id", "detail", "notes"}, ...]
+    # script 모드: execute_script 한 번으로 모든 행의 row_id / 요청 종류 / 행 안에 보이는 요청 사유를 읽음
+    # popup 모드: row_id만 읽고 요청 종류와 사유는 read_row에서 행마다 팝업을 열어 읽음
+    def list_rows():
+        if ROW_EXTRACTION == "script":
+            return extract_rows(driver)
+        return [
+            {"row_id": checkbox.get_attribute("sft-data-table-row-id"), "detail": None, "notes": []}
+            for checkbox in driver.find_elements(By.CSS_SELECTOR, "input.sft-table-row-checkbox")
+        ]
+
+    # row_id 행의 요청 상세 팝업을 열고 (요청 종류, 팝업, 요청 사유 목록) 반환
+    # script 모드는 행 찾기 + 클릭을 execute_script 한 번으로 처리하고, 요청 종류는 list_rows 값을 쓰므로 None
+    def open_row(row_id):
+        if ROW_EXTRACTION == "script":
+            if not open_detail(driver, row_id):
+                raise NoSuchElementException(f"Row ID {row_id} 행을 찾을 수 없습니다.")
+            popup, request_reason = read_popup_reasons()
+            return None, popup, request_reason
+        return open_request_detail(find_row(row_id))
+
+    # list_rows의 행 하나 -> (요청 종류, 첫 번째 요청 사유 또는 None, 열린 팝업 또는 None)
+    # 요청 종류는 list_rows에서 읽은 값을 쓰고, 행 안에 요청 사유가 없을 때만 팝업을 열어 사유를 읽음
+    # keep_open=True면 팝업을 닫지 않고 돌려줌 (승인 버튼은 팝업 안에 있음)
+    def read_row(row, keep_open=False):
+        if row["row_id"] in collected:  # 사전 단계에서 이미 읽은 행 (승인할 때만 팝업을 엶)
+            row_reads["prefetched"] += 1
+            request_type, request_reason = collected[row["row_id"]]
+            return request_type, request_reason, None
+        request_type = split_request_detail(row["detail"]) if row["detail"] is not None else None
+        if row["notes"]:
+            row_reads["script"] += 1
+            return request_type, row["notes"][0], None
+        row_reads["popup"] += 1
+        popup_type, popup, request_reason = open_row(row["row_id"])
+        if not keep_open:
+            close_popup(popup)
+            popup = None
+        return request_type or popup_type, request_reason[0] if request_reason else None, popup
+
+    # ✅ 파이프라인 모드: 메인 스레드(UI)는 행 읽기와 승인 클릭만 하고, 검색 + LLM 판단은 워커 스레드에서 동시에 실행
+    # 전체 시간이 단계 합이 아니라 가장 느린 단계(보통 LLM 판단 / workers)에 맞춰짐
+    def run_pipelined(workers):
+        pipeline = DecisionPipeline(request_decision, workers=workers)
+        seen = set()
+
+        # 끝난 판단 반영 (승인은 행을 다시 찾아 팝업을 열고 클릭, 거절은 기록만)
+        def apply(results):
+            with pipeline.stage("apply"):
+                for (row_id, request_type, request_reason), decision, error in results:
+                    decision_type = ""
+                    rejection_reason = ""
+                    if error is not None:
+                        print(f"Row ID {row_id} 판단 실패, 보류합니다: {error}")
+                        decision_type = "보류"
+                    elif "결정: 승인" in decision:
+                        try:
+                            open_row(row_id)
+                            approve_open_request(row_id)
+                            decision_type = "승인"
+                        except (NoSuchElementException, StaleElementReferenceException, TimeoutException) as e:
+                            print(f"Row ID {row_id} 승인 클릭 실패, 다음 실행에서 다시 처리합니다: {e}")
+                            continue
+                    elif "결정: 거절" in decision:
+                        print(f"Row ID {row_id} 거절됨.")
+                        rejection_reason = decision.split("- 사유: ")[1] if "- 사유: " in decision else ""
+                        decision_type = "거절"
+                    print(f"Row ID: {row_id}, 요청사유: {request_reason}, 결정 및 사유: {decision}")
+                    append_result(row_id, request_type, request_reason, decision_type, rejection_reason)
+
+        try:
+            try:
+                waits.until("table_rows", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr")))
+            except TimeoutException:
+                print("더 이상 요청이 없습니다. 종료합니다.")
+                return
+            while True:
+                with pipeline.stage("scrape"):
+                    new_rows = [row for row in list_rows() if row["row_id"] not in seen]
+                if not new_rows:
+                    print("처리할 새로운 요청이 없습니다. 파이프라인 종료")
+                    break
+
+                for row in new_rows:
+                    row_id = row["row_id"]
+                    seen.add(row_id)
+                    apply(pipeline.completed())
+                    while pipeline.full:  # 판단 대기 중인 행이 많으면 결과를 반영하면서 대기
+                        apply(pipeline.completed(block=True))
+
+                    with pipeline.stage("scrape"):
+                        try:
+                            request_type, request_reason, _ = read_row(row)
+                        except (NoSuchElementException, StaleElementReferenceException, TimeoutException) as e:
+                            print(f"Row ID {row_id} 읽기 실패, 건너뜁니다: {e}")
+                            continue
+                    if request_reason:
+                        pipeline.submit((row_id, request_type, request_reason), request_type, request_reason)
+                    else:
+                        print(f"Row ID: {row_id}, 요청 사유를 찾을 수 없습니다.")
+                        append_result(row_id, request_type, None, "보류", "")
+
+                # 이 화면의 판단을 모두 반영한 뒤 목록을 다시 읽음 (승인된 행이 빠지면 다음 행이 보임)
+                while pipeline.pending:
+                    apply(pipeline.completed(block=True))
+        finally:
+            pipeline.close()
+            print("파이프라인 단계별 시간:", pipeline.report())
+
     # # ✅ Lambda 환경에서 반드시 필요한 옵션들
     # chrome_options = Options()
     # chrome_options.add_argument("--headless")
@@ -146,6 +574,13 @@ def handler(event, context):
     driver = webdriver.Chrome(options=chrome_options)
     driver.maximize_window() 
 
+    # 고정 sleep 대신 화면/네트워크 상태 기준 대기 (단계별 대기 시간 기록)
+    waits = WaitEngine(driver)
+    # 클릭이 보내는 요청도 network_idle이 세도록 페이지 이동 전에 XHR/fetch 카운터 등록
+    waits.install_network_hook()
+    # 행 읽기 방식별 횟수 (script: 한 번의 execute_script로 읽음, popup: 팝업을 열어 읽음, prefetched: 사전 단계 결과 재사용)
+    row_reads = Counter()
+
 
     # ✅ 현재 열린 창 목록 출력 (디버깅)
     try:
@@ -160,7 +595,7 @@ def handler(event, context):
         driver.get("https://shiftee.io/ko/accounts/login") 
 
         # 이메일 입력 
-        email_field = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "email-address"))) 
+        email_field = waits.until("login_form", EC.presence_of_element_located((By.ID, "email-address")))
         email_field.send_keys(EMAIL)
 
         # 비밀번호 입력
@@ -170,25 +605,31 @@ def handler(event, context):
         # print("로그인 버튼 클릭")
 
         # 로그인 버튼 클릭
-        login_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn.btn-primary.btn-block.mt-3"))
+        login_button = waits.until(
+            "login_button", EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn.btn-primary.btn-block.mt-3"))
         ) 
         login_button.click() 
 
-        time.sleep(2)
+        waits.until("login_redirect", EC.url_changes("https://shiftee.io/ko/accounts/login"), required=False)
         print("로그인 완료")
         
         # print("요청 페이지로 이동")
         driver.get("https://shiftee.io/app/companies/1855160/manager/requests") 
+        waits.install_network_hook()  # CDP 등록이 안 된 driver는 여기서 주입 (필터 클릭 전)
 
-        dropdown_toggle = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "sft-multi-select .btn-tertiary.dropdown-toggle"))
+        dropdown_toggle = waits.until(
+            "filter_toggle", EC.element_to_be_clickable((By.CSS_SELECTOR, "sft-multi-select .btn-tertiary.dropdown-toggle"))
         ) 
+        # 필터 적용 전 목록 (필터 적용 후 목록이 다시 그려졌는지 확인용)
+        waits.network_idle("page_load")
+        rows_before = driver.find_elements(By.CSS_SELECTOR, "tbody > tr")
+        requests_before = waits.request_count()
+
         dropdown_toggle.click() 
         # print("드롭다운 토글 클릭")
 
-        dropdown_menu = WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.CSS_SELECTOR, "div.dropdown-menu.show"))
+        dropdown_menu = waits.until(
+            "filter_menu", EC.visibility_of_element_located((By.CSS_SELECTOR, "div.dropdown-menu.show"))
         ) 
 
         select_all = dropdown_menu.find_element(By.CSS_SELECTOR, "a.sft-dropdown-item-select-all") 
@@ -203,164 +644,91 @@ def handler(event, context):
                     checkbox.click() 
         
         dropdown_toggle.click() 
-        time.sleep(2) 
-
-        # print("요청 테이블 처리 시작")
-        table_rows = WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr"))
-        ) 
-        rows = []
-        row_id = ""
-        
-        # 거절된 요청 ID 저장
-        rejected_requests = set()
-        
-        while True:
-            try:
+        # 필터 메뉴가 닫히고, 필터 요청이 끝나고, 이전 목록이 새 목록으로 바뀔 때까지
+        waits.until(
+            "filter_close", EC.invisibility_of_element_located((By.CSS_SELECTOR, "div.dropdown-menu.show")), required=False
+        )
+        waits.network_idle("filter_apply", since=requests_before)
+        if rows_before:
+            waits.until("filter_rows", EC.staleness_of(rows_before[0]), timeout=5, required=False)
+
+        if pipeline_workers > 0:
+            run_pipelined(pipeline_workers)
+        else:
+            # print("요청 테이블 처리 시작")
+            waits.until("table_rows", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr")))
+            # 요청 사유를 먼저 모두 모아서 임베딩/검색을 한 번에 처리
+            prefetch_contexts(collect_pending_requests())
+
+            # 이미 처리한 요청 ID (거절/보류된 요청은 목록에 남으므로 다시 처리하지 않음)
+            handled = set()
+
+            while True:
                 print("요청 테이블 처리 시작")
-
-                # 현재 화면에서 최신 row 목록 가져오기
-                table_rows = WebDriverWait(driver, 10).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr"))
-                )
-                
-                if not table_rows:
-                    print("모든 요청을 처리 완료했습니다. 종료합니다.")
+                try:
+                    # 현재 화면의 행 목록을 한 번에 읽음 (승인으로 목록이 다시 그려져도 row_id로 다시 찾음)
+                    waits.until("table_rows", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr")))
+                except TimeoutException:
+                    print("더 이상 요청이 없습니다. 종료합니다.")
                     break  # 남아있는 요청이 없으면 종료
+                new_rows = [row for row in list_rows() if row["row_id"] not in handled]
+
+                # 새로운 요청이 없으면 루프 종료
+                if not new_rows:
+                    print("처리할 새로운 요청이 없습니다. 루프 종료")
+                    break
 
-                if row_id in rows:
-                    break # 이미 진행했던 건이면 종료
-                rows.append(row_id)
+                for row in new_rows:
+                    row_id = row["row_id"]
+                    handled.add(row_id)
+                    decision_type = ""
+                    rejection_reason = ""
+                    try:
+                        request_type, request_reason, popup = read_row(row, keep_open=True)
+                    except (NoSuchElementException, StaleElementReferenceException, TimeoutException) as e:
+                        print(f"Row ID {row_id} 읽기 실패, 건너뜁니다: {e}")
+                        continue
+
+                    if request_reason:
+                        decision = request_decision(request_type, request_reason)
+                        print(f"Row ID: {row_id}, 요청사유: {request_reason}, 결정 및 사유: {decision}")
+
+                        if "결정: 승인" in decision:
+                            try:
+                                if popup is None:  # 행 안에서 사유를 읽은 경우 승인 버튼을 위해 팝업을 엶
+                                    _, popup, _ = open_row(row_id)
+                                approve_open_request(row_id)
+                                popup = None
+                                decision_type = "승인"
+                            except (NoSuchElementException, StaleElementReferenceException, TimeoutException) as e:
+                                print(f"Row ID {row_id} 승인 클릭 실패, 다음 실행에서 다시 처리합니다: {e}")
+                                continue
 
-                new_requests_exist = False  # 새로운 요청이 있는지 확인하는 변수
+                        elif "결정: 거절" in decision:
+                            print(f"Row ID {row_id} 거절됨. 이후 반복 처리 방지를 위해 저장.")
+                            rejection_reason = decision.split("- 사유: ")[1] if "- 사유: " in decision else ""
+                            decision_type = "거절"
 
+                    else:
+                        print(f"Row ID: {row_id}, 요청 사유를 찾을 수 없습니다.")
+                        decision_type = "보류"
 
-                for row in table_rows:
-                    try:
-                        decision_type = ""
-                        rejection_reason = ""
-                        row_id = row.find_element(By.CSS_SELECTOR, "input.sft-table-row-checkbox").get_attribute("sft-data-table-row-id")
-                        
-                        # 이미 거절된 요청이라면 건너뛰기
-                        if row_id in rejected_requests:
-                            print(f"Row ID {row_id}는 이미 거절됨. 건너뜁니다.")
-                            time.sleep(2)
-                            continue
-                        
-                        new_requests_exist = True # 새로운 요청이 있음을 표시
-                        
-                        request_detail_element = row.find_element(By.CSS_SELECTOR, "td.sft-request-tags-table div.sft-request-detail")
-                        request_details = request_detail_element.text.strip()
-                        request_type = split_request_detail(request_details)
-
-                        driver.execute_script("arguments[0].click();", request_detail_element)
-                        time.sleep(2)
-                        popup = WebDriverWait(driver, 10).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, "div.sft-middle-item"))
-                        )
-                        
-                        # 전체보기 버튼이 있다면 클릭
+                    if popup is not None:
                         try:
-                            view_all_button = popup.find_element(By.CLASS_NAME, "sft-view-all-button")
-                            if view_all_button.is_displayed():
-                                view_all_button.click()
-                                # print("전체보기 버튼 클릭됨")
+                            close_popup(popup)
                         except Exception as e:
-                            print("전체보기 버튼이 존재하지 않거나 클릭할 수 없음:", e)
-
-
-                        reason_elements = WebDriverWait(popup, 10).until(
-                            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.sft-note"))
-                        )
-
-                        request_reason = [
-                            element.text.strip()
-                            for element in reason_elements
-                            if element.is_displayed() and element.text.strip()
-                        ]
-
-                        # time.sleep(1)
-
-                        if request_reason:
-                            decision = request_decision(request_type, request_reason[0])
-                            print(f"Row ID: {row_id}, 요청사유: {request_reason[0]}, 결정 및 사유: {decision}")
-
-                            if "결정: 승인" in decision:
-                                approve_button = WebDriverWait(driver, 10).until(
-                                    EC.element_to_be_clickable((By.XPATH, "//div[@class='sft-footer']//button[contains(text(), '승인')]"))
-                                )
-                                driver.execute_script("arguments[0].click();", approve_button)
-                                time.sleep(2)
-
-                                final_approve_button = WebDriverWait(driver, 10).until(
-                                    EC.element_to_be_clickable((By.XPATH, "//sft-action-request-modal//button[contains(text(), '승인하기')]"))
-                                )
-                                final_approve_button.click()
-                                time.sleep(2)
-                                print(f"Row ID {row_id} 승인 완료.")
-                                decision_type = "승인"
-                              
-                                time.sleep(2)
-                                # break
-
-                            elif "결정: 거절" in decision:
-                                print(f"Row ID {row_id} 거절됨. 이후 반복 처리 방지를 위해 저장.")
-                                rejected_requests.add(row_id)  # 거절된 요청 저장
-                                rejection_reason = decision.split("- 사유: ")[1] if "- 사유: " in decision else ""
-                                decision_type = "거절"
-
-                                time.sleep(2)
-                                
-                                try:
-                                    close_buttons = popup.find_elements(By.CSS_SELECTOR, "button.close")
-                                    if close_buttons:
-                                        driver.execute_script("arguments[0].click();", close_buttons[0])
-                                        print("거절 팝업 닫기 완료")
-                                    WebDriverWait(driver, 5).until(EC.invisibility_of_element(popup))
-                                    print("팝업 완전 종료 확인")
-                                except Exception as e:
-                                    print(f"거절 팝업 닫기 중 에러 발생, 무시하고 pass: {e}")
-
-                        else:
-                            print(f"Row ID: {row_id}, 요청 사유를 찾을 수 없습니다.")
-                            request_reason.append(None)  # 요청 사유가 없을 경우 None 추가
-                            decision_type = "보류"
-
-                        #S3 결과 기록
-                        # timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        kst = timezone(timedelta(hours=9))
-
-                        # KST 기준 현재 시간
-                        timestamp = datetime.now(kst).strftime("%Y-%m-%d %H:%M:%S")
-
-                        # ✅ 기존 데이터프레임에 추가
-                        new_row = pd.DataFrame({
-                            "Row ID": [row_id],
-                            "요청 카테고리": [request_type],
-                            "요청사유": [request_reason[0]],
-                            "결정": [decision_type],
-                            "거절 사유": [rejection_reason],
-                            "저장 시간": [timestamp]
-                        })
-
-                        results_df = pd.concat([results_df, new_row], ignore_index=True)
-
-
-                    except StaleElementReferenceException:
-                        print("StaleElementReferenceException 발생, 다시 시도합니다.")
-                        break  # 다시 목록을 가져오도록 설정
-                    
-                # 새로운 요청이 없으면 루프 종료
-                if not new_requests_exist:
-                    time.sleep(2)
-                    print("처리할 새로운 요청이 없습니다. 루프 종료")
-                    break  
+                            print(f"팝업 닫기 중 에러 발생, 무시하고 pass: {e}")
 
-            except TimeoutException:
-                print("더 이상 요청이 없습니다. 종료합니다.")
-                break  # 남아있는 요청이 없으면 종료
-            
-        save_to_s3(results_df)
+                    #S3 결과 기록
+                    append_result(row_id, request_type, request_reason, decision_type, rejection_reason)
+
+        runtime.save_results(results_df)
+        print("규칙 판단 통계:", rule_engine.stats())
+        print("단계별 처리 비율:", tier_stats.report())
+        print("임베딩:", embeddings.stats())
+        print("context 조합:", context_assembler.stats())
+        print(f"대기 시간 (총 {waits.total_seconds()}초):", waits.summary())
+        print(f"행 읽기 ({ROW_EXTRACTION} 모드):", dict(row_reads))
 
         return {
             "statusCode": 200,
@@ -373,7 +741,13 @@ def handler(event, context):
         # ✅ 예외 발생 시에도 `results_df`가 비어 있지 않다면 S3에 저장
         if not results_df.empty:
             print("⚠️ 오류 발생했지만, 현재까지 수집된 데이터를 S3에 저장합니다.")
-            save_to_s3(results_df)
+            runtime.save_results(results_df)
+        print("규칙 판단 통계:", rule_engine.stats())
+        print("단계별 처리 비율:", tier_stats.report())
+        print("임베딩:", embeddings.stats())
+        print("context 조합:", context_assembler.stats())
+        print(f"대기 시간 (총 {waits.total_seconds()}초):", waits.summary())
+        print(f"행 읽기 ({ROW_EXTRACTION} 모드):", dict(row_reads))
 
         return {
             "statusCode": 500,
@@ -1,11 +1,9 @@
 from selenium import webdriver 
 from selenium.webdriver.common.by import By 
 from selenium.webdriver.common.keys import Keys 
-from selenium.webdriver.support.ui import WebDriverWait 
 from selenium.webdriver.support import expected_conditions as EC 
 from selenium.common.exceptions import TimeoutException 
 from selenium.webdriver.chrome.options import Options 
-import time 
 import pandas as pd 
 import requests 
 import os 
@@ -13,10 +11,17 @@ from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS 
 from langchain_core.output_parsers import StrOutputParser 
 from langchain_core.prompts import PromptTemplate 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings 
+from langchain_openai import ChatOpenAI 
 from datetime import datetime 
 from langchain.chains import LLMChain 
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+import sys
+
+# 공용 모듈(embedding_cache 등)은 저장소 루트에 있음
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_backends import get_embeddings
+from context_assembler import CONTEXT_CANDIDATES, ContextAssembler
+from waits import WaitEngine
 
 # os.chdir("/home/shiftee/aws_lambda")
 
@@ -34,10 +39,11 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 # LangChain 설정
 fine_tuned_model = 'gpt-4o'
 llm = ChatOpenAI(model=fine_tuned_model, temperature=0) 
-embeddings = OpenAIEmbeddings() 
 
 # 벡터 스토어 경로 설정 및 로드 
 vectorstore_path = "./vectorstore" 
+# 인덱스를 만들 때와 같은 임베딩 백엔드 (openai는 같은 요청 사유를 임베딩 캐시에서 재사용)
+embeddings = get_embeddings(store_path=vectorstore_path)
 if os.path.exists(vectorstore_path): 
     vectorstore = FAISS.load_local(vectorstore_path, embeddings=embeddings, allow_dangerous_deserialization=True)
 else: 
@@ -75,6 +81,9 @@ prompt_template = """
 prompt = PromptTemplate(input_variables=["request_type", "request_reason"], template=prompt_template)
 retriever = vectorstore.as_retriever(k=3)
 
+# 검색 결과 중복 제거 + 점수 컷 + 토큰 예산으로 context 조합
+context_assembler = ContextAssembler()
+
 # 요청사항을 '/' 기준으로 분리하는 함수
 def split_request_detail(request_detail):
     if '/' in request_detail:
@@ -84,8 +93,8 @@ def split_request_detail(request_detail):
 
 # request_decision 함수를 수정하여 요청사유의 첫 번째 요소만 사용하도록 수정합니다.
 def request_decision(request_type, request_reason):
-    search_results = vectorstore.similarity_search(request_reason, k=3, distance_metric='cosine')
-    context = "\n".join([result.page_content for result in search_results])
+    search_results = vectorstore.similarity_search_with_score(request_reason, k=CONTEXT_CANDIDATES)
+    context = context_assembler.assemble(search_results)
     input_data = {
         "request_type": request_type,
         "request_reason": request_reason,
@@ -105,6 +114,10 @@ chrome_options.add_argument("--disable-dev-shm-usage")
 # chrome_options.add_argument('--headless')  # 헤드리스 모드 
 driver = webdriver.Chrome(options=chrome_options)
 driver.maximize_window() 
+# 고정 sleep 대신 화면/네트워크 상태 기준 대기 (단계별 대기 시간 기록)
+waits = WaitEngine(driver)
+# 클릭이 보내는 요청도 network_idle이 세도록 페이지 이동 전에 XHR/fetch 카운터 등록
+waits.install_network_hook()
 chrome_options.add_argument("--disable-gpu")
 chrome_options.add_argument('--remote-debugging-port=9222')
 chrome_options.add_argument(
@@ -117,7 +130,7 @@ try:
     driver.get("https://shiftee.io/ko/accounts/login") 
 
     # 이메일 입력 
-    email_field = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "email-address"))) 
+    email_field = waits.until("login_form", EC.presence_of_element_located((By.ID, "email-address")))
     email_field.send_keys(EMAIL)
 
     # 비밀번호 입력
@@ -125,25 +138,31 @@ try:
     password_field.send_keys(PASSWORD) 
 
     # 로그인 버튼 클릭
-    login_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn.btn-primary.btn-block.mt-3"))
+    login_button = waits.until(
+        "login_button", EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn.btn-primary.btn-block.mt-3"))
     ) 
     login_button.click() 
 
-    time.sleep(2)
+    waits.until("login_redirect", EC.url_changes("https://shiftee.io/ko/accounts/login"), required=False)
     print("로그인 완료")
     
     print("요청 페이지로 이동")
     driver.get("https://shiftee.io/app/companies/1855160/manager/requests") 
+    waits.install_network_hook()  # CDP 등록이 안 된 driver는 여기서 주입 (필터 클릭 전)
 
-    dropdown_toggle = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, "sft-multi-select .btn-tertiary.dropdown-toggle"))
+    dropdown_toggle = waits.until(
+        "filter_toggle", EC.element_to_be_clickable((By.CSS_SELECTOR, "sft-multi-select .btn-tertiary.dropdown-toggle"))
     ) 
+    # 필터 적용 전 목록 (필터 적용 후 목록이 다시 그려졌는지 확인용)
+    waits.network_idle("page_load")
+    rows_before = driver.find_elements(By.CSS_SELECTOR, "tbody > tr")
+    requests_before = waits.request_count()
+
     dropdown_toggle.click() 
     print("드롭다운 토글 클릭")
 
-    dropdown_menu = WebDriverWait(driver, 10).until(
-        EC.visibility_of_element_located((By.CSS_SELECTOR, "div.dropdown-menu.show"))
+    dropdown_menu = waits.until(
+        "filter_menu", EC.visibility_of_element_located((By.CSS_SELECTOR, "div.dropdown-menu.show"))
     ) 
 
     select_all = dropdown_menu.find_element(By.CSS_SELECTOR, "a.sft-dropdown-item-select-all") 
@@ -158,7 +177,11 @@ try:
                 checkbox.click() 
     
     dropdown_toggle.click() 
-    time.sleep(2) 
+    # 필터 메뉴가 닫히고, 필터 요청이 끝나고, 이전 목록이 새 목록으로 바뀔 때까지
+    waits.until("filter_close", EC.invisibility_of_element_located((By.CSS_SELECTOR, "div.dropdown-menu.show")), required=False)
+    waits.network_idle("filter_apply", since=requests_before)
+    if rows_before:
+        waits.until("filter_rows", EC.staleness_of(rows_before[0]), timeout=5, required=False)
 
     # 거절된 요청 ID 저장
     rejected_requests = set()
@@ -168,8 +191,8 @@ try:
             print("요청 테이블 처리 시작")
 
             # 현재 화면에서 최신 row 목록 가져오기
-            table_rows = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr"))
+            table_rows = waits.until(
+                "table_rows", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tbody > tr"))
             )
 
             if not table_rows:
@@ -184,7 +207,6 @@ try:
 
                     # 이미 거절된 요청이라면 건너뛰기
                     if row_id in rejected_requests:
-                        time.sleep(2)
                         print(f"Row ID {row_id}는 이미 거절됨. 건너뜁니다.")
                         continue
 
@@ -196,12 +218,12 @@ try:
 
                     driver.execute_script("arguments[0].click();", request_detail_element)
 
-                    popup = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.sft-middle-item"))
+                    popup = waits.until(
+                        "popup_open", EC.visibility_of_element_located((By.CSS_SELECTOR, "div.sft-middle-item"))
                     )
 
-                    reason_elements = WebDriverWait(popup, 10).until(
-                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.sft-note"))
+                    reason_elements = waits.until(
+                        "popup_notes", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.sft-note")), target=popup
                     )
 
                     request_reason = [
@@ -215,45 +237,45 @@ try:
                         print(f"Row ID: {row_id}, 요청사유: {request_reason[0]}, 결정 및 사유: {decision}")
 
                         if "결정: 승인" in decision:
-                            approve_button = WebDriverWait(driver, 10).until(
-                                EC.element_to_be_clickable((By.XPATH, "//div[@class='sft-footer']//button[contains(text(), '승인')]"))
+                            approve_button = waits.until(
+                                "approve_button", EC.element_to_be_clickable((By.XPATH, "//div[@class='sft-footer']//button[contains(text(), '승인')]"))
                             )
                             driver.execute_script("arguments[0].click();", approve_button)
-                            time.sleep(2)
 
-                            final_approve_button = WebDriverWait(driver, 10).until(
-                                EC.element_to_be_clickable((By.XPATH, "//sft-action-request-modal//button[contains(text(), '승인하기')]"))
+                            final_approve_button = waits.until(
+                                "approve_modal", EC.element_to_be_clickable((By.XPATH, "//sft-action-request-modal//button[contains(text(), '승인하기')]"))
                             )
+                            requests_before = waits.request_count()
                             final_approve_button.click()
                             print(f"Row ID {row_id} 승인 완료.")
 
-                            # 승인 후 테이블 다시 새로고침
-                            time.sleep(2)
+                            # 승인 모달이 닫히고 테이블이 다시 그려질 때까지
+                            waits.until(
+                                "approve_done",
+                                EC.invisibility_of_element_located((By.CSS_SELECTOR, "sft-action-request-modal")),
+                                required=False,
+                            )
+                            waits.network_idle("approve_network", since=requests_before)
                             break  # for 루프 종료 후 다시 table_rows 가져옴
 
                         elif "결정: 거절" in decision:
                             print(f"Row ID {row_id} 거절됨. 이후 반복 처리 방지를 위해 저장.")
                             rejected_requests.add(row_id)  # 거절된 요청 저장
 
-                            time.sleep(2)
-                            
                             try:
                                 close_buttons = popup.find_elements(By.CSS_SELECTOR, "button.close")
                                 if close_buttons:
                                     driver.execute_script("arguments[0].click();", close_buttons[0])
                                     print("거절 팝업 닫기 완료")
-                                WebDriverWait(driver, 5).until(EC.invisibility_of_element(popup))
+                                waits.until("popup_close", EC.invisibility_of_element(popup), timeout=5)
                                 print("팝업 완전 종료 확인")
                             except Exception as e:
                                 print(f"거절 팝업 닫기 중 에러 발생, 무시하고 pass: {e}")
-                                
-                            time.sleep(2)
 
 
                             continue  # 다음 행으로 이동
                         
                     else:
-                        time.sleep(2)
                         print(f"Row ID: {row_id}, 요청 사유를 찾을 수 없습니다.")
 
                 except StaleElementReferenceException:
@@ -262,7 +284,6 @@ try:
 
             # 새로운 요청이 없으면 루프 종료
             if not new_requests_exist:
-                time.sleep(2)
                 print("처리할 새로운 요청이 없습니다. 루프 종료")
                 break  
 
@@ -273,5 +294,6 @@ try:
 
 
 finally:
+    print(f"대기 시간 (총 {waits.total_seconds()}초):", waits.summary())
     driver.quit()
     print("✅ WebDriver 종료 완료!")
\ No newline at end of file
@@ -0,0 +1,89 @@
+# 스크래핑 / 판단 / 승인 클릭 파이프라인
+# WebDriver는 스레드 안전하지 않으므로 브라우저 작업(행 읽기, 승인 클릭)은 메인 스레드 하나가 맡고,
+# 검색 + LLM 판단만 워커 스레드 풀에서 동시에 실행한다.
+#   메인 스레드: 행 읽기 -> submit -> (끝난 판단이 있으면) 승인/거절 반영 -> 다음 행 읽기 ...
+#   워커 스레드: decide(...) 결과를 완료 큐에 넣음
+# 진행 중인 판단이 max_pending개면 메인 스레드는 다음 행을 읽기 전에 결과를 기다리며 반영한다 (메모리/LLM 동시 호출 수 제한).
+# 단계별 사용 시간(scrape / decide / apply)을 모아서 어느 단계가 병목인지 보고한다.
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class DecisionPipeline:
+    def __init__(self, decide, workers=4, max_pending=None):
+        self.decide = decide
+        self.workers = workers
+        self.max_pending = max_pending or workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decision")
+        self._done = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.stage_seconds = {"scrape": 0.0, "decide": 0.0, "apply": 0.0}
+        self.counts = {"submitted": 0, "decided": 0, "failed": 0}
+
+    def _run(self, key, args):
+        start = time.perf_counter()
+        try:
+            self._done.put((key, self.decide(*args), None))
+        except Exception as e:
+            self._done.put((key, None, e))
+        finally:
+            with self._lock:
+                self.stage_seconds["decide"] += time.perf_counter() - start
+
+    # 행 하나의 판단을 워커에 넘김 (key: 결과를 반영할 때 쓸 행 정보)
+    def submit(self, key, *args):
+        self._pending += 1
+        self.counts["submitted"] += 1
+        self._executor.submit(self._run, key, args)
+
+    @property
+    def full(self):
+        return self._pending >= self.max_pending
+
+    @property
+    def pending(self):
+        return self._pending
+
+    # 완료된 판단 -> [(key, 결과, 예외)] (block=True면 하나 이상 끝날 때까지 대기)
+    def completed(self, block=False):
+        results = []
+        if block and self._pending:
+            results.append(self._done.get())
+        while True:
+            try:
+                results.append(self._done.get_nowait())
+            except queue.Empty:
+                break
+        self._pending -= len(results)
+        for _, _, error in results:
+            self.counts["failed" if error is not None else "decided"] += 1
+        return results
+
+    # 메인 스레드 단계 시간 기록용: with pipeline.stage("scrape"): ...
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - start
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def report(self):
+        wall = time.perf_counter() - self._started
+        return {
+            "workers": self.workers,
+            "wall_seconds": round(wall, 2),
+            # decide는 워커 시간의 합이므로 workers로 나눈 값이 실제 점유 시간
+            "stage_seconds": {name: round(seconds, 2) for name, seconds in self.stage_seconds.items()},
+            "sequential_estimate_seconds": round(sum(self.stage_seconds.values()), 2),
+            **self.counts,
+        }
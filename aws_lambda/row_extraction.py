@@ -0,0 +1,69 @@
+# 요청 테이블 행 읽기를 execute_script 한 번으로 처리
+# 행마다 find_element / .text / get_attribute / is_displayed를 부르면 행 수 x 여러 번의 WebDriver 왕복이 생긴다.
+# ROWS_SCRIPT는 브라우저 안에서 모든 "tbody > tr"을 훑어 JSON 문자열 하나로 돌려준다.
+#   row_id: 체크박스의 sft-data-table-row-id
+#   detail: 요청 상세(요청 종류) 텍스트
+#   notes : 행 안에 보이는 요청 사유(div.sft-note) 텍스트 목록 (행에 없으면 빈 목록 -> 팝업에서 읽어야 함)
+# 요청 사유가 팝업에만 있는 경우에도 행 찾기 + 클릭(OPEN_DETAIL_SCRIPT)과 사유 읽기(POPUP_NOTES_SCRIPT)를
+# 각각 execute_script 한 번으로 처리한다.
+# 환경 변수 ROW_EXTRACTION=popup이면 예전처럼 행마다 요소를 찾아 팝업을 열어 읽는다.
+
+import json
+import os
+
+ROW_EXTRACTION = os.getenv("ROW_EXTRACTION", "script")
+
+ROWS_SCRIPT = """
+const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const rows = Array.from(document.querySelectorAll("tbody > tr")).map((tr) => {
+    const checkbox = tr.querySelector("input.sft-table-row-checkbox");
+    const detail = tr.querySelector("td.sft-request-tags-table div.sft-request-detail");
+    const notes = Array.from(tr.querySelectorAll("div.sft-note"))
+        .filter(visible)
+        .map((note) => note.innerText.trim())
+        .filter((text) => text);
+    return {
+        row_id: checkbox ? checkbox.getAttribute("sft-data-table-row-id") : null,
+        detail: detail ? detail.innerText.trim() : null,
+        notes: notes,
+    };
+});
+return JSON.stringify(rows.filter((row) => row.row_id));
+"""
+
+# arguments[0] 행의 요청 상세를 클릭 (행이 없으면 false)
+OPEN_DETAIL_SCRIPT = """
+const checkbox = document.querySelector(
+    'input.sft-table-row-checkbox[sft-data-table-row-id="' + CSS.escape(arguments[0]) + '"]'
+);
+const detail = checkbox && checkbox.closest("tr").querySelector("td.sft-request-tags-table div.sft-request-detail");
+if (!detail) {
+    return false;
+}
+detail.click();
+return true;
+"""
+
+# arguments[0] 팝업 안에 보이는 요청 사유 텍스트 목록
+POPUP_NOTES_SCRIPT = """
+const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+return Array.from(arguments[0].querySelectorAll("div.sft-note"))
+    .filter(visible)
+    .map((note) => note.innerText.trim())
+    .filter((text) => text);
+"""
+
+
+# 현재 화면의 행 목록 -> [{"row_id", "detail", "notes"}, ...] (WebDriver 호출 한 번)
+def extract_rows(driver):
+    return json.loads(driver.execute_script(ROWS_SCRIPT) or "[]")
+
+
+# row_id 행의 요청 상세 팝업 열기 (WebDriver 호출 한 번, 행이 없으면 False)
+def open_detail(driver, row_id):
+    return bool(driver.execute_script(OPEN_DETAIL_SCRIPT, row_id))
+
+
+# 열린 팝업의 요청 사유 목록 (WebDriver 호출 한 번)
+def popup_notes(driver, popup):
+    return driver.execute_script(POPUP_NOTES_SCRIPT, popup) or []
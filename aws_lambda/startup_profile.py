@@ -0,0 +1,140 @@
+# Lambda 시작 시간 측정
+#   python startup_profile.py imports [--output import_profile.txt]
+#       python -X importtime으로 lambda_main import를 측정해서 모듈(최상위 패키지)별 누적 시간 순으로 정리
+#       (Dockerfile에서 이미지 빌드 때 실행해 /var/task/import_profile.txt로 포함)
+#   python startup_profile.py cold-start [--runs 5] [--history cold_start_history.jsonl]
+#       새 프로세스에서 import + handler({"health_check": true})까지 걸린 시간을 여러 번 재고
+#       결과를 history 파일에 한 줄씩 추가 (이전 측정과 비교)
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+COLD_START_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import lambda_main
+imported = time.perf_counter()
+response = lambda_main.handler({"health_check": True}, None)
+print(json.dumps({
+    "import_seconds": imported - start,
+    "first_call_seconds": time.perf_counter() - imported,
+    "status_code": response["statusCode"],
+}))
+"""
+
+
+def _run_python(args):
+    return subprocess.run([sys.executable, *args], cwd=HERE, capture_output=True, text=True)
+
+
+# -X importtime 출력: "import time: self [us] | cumulative | imported package"
+def parse_importtime(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def profile_imports(module="lambda_main", top=30):
+    result = _run_python(["-X", "importtime", "-c", f"import {module}"])
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} import 실패:\n{result.stderr[-2000:]}")
+    entries = parse_importtime(result.stderr)
+
+    # 최상위 패키지별 self 시간 합계 (langchain_core.xxx -> langchain_core)
+    packages = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        packages[name.split(".")[0]] += self_us
+    total_us = sum(packages.values())
+
+    lines = [f"{module} import 합계: {total_us / 1000:.1f}ms (모듈 {len(entries)}개)", ""]
+    lines.append("패키지별 (self 합계)")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:9.1f}ms  {package}")
+    lines.append("")
+    lines.append(f"{module}이 직접 import한 모듈 (누적)")
+    for name, cumulative_us in sorted(direct_imports(entries, module), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {cumulative_us / 1000:9.1f}ms  {name}")
+    return "\n".join(lines)
+
+
+# importtime은 하위 모듈을 상위 모듈보다 먼저 출력하므로, module 줄 직전까지 모인 depth 1 항목이 직접 import한 모듈
+def direct_imports(entries, module):
+    children = []
+    for name, _, cumulative_us, depth in entries:
+        if depth == 1:
+            children.append((name, cumulative_us))
+        elif depth == 0:
+            if name == module:
+                return children
+            children = []
+    return []
+
+
+def measure_cold_start(runs=5):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = _run_python(["-c", COLD_START_SCRIPT])
+        total = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"측정 실패:\n{result.stderr[-2000:]}")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample["process_seconds"] = total
+        samples.append(sample)
+
+    def summary(key):
+        values = [sample[key] for sample in samples]
+        return {"median": round(statistics.median(values), 4), "max": round(max(values), 4)}
+
+    return {
+        "measured_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "runs": runs,
+        "status_codes": sorted({sample["status_code"] for sample in samples}),
+        "import_seconds": summary("import_seconds"),
+        "first_call_seconds": summary("first_call_seconds"),
+        "process_seconds": summary("process_seconds"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    imports_parser = subparsers.add_parser("imports", help="import 시간 프로파일")
+    imports_parser.add_argument("--output", help="결과를 저장할 파일 (지정하지 않으면 출력만)")
+    imports_parser.add_argument("--top", type=int, default=30)
+    cold_parser = subparsers.add_parser("cold-start", help="새 프로세스 기준 콜드 스타트 시간 측정")
+    cold_parser.add_argument("--runs", type=int, default=5)
+    cold_parser.add_argument("--history", default="cold_start_history.jsonl", help="측정 결과를 추가할 파일")
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        report = profile_imports(top=args.top)
+        print(report)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+    else:
+        history = []
+        if os.path.exists(args.history):
+            with open(args.history, encoding="utf-8") as f:
+                history = [json.loads(line) for line in f if line.strip()]
+        report = measure_cold_start(args.runs)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if history:
+            previous = history[-1]["process_seconds"]["median"]
+            print(f"이전 측정 대비: {previous:.3f}초 -> {report['process_seconds']['median']:.3f}초")
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
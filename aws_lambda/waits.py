@@ -0,0 +1,124 @@
+# 고정 time.sleep 대신 화면/네트워크 상태를 기준으로 기다리는 유틸리티
+# - until(step, condition): selenium expected_conditions 조건이 만족될 때까지 짧은 간격으로 확인
+# - network_idle(step): 페이지의 XHR/fetch가 모두 끝나고 idle_ms 동안 새 요청이 없을 때까지 대기
+#   XHR/fetch 카운터는 install_network_hook()으로 클릭 전에 주입해야 클릭이 보낸 요청도 센다.
+#   Chrome이면 CDP Page.addScriptToEvaluateOnNewDocument로 등록해서 페이지를 이동해도 페이지 스크립트보다 먼저 설치되고,
+#   그 밖의 driver는 driver.get(...) 직후마다 install_network_hook()을 다시 부른다.
+#   since=request_count()를 넘기면 그 이후 시작된 요청이 하나 이상 있어야 통과 (클릭 직후 요청이 시작되기 전에 통과하지 않도록)
+# 단계(step)마다 실제로 기다린 시간과 타임아웃 횟수를 기록하고 summary()로 보고한다.
+# 보고된 p95/max를 보고 단계별 timeout을 조정하면 된다.
+# 환경 변수: WAIT_TIMEOUT (기본 10초), WAIT_POLL (기본 0.05초), WAIT_IDLE_MS (기본 300ms)
+
+import os
+import time
+from collections import defaultdict
+
+# 페이지에 XHR/fetch 카운터 설치 (이미 있으면 그대로, CDP 등록용이므로 return 없음)
+NETWORK_HOOK_SCRIPT = """
+if (!window.__sftNetwork) {
+    const state = window.__sftNetwork = {pending: 0, total: 0, last: Date.now()};
+    const start = () => { state.pending++; state.total++; state.last = Date.now(); };
+    const end = () => { state.pending = Math.max(0, state.pending - 1); state.last = Date.now(); };
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        start();
+        this.addEventListener("loadend", end);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        const fetch = window.fetch;
+        window.fetch = function () {
+            start();
+            return fetch.apply(this, arguments).finally(end);
+        };
+    }
+}
+"""
+
+# [진행 중 요청 수, 마지막 요청 이후 ms, readyState, 시작된 요청 수] (카운터가 없으면 설치 후 반환)
+NETWORK_STATE_SCRIPT = NETWORK_HOOK_SCRIPT + """
+const state = window.__sftNetwork;
+return [state.pending, Date.now() - state.last, document.readyState, state.total];
+"""
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class WaitEngine:
+    def __init__(self, driver, timeout=None, poll=None, idle_ms=None):
+        self.driver = driver
+        self.timeout = timeout or float(os.getenv("WAIT_TIMEOUT", "10"))
+        self.poll = poll or float(os.getenv("WAIT_POLL", "0.05"))
+        self.idle_ms = idle_ms or int(os.getenv("WAIT_IDLE_MS", "300"))
+        self.durations = defaultdict(list)
+        self.timeouts = defaultdict(int)
+        self._cdp_hook = False
+
+    def _record(self, step, start, timed_out=False):
+        self.durations[step].append(time.perf_counter() - start)
+        if timed_out:
+            self.timeouts[step] += 1
+
+    # condition(driver)가 참이 될 때까지 대기 후 그 값을 반환
+    # 타임아웃이면 TimeoutException, required=False면 기록만 남기고 None 반환
+    # target: 팝업 등 특정 요소 안에서 찾을 때 (기본은 driver)
+    def until(self, step, condition, timeout=None, target=None, required=True):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(target or self.driver, timeout or self.timeout, poll_frequency=self.poll).until(condition)
+        except TimeoutException:
+            self._record(step, start, timed_out=True)
+            if required:
+                raise
+            print(f"[wait] {step}: {timeout or self.timeout}초 안에 조건이 만족되지 않았지만 계속 진행합니다.")
+            return None
+        self._record(step, start)
+        return result
+
+    # XHR/fetch 카운터를 현재 페이지에 설치하고, Chrome이면 이후 이동하는 페이지에도 자동으로 설치되도록 등록
+    def install_network_hook(self):
+        if not self._cdp_hook and hasattr(self.driver, "execute_cdp_cmd"):
+            try:
+                self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_HOOK_SCRIPT})
+                self._cdp_hook = True
+            except Exception as e:
+                print(f"[wait] CDP로 네트워크 카운터를 등록할 수 없어 페이지마다 주입합니다: {e}")
+        self.driver.execute_script(NETWORK_HOOK_SCRIPT)
+
+    # 지금까지 시작된 XHR/fetch 수 (클릭 전에 읽어서 network_idle(since=...)에 전달)
+    def request_count(self):
+        return self.driver.execute_script(NETWORK_STATE_SCRIPT)[3]
+
+    def _network_state(self, driver, since=None):
+        pending, idle_ms, ready_state, total = driver.execute_script(NETWORK_STATE_SCRIPT)
+        if since is not None and total <= since:
+            return False
+        return ready_state == "complete" and pending == 0 and idle_ms >= self.idle_ms
+
+    # 진행 중인 XHR/fetch가 없고 idle_ms 동안 조용하면 통과 (타임아웃이어도 예외 없이 진행)
+    # since: request_count() 값, 그 이후 시작된 요청이 있어야 통과
+    def network_idle(self, step, timeout=None, since=None):
+        return self.until(step, lambda driver: self._network_state(driver, since), timeout=timeout, required=False)
+
+    def summary(self):
+        report = {}
+        for step, durations in sorted(self.durations.items()):
+            report[step] = {
+                "count": len(durations),
+                "total": round(sum(durations), 3),
+                "mean": round(sum(durations) / len(durations), 3),
+                "p50": round(_percentile(durations, 50), 3),
+                "p95": round(_percentile(durations, 95), 3),
+                "max": round(max(durations), 3),
+                "timeouts": self.timeouts.get(step, 0),
+            }
+        return report
+
+    def total_seconds(self):
+        return round(sum(sum(durations) for durations in self.durations.values()), 3)
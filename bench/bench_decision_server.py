@@ -0,0 +1,141 @@
+# 판단 서버 부하 테스트: 초당 처리량(requests/sec)과 p50/p99 지연 측정
+#
+# 단독 실행 (이미 떠 있는 서버 측정):
+#   python bench/bench_decision_server.py --url http://127.0.0.1:5000/ --requests 500 --concurrency 100
+#
+# 비교 실행 (stub 모델 서버 + Flask(app.py) + 비동기(async_app.py)를 차례로 띄워 before/after 비교):
+#   python bench/bench_decision_server.py --compare --requests 500 --concurrency 100
+
+import argparse
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+async def run_load(url, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def one():
+            nonlocal errors
+            # 규칙 엔진/캐시를 타지 않도록 매번 다른 기타업무 사유 사용
+            form = {"request_type": "(업무)기타업무 (휴게 X)", "request_reason": f"벤치마크 {uuid.uuid4().hex}"}
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(url, data=form) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def wait_for_port(url, timeout=30):
+    async def probe():
+        deadline = time.time() + timeout
+        async with aiohttp.ClientSession() as session:
+            while time.time() < deadline:
+                try:
+                    async with session.get(url) as response:
+                        await response.read()
+                        return True
+                except aiohttp.ClientError:
+                    await asyncio.sleep(0.2)
+        return False
+    return asyncio.run(probe())
+
+
+def start(args, env, cwd):
+    return subprocess.Popen([sys.executable] + args, cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def compare(total, concurrency, latency):
+    stub_port, server_port = 8600, 5055
+    # 벤치마크 중 생성되는 로그/캐시 파일은 임시 디렉터리에 기록
+    workdir = tempfile.mkdtemp(prefix="decision_bench_")
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT,
+        "OPENAI_API_BASE": f"http://127.0.0.1:{stub_port}/v1",
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "sk-bench"),
+        "DECISION_CACHE_PATH": os.path.join(workdir, "decision_cache.sqlite3"),
+        "PORT": str(server_port),
+    })
+    stub = start([os.path.join(ROOT, "bench", "stub_model_server.py"),
+                  "--port", str(stub_port), "--latency", str(latency)], env, workdir)
+    results = {}
+    try:
+        servers = {
+            "flask (before)": ["-c", f"import app; app.app.run(host='127.0.0.1', port={server_port}, threaded=True)"],
+            "async (after)": [os.path.join(ROOT, "async_app.py")],
+        }
+        url = f"http://127.0.0.1:{server_port}/"
+        for name, command in servers.items():
+            server = start(command, env, workdir)
+            try:
+                if not wait_for_port(url):
+                    raise RuntimeError(f"{name} 서버가 시작되지 않았습니다.")
+                results[name] = asyncio.run(run_load(url, total, concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(f"\n모델 지연 {latency}s, 요청 {total}건, 동시 {concurrency}")
+    print(f"{'server':<16}{'rps':>10}{'p50(ms)':>12}{'p99(ms)':>12}{'errors':>8}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['rps']:>10}{result['p50_ms']:>12}{result['p99_ms']:>12}{result['errors']:>8}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:5000/")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=1.0, help="--compare 시 stub 모델 지연(초)")
+    parser.add_argument("--compare", action="store_true")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.requests, args.concurrency, args.latency)
+    else:
+        print(asyncio.run(run_load(args.url, args.requests, args.concurrency)))
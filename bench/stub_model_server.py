@@ -0,0 +1,61 @@
+# 벤치마크용 로컬 모델 서버 (OpenAI chat completions 응답 형식을 흉내냄)
+# 실행: python bench/stub_model_server.py --port 8600 --latency 1.0
+# 판단 서버는 OPENAI_API_BASE=http://127.0.0.1:8600/v1 로 실행하면 이 서버를 호출한다.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+
+def create_app(latency, jitter):
+    async def chat_completions(request):
+        body = await request.json()
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        if body.get("stream"):
+            return await stream(request, body)
+        return web.json_response({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "승인"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 1, "total_tokens": 1},
+        })
+
+    # stream=True 요청은 토큰 단위 SSE 청크로 응답
+    async def stream(request, body):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in ["승인", "\n", "사유: ", "요청 ", "사유가 ", "명확함"]:
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await asyncio.sleep(0.02)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency", type=float, default=1.0, help="응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency, args.jitter), host="127.0.0.1", port=args.port)
@@ -0,0 +1,88 @@
+# 신뢰도 기반 cascade: 로컬 분류기(TF-IDF + 보정된 RandomForest)가 승인 확률이 높다고 판단한 요청은 바로 승인하고,
+# 확신이 낮은 요청만 LLM(RAG + gpt-4o) 단계로 넘긴다.
+# 카테고리별 임계값은 decision_rules.json의 "cascade" 항목에서 설정한다.
+# 각 단계(rule / cache / classifier / llm)가 처리한 비율은 TierStats로 집계한다.
+
+import os
+import threading
+from collections import Counter, namedtuple
+
+from metrics import DECISION_TIERS
+from model_holder import ModelHolder
+
+CascadeDecision = namedtuple("CascadeDecision", ["decision", "probability", "category"])
+
+APPROVED_LABEL = 1  # test.py 학습 시 '승인됨' -> 1
+
+
+class TierStats:
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, tier):
+        with self._lock:
+            self.counts[tier] += 1
+        DECISION_TIERS.inc(tier=tier)
+
+    def report(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {
+            "total": total,
+            "tiers": {
+                tier: {"count": count, "fraction": round(count / total, 4) if total else 0.0}
+                for tier, count in counts.items()
+            },
+        }
+
+
+class ConfidenceCascade:
+    def __init__(self, holder, rule_engine, default_threshold=0.97, thresholds=None):
+        self.holder = holder
+        self.rule_engine = rule_engine
+        self.default_threshold = default_threshold
+        self.thresholds = thresholds or {}
+
+    @classmethod
+    def from_config(cls, holder, rule_engine):
+        config = rule_engine.config.get("cascade", {})
+        return cls(holder, rule_engine, config.get("default_threshold", 0.97), config.get("thresholds", {}))
+
+    # 학습 데이터와 같은 형식('(업무)회의 사유')으로 입력 텍스트 구성
+    def _input_text(self, request_type, request_reason):
+        category = self.rule_engine.match_category(request_type)
+        if category is not None:
+            name = category.get("name", request_type)
+        else:
+            name = request_type.split('/')[-1].strip()
+        return name + ' ' + request_reason, category["key"] if category else None
+
+    def approve_probability(self, request_type, request_reason):
+        model, vectorizer = self.holder.get()
+        input_text, category = self._input_text(request_type, request_reason)
+        probabilities = model.predict_proba(vectorizer.transform([input_text]))[0]
+        classes = list(model.classes_)
+        if APPROVED_LABEL not in classes:
+            return 0.0, category
+        return float(probabilities[classes.index(APPROVED_LABEL)]), category
+
+    def threshold_for(self, category):
+        return self.thresholds.get(category, self.default_threshold)
+
+    # 승인 확률이 임계값 이상이면 승인, 아니면 None (LLM 단계로)
+    def decide(self, request_type, request_reason):
+        probability, category = self.approve_probability(request_type, request_reason)
+        if probability >= self.threshold_for(category):
+            return CascadeDecision("승인", probability, category)
+        return None
+
+
+# 모델 파일이 있을 때만 cascade 활성화 (없으면 None → 기존처럼 LLM만 사용)
+def load_cascade(rule_engine, model_path, vectorizer_path, poll_interval=0):
+    if not (os.path.exists(model_path) and os.path.exists(vectorizer_path)):
+        print(f"로컬 분류기 파일이 없어 cascade를 사용하지 않습니다: {model_path}, {vectorizer_path}")
+        return None
+    holder = ModelHolder(model_path, vectorizer_path, poll_interval=poll_interval)
+    return ConfidenceCascade.from_config(holder, rule_engine)
@@ -0,0 +1,112 @@
+# 검색 결과 -> 프롬프트 {context} 조합
+# 검색된 청크를 그대로 이어 붙이면 거의 같은 과거 요청 행이 여러 번 들어가서 프롬프트만 길어진다.
+# ContextAssembler는 유사도 순으로
+#   1) 유사도가 min_score 미만인 청크 제외 (FAISS L2 거리 -> 코사인 유사도, 단위 벡터 기준 1 - d/2)
+#   2) 공백/대소문자만 다른 중복 청크 제외
+#   3) 글자 3-gram Jaccard 유사도가 near_duplicate 이상인 청크 제외 (이미 넣은 청크 기준)
+#   4) 남은 청크를 max_tokens 안에 들어가는 만큼만 추가
+# 하고 결과를 줄바꿈으로 이어 붙인다.
+# 기본값은 환경 변수 CONTEXT_MAX_TOKENS, CONTEXT_MIN_SCORE, CONTEXT_NEAR_DUPLICATE, CONTEXT_CANDIDATES.
+
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from prompt_registry import count_tokens
+
+# 중복 제거/점수 컷 후에도 남도록 검색 시 가져올 후보 수
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "8"))
+
+
+# FAISS IndexFlatL2 거리(제곱 L2) -> 코사인 유사도 (OpenAI/hashed 임베딩은 모두 단위 벡터)
+def similarity_from_distance(distance):
+    return 1.0 - distance / 2.0
+
+
+def _normalize_text(text):
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().lower()
+
+
+def _shingles(text, n=3):
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextAssembler:
+    def __init__(self, max_tokens=None, min_score=None, near_duplicate=None, separator="\n"):
+        self.max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", "600"))
+        self.min_score = min_score if min_score is not None else float(os.getenv("CONTEXT_MIN_SCORE", "0.3"))
+        self.near_duplicate = near_duplicate if near_duplicate is not None else float(os.getenv("CONTEXT_NEAR_DUPLICATE", "0.85"))
+        self.separator = separator
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    # 예산보다 긴 청크는 앞부분만 사용 (첫 청크가 예산을 넘어도 context가 비지 않도록)
+    def _truncate(self, text, budget):
+        tokens = count_tokens(text)
+        while text and tokens > budget:
+            text = text[:max(1, len(text) * budget // tokens) - 1]
+            tokens = count_tokens(text)
+        return text, tokens
+
+    # [(Document, 거리), ...] (가까운 순) -> context 문자열
+    def assemble(self, scored_documents):
+        counts = Counter()
+        selected = []
+        seen = set()
+        selected_shingles = []
+        used_tokens = 0
+        separator_tokens = count_tokens(self.separator)
+
+        for document, distance in sorted(scored_documents, key=lambda item: item[1]):
+            counts["candidates"] += 1
+            if similarity_from_distance(distance) < self.min_score:
+                counts["below_min_score"] += 1
+                continue
+            normalized = _normalize_text(document.page_content)
+            if not normalized or normalized in seen:
+                counts["duplicates"] += 1
+                continue
+            shingles = _shingles(normalized)
+            if any(_jaccard(shingles, other) >= self.near_duplicate for other in selected_shingles):
+                counts["near_duplicates"] += 1
+                continue
+
+            text = document.page_content.strip()
+            tokens = count_tokens(text) + (separator_tokens if selected else 0)
+            if used_tokens + tokens > self.max_tokens:
+                if selected:
+                    counts["over_budget"] += 1
+                    continue
+                text, tokens = self._truncate(text, self.max_tokens)
+                counts["truncated"] += 1
+
+            seen.add(normalized)
+            selected_shingles.append(shingles)
+            selected.append(text)
+            used_tokens += tokens
+            counts["selected"] += 1
+
+        counts["tokens"] = used_tokens
+        with self._lock:
+            self.counts.update(counts)
+        return self.separator.join(selected)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            "max_tokens": self.max_tokens,
+            "min_score": self.min_score,
+            "near_duplicate": self.near_duplicate,
+            **counts,
+        }
@@ -0,0 +1,147 @@
+# 요청 판단 결과 캐시 (메모리 LRU + 로컬 SQLite 저장소)
+# - 키: 정규화된 (요청 종류, 요청 사유)
+# - 버전: 모델 id + 프롬프트 텍스트 해시 → 모델/프롬프트가 바뀌면 기존 결과는 자동으로 무효화
+# - TTL이 지난 결과와 LRU 초과분은 제거
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_whitespace = re.compile(r"\s+")
+
+
+# 캐시 키 생성을 위한 문자열 정규화 (유니코드 NFKC, 공백 정리, 소문자)
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text or "")
+    return _whitespace.sub(" ", text).strip().lower()
+
+
+def make_key(request_type, request_reason):
+    raw = normalize_text(request_type) + "\x1f" + normalize_text(request_reason)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# 모델 id와 프롬프트 텍스트로 버전 태그 생성
+def make_version(model_id, *prompt_texts):
+    digest = hashlib.sha256(model_id.encode("utf-8"))
+    for text in prompt_texts:
+        digest.update(b"\x1e")
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class DecisionCache:
+    def __init__(self, path, version, max_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> (decision, created_at)
+        self._touched = {}  # 디스크에 아직 반영하지 않은 접근 시간
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, decision TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_accessed ON decisions(accessed_at)")
+        # 버전이 다른 결과와 만료된 결과는 시작 시 정리
+        self._conn.execute(
+            "DELETE FROM decisions WHERE version != ? OR created_at < ?",
+            (self.version, time.time() - self.ttl),
+        )
+        self._conn.commit()
+        self._warm_up()
+
+    # 최근 사용 순으로 디스크 캐시를 메모리에 적재
+    def _warm_up(self):
+        rows = self._conn.execute(
+            "SELECT key, decision, created_at FROM decisions ORDER BY accessed_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, decision, created_at in reversed(rows):
+            self._memory[key] = (decision, created_at)
+
+    def get(self, request_type, request_reason):
+        key = make_key(request_type, request_reason)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or now - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._memory[key]
+                    self._conn.execute("DELETE FROM decisions WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            # 접근 시간은 메모리 순서로 관리하고, 디스크에는 모아서 반영
+            self._touched[key] = now
+            if len(self._touched) >= 100:
+                self._flush_touched()
+                self._conn.commit()
+            return entry[0]
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE decisions SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def set(self, request_type, request_reason, decision):
+        key = make_key(request_type, request_reason)
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            self._memory[key] = (decision, now)
+            self._memory.move_to_end(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO decisions (key, version, decision, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, self.version, decision, now, now),
+            )
+            while len(self._memory) > self.max_entries:
+                old_key, _ = self._memory.popitem(last=False)
+                self._conn.execute("DELETE FROM decisions WHERE key = ?", (old_key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._conn.execute("DELETE FROM decisions")
+            self._conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "version": self.version,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,176 @@
+# 판단 결과 기록 (append-only SQLite WAL 로그)
+# - 요청 처리 스레드는 큐에 넣기만 하고(O(1)), 백그라운드 writer 스레드가 모아서 INSERT
+#   큐에 있는 기록은 메모리에만 있으므로, 정상 종료(close/atexit)가 아닌 프로세스 강제 종료 시에는
+#   아직 저장되지 않은 기록(보통 마지막 몇 건)이 유실될 수 있다.
+# - 엑셀(xlsx)은 요청 시 또는 주기적으로 로그 전체를 내보내서 생성
+# - 로그가 비어 있을 때 export_path에 기존 엑셀(예전 save_to_excel이 쌓던 user_requests.xlsx)이 있으면
+#   그 기록을 먼저 한 번 가져온다. 내보내기가 같은 파일을 덮어써도 이전 기록이 사라지지 않는다.
+# 내보내기: python decision_log.py export --db ./logs/decisions.sqlite3 --out user_requests.xlsx
+
+import argparse
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+COLUMNS = ['시간', '요청 종류', '요청 사유', '판단 결과']
+
+_STOP = object()
+
+
+class DecisionLog:
+    def __init__(self, path, export_path=None, export_interval=0, batch_size=500):
+        self.path = path
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._written = 0
+        self._exported = 0
+        self._export_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT NOT NULL, "
+            "request_type TEXT, request_reason TEXT, decision TEXT)"
+        )
+        conn.commit()
+        try:
+            self._import_workbook(conn)
+        finally:
+            conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="decision-log-writer", daemon=True)
+        self._writer.start()
+        if export_path and export_interval:
+            self._exporter = threading.Thread(target=self._export_loop, name="decision-log-exporter", daemon=True)
+            self._exporter.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # 빈 로그에 export_path의 기존 엑셀 기록을 가져옴 (가져온 건수 반환)
+    # 읽을 수 없는 파일이면 예외: 내보내기가 그 파일을 덮어써서 기록을 잃지 않도록 시작하지 않음
+    def _import_workbook(self, conn):
+        if not self.export_path or not os.path.exists(self.export_path):
+            return 0
+        if conn.execute("SELECT 1 FROM decisions LIMIT 1").fetchone():
+            return 0
+        import pandas as pd
+
+        df = pd.read_excel(self.export_path)
+        missing = [column for column in COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"{self.export_path}에 판단 로그 컬럼이 없습니다: {missing}")
+        df = df[COLUMNS].astype(object)
+        df = df.where(df.notna(), None)
+        rows = [
+            (str(created_at) if created_at is not None else "", request_type, request_reason, decision)
+            for created_at, request_type, request_reason, decision in df.itertuples(index=False, name=None)
+        ]
+        conn.executemany(
+            "INSERT INTO decisions (created_at, request_type, request_reason, decision) VALUES (?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        print(f"기존 엑셀 기록 {len(rows)}건을 판단 로그로 가져왔습니다: {self.export_path}")
+        return len(rows)
+
+    def append(self, request_type, request_reason, decision):
+        self.append_many([(request_type, request_reason, decision)])
+
+    def append_many(self, rows):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for request_type, request_reason, decision in rows:
+            self._queue.put((now, request_type, request_reason, decision))
+
+    # 큐에 쌓인 기록을 모아서 한 트랜잭션으로 저장
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = _STOP in items
+            batch = [item for item in items if item is not _STOP]
+            if batch:
+                try:
+                    conn.executemany(
+                        "INSERT INTO decisions (created_at, request_type, request_reason, decision) VALUES (?, ?, ?, ?)",
+                        batch,
+                    )
+                    conn.commit()
+                    self._written += len(batch)
+                except sqlite3.Error as e:
+                    print(f"판단 로그 저장 중 오류: {e}")
+            # 저장이 끝난 뒤에 완료 처리해야 flush()가 커밋까지 기다림
+            for _ in items:
+                self._queue.task_done()
+        conn.close()
+
+    def _export_loop(self):
+        while not self._closed:
+            time.sleep(self.export_interval)
+            if self._written != self._exported:
+                try:
+                    self.export_xlsx()
+                except Exception as e:
+                    print(f"엑셀 내보내기 중 오류: {e}")
+
+    # 대기 중인 기록이 모두 저장될 때까지 대기
+    def flush(self):
+        self._queue.join()
+
+    def export_xlsx(self, export_path=None):
+        import pandas as pd
+
+        export_path = export_path or self.export_path or "user_requests.xlsx"
+        self.flush()
+        with self._export_lock:
+            written = self._written
+            conn = self._connect()
+            try:
+                df = pd.read_sql_query(
+                    "SELECT created_at, request_type, request_reason, decision FROM decisions ORDER BY id", conn
+                )
+            finally:
+                conn.close()
+            df.columns = COLUMNS
+            # 임시 파일에 쓴 뒤 교체하여 내보내기 도중에도 기존 파일은 온전하게 유지
+            tmp_path = export_path + ".tmp.xlsx"
+            df.to_excel(tmp_path, index=False)
+            os.replace(tmp_path, export_path)
+            self._exported = written
+        return export_path
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--db", default="./logs/decisions.sqlite3")
+    parser.add_argument("--out", default="user_requests.xlsx")
+    args = parser.parse_args()
+
+    log = DecisionLog(args.db)
+    print(f"엑셀 파일로 내보냈습니다: {log.export_xlsx(args.out)}")
+    log.close()
@@ -0,0 +1,152 @@
+# 임베딩 백엔드 선택
+# - openai : OpenAIEmbeddings (원격 호출, 디스크 임베딩 캐시로 감쌈)
+# - hashed : 글자 n-gram 해싱 + (선택) SVD 차원 축소, NumPy로 로컬 CPU에서 계산 (네트워크 불필요)
+# 인덱스를 만들 때 사용한 설정은 벡터 스토어 폴더의 embedding.json에 기록되고,
+# 검색 쪽은 get_embeddings(store_path=...)로 같은 설정을 그대로 사용한다.
+# 인덱스가 없을 때의 기본값은 환경 변수 EMBEDDING_BACKEND (openai | hashed), EMBEDDING_DIM.
+
+import json
+import os
+import unicodedata
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CONFIG_FILE = "embedding.json"
+SVD_FILE = "embedding_svd.npz"
+BACKENDS = ("openai", "hashed")
+
+_MULTIPLIER = np.uint64(0x100000001B3)  # FNV prime (n-gram 해시용)
+_MASK = np.uint64(0xFFFFFFFF)
+
+
+class HashedNgramEmbeddings(Embeddings):
+    def __init__(self, dim=1024, ngram_range=(1, 3), svd_components=0, svd_path=None):
+        self.dim = dim
+        self.ngram_range = tuple(ngram_range)
+        self.svd_components = svd_components
+        self.svd_path = svd_path
+        self.components = None  # (svd_components, dim) 투영 행렬
+        if svd_components and svd_path and os.path.exists(svd_path):
+            components = np.load(svd_path)["components"]
+            if components.shape == (svd_components, dim):
+                self.components = components
+
+    @property
+    def needs_fit(self):
+        return bool(self.svd_components) and self.components is None
+
+    # 문장 하나의 해시 버킷별 가중치 (n-gram 해시는 코드포인트 배열에 대한 NumPy 연산으로 계산)
+    def _hashed_counts(self, text):
+        text = unicodedata.normalize("NFKC", text).lower()
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        buckets = []
+        signs = []
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            if len(codes) < n:
+                break
+            hashes = np.full(len(codes) - n + 1, n, dtype=np.uint64)
+            for offset in range(n):
+                hashes = ((hashes * _MULTIPLIER) ^ codes[offset:len(codes) - n + 1 + offset]) & _MASK
+            buckets.append(hashes % np.uint64(self.dim))
+            signs.append(np.where(hashes & np.uint64(0x80000000), -1.0, 1.0))
+        if not buckets:
+            return np.zeros(self.dim, dtype=np.float32)
+        return np.bincount(
+            np.concatenate(buckets).astype(np.int64), weights=np.concatenate(signs), minlength=self.dim
+        ).astype(np.float32)
+
+    def _hashed_matrix(self, texts):
+        matrix = np.vstack([self._hashed_counts(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+        # 자주 나오는 n-gram의 영향을 줄이기 위해 log 스케일
+        return np.sign(matrix) * np.log1p(np.abs(matrix))
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+    # 코퍼스로 SVD 투영 행렬 학습 (dim x dim 공분산의 고유벡터 상위 svd_components개)
+    def fit_svd(self, texts, path=None):
+        matrix = self._normalize(self._hashed_matrix(texts)).astype(np.float64)
+        eigenvalues, eigenvectors = np.linalg.eigh(matrix.T @ matrix)
+        order = np.argsort(eigenvalues)[::-1][:self.svd_components]
+        self.components = eigenvectors[:, order].T.astype(np.float32)
+        path = path or self.svd_path
+        if path:
+            np.savez(path, components=self.components)
+            self.svd_path = path
+        return self
+
+    def embed_array(self, texts):
+        if self.needs_fit:
+            raise ValueError("SVD 투영 행렬이 없습니다. 인덱스를 다시 만들어 주세요 (make_vector.py --rebuild).")
+        matrix = self._normalize(self._hashed_matrix(list(texts)))
+        if self.components is not None:
+            matrix = self._normalize(matrix @ self.components.T)
+        return matrix
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
+
+    # 로컬 계산이라 캐시 없음 (CachedEmbeddings.stats()와 같은 자리에서 출력)
+    def stats(self):
+        return self.describe()
+
+    def describe(self):
+        return {
+            "backend": "hashed",
+            "dim": self.dim,
+            "ngram_range": list(self.ngram_range),
+            "svd_components": self.svd_components,
+        }
+
+
+def load_config(store_path):
+    if not store_path or not os.path.exists(os.path.join(store_path, CONFIG_FILE)):
+        return None
+    with open(os.path.join(store_path, CONFIG_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_config(store_path, embeddings):
+    with open(os.path.join(store_path, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(describe(embeddings), f, ensure_ascii=False, indent=2)
+
+
+# manifest/embedding.json 비교용 설정 (캐시 래퍼는 벗겨서 확인)
+def describe(embeddings):
+    embeddings = getattr(embeddings, "underlying", embeddings)
+    if isinstance(embeddings, HashedNgramEmbeddings):
+        return embeddings.describe()
+    return {"backend": "openai", "model": getattr(embeddings, "model", None)}
+
+
+# backend를 지정하지 않으면 store_path의 embedding.json -> 환경 변수 -> openai 순으로 결정
+def get_embeddings(backend=None, store_path=None, dim=None, svd_components=None, cached=True):
+    config = load_config(store_path) if backend is None else None
+    config = config or {}
+    backend = backend or config.get("backend") or os.getenv("EMBEDDING_BACKEND", "openai")
+
+    if backend == "hashed":
+        return HashedNgramEmbeddings(
+            dim=dim or config.get("dim") or int(os.getenv("EMBEDDING_DIM", "1024")),
+            ngram_range=config.get("ngram_range", (1, 3)),
+            svd_components=svd_components if svd_components is not None else config.get("svd_components", 0),
+            svd_path=os.path.join(store_path, SVD_FILE) if store_path else None,
+        )
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings()
+        if cached:
+            # 같은 요청 사유는 디스크 캐시에서 재사용 (Lambda는 /tmp, 서버는 ./cache)
+            from embedding_cache import CachedEmbeddings
+
+            embeddings = CachedEmbeddings(embeddings)
+        return embeddings
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend} ({', '.join(BACKENDS)})")
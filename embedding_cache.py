@@ -0,0 +1,175 @@
+# 쿼리 임베딩 캐시 (내용 해시 키 + 바이너리 파일)
+# OpenAIEmbeddings 등 임베딩 객체를 감싸서 같은 문장은 다시 원격 호출하지 않는다.
+# 파일 형식: 헤더(매직 'EMBC', 버전, 차원) + [sha256(32바이트) + float32 x 차원] 레코드의 나열 (append-only)
+# 레코드 수가 max_entries를 넘으면 최근 사용한 항목을 max_entries의 90%(low_water)까지만 남기고 파일을 다시 쓴다.
+# (딱 max_entries로 줄이면 가득 찬 뒤에는 새 항목마다 파일 전체를 다시 쓰게 됨)
+# 헤더의 차원이 현재 임베딩 모델의 차원과 다르면(모델 변경) 기존 파일을 버리고 새로 시작한다.
+# Lambda에서는 /tmp(최대 512MB, 기본 5000개 ≈ 30MB), Flask 서버에서는 ./cache 아래(기본 50000개)에 둔다.
+# 환경 변수: EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_MAGIC = b"EMBC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sII")  # 매직, 버전, 차원
+
+
+def _default_path():
+    if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        return "/tmp/embedding_cache.bin"
+    return "./cache/embedding_cache.bin"
+
+
+def _default_max_entries():
+    if os.getenv("EMBEDDING_CACHE_MAX_ENTRIES"):
+        return int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES"))
+    return 5000 if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else 50000
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, underlying, path=None, max_entries=None, namespace=None, low_water=0.9, dim=None):
+        self.underlying = underlying
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH") or _default_path()
+        self.max_entries = max_entries or _default_max_entries()
+        self.low_water = max(1, int(self.max_entries * low_water))
+        # 알 수 있으면 모델의 벡터 차원 (다르면 파일을 버림), 모르면 첫 임베딩 결과로 확인
+        self.expected_dim = dim or getattr(underlying, "dimensions", None)
+        # 모델이 다르면 같은 문장이라도 다른 벡터이므로 키에 모델명을 포함
+        self.namespace = namespace or getattr(underlying, "model", type(underlying).__name__)
+        self.hits = 0
+        self.misses = 0
+        self._vectors = OrderedDict()  # sha256 -> np.float32 벡터 (LRU 순서)
+        self._dim = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _key(self, text):
+        return hashlib.sha256((self.namespace + "\x1f" + text).encode("utf-8")).digest()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, dim = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or version != _VERSION:
+                    raise ValueError("지원하지 않는 캐시 파일 형식")
+                data = f.read()
+        except (OSError, ValueError, struct.error) as e:
+            print(f"임베딩 캐시 파일을 읽을 수 없어 새로 만듭니다: {e}")
+            return
+        if self.expected_dim and dim != self.expected_dim:
+            print(f"임베딩 캐시 차원({dim})이 현재 모델({self.expected_dim})과 달라 새로 만듭니다.")
+            self._reset(self.expected_dim)
+            return
+        record = np.dtype([("key", "S32"), ("vector", "<f4", (dim,))])
+        usable = len(data) - len(data) % record.itemsize  # 마지막 레코드가 잘린 경우 무시
+        records = np.frombuffer(data[:usable], dtype=record)
+        self._dim = dim
+        for key, vector in zip(records["key"], records["vector"]):
+            key = bytes(key).ljust(32, b"\0")  # numpy S32는 끝의 0바이트를 잘라냄
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)  # 같은 키가 다시 기록된 경우 나중 위치가 최근
+        if len(self._vectors) > self.max_entries:
+            self._compact()
+
+    def _append(self, items):
+        if self._dim is None:
+            self._dim = len(items[0][1])
+        new_file = not os.path.exists(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "ab") as f:
+            if new_file:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, self._dim))
+            f.write(b"".join(key + np.asarray(vector, dtype="<f4").tobytes() for key, vector in items))
+
+    # 최근 사용한 low_water개만 남기고 파일을 다시 씀
+    def _compact(self):
+        while len(self._vectors) > self.low_water:
+            self._vectors.popitem(last=False)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self._dim))
+            f.write(b"".join(key + np.asarray(vector, dtype="<f4").tobytes() for key, vector in self._vectors.items()))
+        os.replace(tmp_path, self.path)
+
+    # 메모리 캐시를 비우고 새 차원의 빈 파일로 다시 시작
+    def _reset(self, dim):
+        self._vectors.clear()
+        self._dim = dim
+        try:
+            self._compact()
+        except OSError as e:
+            print(f"임베딩 캐시 파일 초기화 실패: {e}")
+
+    def _store(self, items):
+        dim = len(items[0][1])
+        if self._dim is not None and dim != self._dim:
+            print(f"임베딩 차원이 바뀌어({self._dim} -> {dim}) 임베딩 캐시를 새로 시작합니다.")
+            self._reset(dim)
+        for key, vector in items:
+            self._vectors[key] = np.asarray(vector, dtype=np.float32)
+            self._vectors.move_to_end(key)
+        try:
+            if len(self._vectors) > self.max_entries:
+                self._compact()
+            else:
+                self._append(items)
+        except OSError as e:
+            print(f"임베딩 캐시 저장 실패 (메모리 캐시는 유지): {e}")
+
+    def embed_documents(self, texts):
+        keys = [self._key(text) for text in texts]
+        found = {}
+        missing = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vector = self._vectors.get(key)
+                if vector is not None:
+                    self._vectors.move_to_end(key)
+                    found[key] = vector
+                    self.hits += 1
+                else:
+                    missing[key] = text
+                    self.misses += 1
+        if missing:
+            # 없는 문장만 한 번에 임베딩
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            items = list(zip(missing.keys(), vectors))
+            found.update(items)
+            with self._lock:
+                self._store(items)
+        return [list(map(float, found[key])) for key in keys]
+
+    def embed_query(self, text):
+        key = self._key(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self.hits += 1
+                return vector.tolist()
+            self.misses += 1
+        vector = self.underlying.embed_query(text)
+        with self._lock:
+            self._store([(key, vector)])
+        return list(vector)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._vectors),
+            "path": self.path,
+        }
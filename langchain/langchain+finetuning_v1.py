@@ -1,18 +1,26 @@
 
 import os
+import sys
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 import unicodedata
-from datetime import datetime
-import pandas as pd
 import threading
-from flask import Flask, request, render_template
+from flask import Flask, Response, jsonify, request, render_template, send_file
 from langchain.chains import LLMChain
 import openai
 
+# 공용 모듈(decision_log 등)은 저장소 루트에 있음
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from decision_log import DecisionLog
+from metrics import CONTENT_TYPE, render as render_metrics, timed
+from embedding_backends import get_embeddings
+from retrieval import PartitionedVectorStore, load_partitions
+from context_assembler import CONTEXT_CANDIDATES, ContextAssembler
+from rule_engine import get_rule_engine
+
 app = Flask(__name__)
 
 load_dotenv()
@@ -27,12 +35,15 @@ llm = ChatOpenAI(model=fine_tuned_model, temperature=0)
 # 벡터 저장소 설정 (FAISS 예시)
 # 이미 만들어놓은 벡터 저장소를 로드합니다.
 # 예시에서는 FAISS를 사용하지만 다른 저장소도 가능합니다.
-embeddings = OpenAIEmbeddings()
 # vector_store = FAISS.load_local("./vectorstore", embeddings, allow_dangerous_deserialization=True)
 
 # 벡터 스토어 경로 설정
 vectorstore_path = "./vectorstore"
 
+# 인덱스를 만들 때와 같은 임베딩 백엔드 (embedding.json, 없으면 EMBEDDING_BACKEND / openai)
+# openai는 같은 요청 사유를 임베딩 캐시(./cache/embedding_cache.bin)에서 재사용
+embeddings = get_embeddings(store_path=vectorstore_path)
+
 # 벡터 스토어 로드 또는 생성
 if os.path.exists(vectorstore_path):
     print("벡터 스토어 로드 중...")
@@ -46,6 +57,17 @@ else:
     vectorstore = FAISS.from_documents(vectorstore_path, embeddings, allow_dangerous_deserialization=True)
     vectorstore.save_local(vectorstore_path)
 
+# 요청 종류 -> 카테고리 (검색 metadata 필터용)
+rule_engine = get_rule_engine()
+SEARCH_FETCH_K = int(os.getenv("SEARCH_FETCH_K", "20"))
+
+# 판단 결과 로그 (append-only, 엑셀은 /log/export 또는 주기적 내보내기로 생성)
+decision_log = DecisionLog(
+    os.getenv("DECISION_LOG_PATH", "./logs/decisions.sqlite3"),
+    export_path=os.getenv("DECISION_LOG_EXPORT_PATH", "user_requests.xlsx"),
+    export_interval=int(os.getenv("DECISION_LOG_EXPORT_INTERVAL", "0")),
+)
+
 # 메시지 및 규칙을 템플릿으로 정의
 prompt_template = """
 당신은 직원 요청 승인 시스템입니다. 요청 종류와 요청 사유를 바탕으로 승인, 거절 중 하나를 판단합니다. 아래 정보를 참고하여 요청을 판단하세요:
@@ -78,6 +100,13 @@ prompt_template = """
 prompt = PromptTemplate(input_variables=["request_type", "request_reason"], template=prompt_template)
 # chain = LLMChain(llm=llm, prompt=prompt)
 
+# partitions/ 폴더가 있으면 요청 카테고리 인덱스 + 공용(policy) 인덱스만 검색
+partitioned_store = PartitionedVectorStore(vectorstore, load_partitions(vectorstore_path, embeddings), embeddings)
+print("카테고리별 인덱스:", sorted(partitioned_store.partitions) or "없음 (전체 인덱스 + 카테고리 필터)")
+
+# 검색 결과 중복 제거 + 점수 컷 + 토큰 예산으로 context 조합
+context_assembler = ContextAssembler()
+
 retriever = vectorstore.as_retriever(k=3)
 chain = (
     retriever | prompt | llm | StrOutputParser()
@@ -86,52 +115,42 @@ chain = (
 
 def request_decision(request_type, request_reason):
     # 벡터 저장소에서 관련 문서 검색
-    search_results = vectorstore.similarity_search(request_reason, k=3, distance_metric='cosine')
+    with timed("vector_retrieval"):
+        # 같은 카테고리의 과거 요청 행과 정책 문서만 검색 (make_vector.py가 행마다 category metadata 기록)
+        category = rule_engine.category_of(request_type)
+        search_results = partitioned_store.similarity_search_with_score(
+            request_reason, category, k=CONTEXT_CANDIDATES, fetch_k=SEARCH_FETCH_K
+        )
     
     # 검색 결과 확인용 출력
     print("검색된 문서:")
-    for i, result in enumerate(search_results):
-        print(f"문서 {i+1}:\n{result.page_content}\n")
+    for i, (result, distance) in enumerate(search_results):
+        print(f"문서 {i+1} (거리 {distance:.4f}):\n{result.page_content}\n")
 
     # 검색된 문서들로 텍스트 조합
-    context = "\n".join([result.page_content for result in search_results])
-    print(f" ===== 생성된 context:\n{context}")
-    
-    # 나머지 로직 그대로 유지
-    input_data = {
-        "request_type": request_type,
-        "request_reason": request_reason,
-        "context": context
-    }
-    prompt_text = prompt.format(**input_data)
+    with timed("prompt_build"):
+        context = context_assembler.assemble(search_results)
+        print(f" ===== 생성된 context:\n{context}")
+        
+        # 나머지 로직 그대로 유지
+        input_data = {
+            "request_type": request_type,
+            "request_reason": request_reason,
+            "context": context
+        }
+        prompt_text = prompt.format(**input_data)
     chain = LLMChain(llm=llm, prompt=prompt)
-    decision = chain.run(input_data)
+    with timed("model_call"):
+        decision = chain.run(input_data)
     
-    return decision.strip()
-
+    with timed("output_parse"):
+        return decision.strip()
 
 
 
 
 
 
-def save_to_excel(request_type, request_reason, decision):
-    filename = "user_requests.xlsx"
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    data = {
-        '시간': [now],
-        '요청 종류': [request_type],
-        '요청 사유': [request_reason],
-        '판단 결과': [decision]
-    }
-    df = pd.DataFrame(data)
-    
-    try:
-        with pd.ExcelWriter(filename, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
-            startrow = writer.sheets['Sheet1'].max_row if 'Sheet1' in writer.sheets else 0
-            df.to_excel(writer, index=False, header=startrow == 0, startrow=startrow)
-    except FileNotFoundError:
-        df.to_excel(filename, index=False)
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -140,8 +159,28 @@ def index():
         request_type = request.form.get("request_type")
         request_reason = request.form.get("request_reason")
         decision = request_decision(request_type, request_reason)
-        save_to_excel(request_type, request_reason, decision)
+        with timed("log_write"):
+            decision_log.append(request_type, request_reason, decision)
     return render_template("index.html", decision=decision)
 
+# 판단 로그를 엑셀로 내보내서 다운로드
+@app.route("/log/export", methods=["GET"])
+def export_log():
+    return send_file(os.path.abspath(decision_log.export_xlsx()), as_attachment=True)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), mimetype=CONTENT_TYPE)
+
+# 임베딩 캐시 적중률 확인용
+@app.route("/embedding_cache/stats", methods=["GET"])
+def embedding_cache_stats():
+    return jsonify(embeddings.stats())
+
+# 중복 제거/점수 컷/토큰 예산으로 제외된 검색 결과 수 확인용
+@app.route("/context/stats", methods=["GET"])
+def context_stats():
+    return jsonify(context_assembler.stats())
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=True)
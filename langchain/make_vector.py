@@ -1,27 +1,75 @@
 # vector store에 vector값 생성
+# 증분 업데이트: 벡터 스토어 폴더의 manifest.json에 파일별 내용 해시와 FAISS 문서 id를 기록해 두고,
+# 새로 추가/변경된 파일만 임베딩해서 추가하고, 삭제/변경된 파일의 벡터만 제거한다.
+# 전체 재생성: python make_vector.py --rebuild
 import os
+import argparse
+import hashlib
 import json
+import shutil
+import sys
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain.document_loaders import PyMuPDFLoader, TextLoader
 from flask import Flask, request, jsonify, session
 import unicodedata
 from langchain.schema import Document
 from docx import Document as DocxDocument
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
+# 공용 모듈(rule_engine 등)은 저장소 루트에 있음
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rule_engine import get_rule_engine
+from retrieval import PARTITIONS_DIR, POLICY_PARTITION
+import mmap_store
+from embedding_backends import BACKENDS, SVD_FILE, describe, get_embeddings, save_config
+from ann_index import DEFAULT_PARAMS, INDEX_KINDS, build_ann, index_file_name, remove_ann_files
+
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
 fine_tuned_model = 'ft:gpt-4o-2024-08-06:auton::ASh95CCN'
 
 
+# 요청 내역 엑셀(요청 / 요청 사유 / 상태 / 승인권자 노트)의 컬럼과 문서 metadata 이름
+REQUEST_COLUMNS = {'요청': 'request_type', '요청 사유': 'request_reason', '상태': 'status', '승인권자 노트': 'approver_note'}
+
+# 요청 내역 시트: 행마다 Document 하나 (카테고리/상태/승인권자 노트는 metadata로)
+def request_rows_to_documents(df):
+    columns = [column for column in REQUEST_COLUMNS if column in df.columns]
+    text = df[columns].fillna('').astype(str).apply(lambda column: column.str.strip())
+    text['요청'] = text['요청'].str.split('/').str[-1].str.strip()
+    text = text[text['요청 사유'] != '']  # 사유 없는 행은 검색에 도움이 안 됨
+
+    # 행 단위로 반복하지 않고 컬럼 단위 문자열 연산으로 본문 생성
+    page_content = pd.Series('', index=text.index)
+    for column in columns:
+        page_content = page_content + (column + ': ' + text[column] + '\n').where(text[column] != '', '')
+    page_content = page_content.str.rstrip('\n')
+
+    # 카테고리 키(meeting, personal 등)는 고유값마다 한 번만 계산
+    rule_engine = get_rule_engine()
+    categories = {value: rule_engine.category_of(value) for value in text['요청'].unique()}
+    metadata = text.rename(columns=REQUEST_COLUMNS)
+    metadata['category'] = text['요청'].map(categories).astype(object).where(lambda value: value.notna(), None)
+    metadata['row'] = text.index + 2  # 엑셀 행 번호 (헤더 다음부터)
+    records = metadata.to_dict('records')
+
+    return [Document(page_content=content, metadata=record) for content, record in zip(page_content.tolist(), records)]
+
+# 그 외 시트: 행마다 셀 값을 공백으로 이어서 Document 하나
+def rows_to_documents(df):
+    page_content = df.fillna('').astype(str).agg(' '.join, axis=1)
+    return [Document(page_content=content, metadata={'row': row + 2}) for row, content in zip(df.index, page_content.tolist())]
+
 # 엑셀 파일 로드 함수
 def load_excel(file_path):
     print(f"Loading Excel file: {file_path}")  # 디버깅: 엑셀 파일 경로 출력
@@ -29,14 +77,12 @@ def load_excel(file_path):
         # pandas로 엑셀 파일을 로드하여 데이터프레임으로 변환
         df = pd.read_excel(file_path, engine='openpyxl')  # 엑셀 파일 읽기
         print(f"Excel file loaded successfully: {file_path}")  # 디버깅: 로드 성공 출력
-        # 각 행을 문서로 변환하여 페이지 콘텐츠에 추가
-        full_text = []
-        for index, row in df.iterrows():
-            full_text.append(" ".join(str(cell) for cell in row))  # 각 셀의 값을 공백으로 구분하여 결합
-        return [Document(page_content="\n".join(full_text))]
+        if {'요청', '요청 사유'}.issubset(df.columns):
+            return request_rows_to_documents(df)
+        return rows_to_documents(df)
     except Exception as e:
         print(f"Error loading Excel file: {e}")  # 디버깅: 오류 출력
-        return []
+        raise  # 실패한 파일은 manifest에 기록하지 않고 다음 실행에서 다시 시도
     
 # .docx 파일 로드
 def load_docx(file_path):
@@ -63,52 +109,285 @@ def load_document(file_path):
         raise ValueError("지원되지 않는 파일 형식입니다.")
     return documents
 
-loaded_files = {}  # 파일 수정 시간 기록을 위한 딕셔너리
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.docx', '.xlsx')  # 엑셀 파일도 포함
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-def load_all_documents_in_folder(folder_path):
-    docs = []
+# 폴더 내 지원 파일 -> 내용 해시 (키는 폴더 기준 상대 경로)
+def scan_folder(folder_path):
+    hashes = {}
     print(f"Listing files in folder: {folder_path}")  # 디버깅: 폴더 내 파일 목록 출력
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        if filename.endswith(('.pdf', '.txt', '.docx', '.xlsx')):  # 엑셀 파일도 포함
-            try:
-                # 새 파일이나 수정된 파일만 로드
-                print(f"Loading file: {file_path}")  # 디버깅: 파일 경로 출력
-                if file_path not in loaded_files or os.path.getmtime(file_path) > loaded_files[file_path]:
-                    docs.extend(load_document(file_path))
-                    loaded_files[file_path] = os.path.getmtime(file_path)
-            except Exception as e:
-                print(f"{filename} 로드 중 오류: {e}")
-    return docs
-
-# 로컬에서 데이터 처리
-def create_vectorstore_local(folder_path, output_path):
-    docs = load_all_documents_in_folder(folder_path)
-
-    if not docs:
-        print("로드된 문서가 없습니다. 문제를 확인해 주세요.")
-        return
-    
+    for filename in sorted(os.listdir(folder_path)):
+        if filename.endswith(SUPPORTED_EXTENSIONS):
+            hashes[filename] = file_hash(os.path.join(folder_path, filename))
+    return hashes
+
+# manifest: {"version": 1, "files": {파일명: {"sha256": 해시, "ids": [FAISS 문서 id, ...]}}}
+def load_manifest(output_path):
+    manifest_path = os.path.join(output_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def save_manifest(output_path, manifest):
+    manifest_path = os.path.join(output_path, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+# 파일 하나를 로드해서 청크로 분할 (청크마다 출처 파일명을 metadata에 기록)
+def load_and_split(folder_path, filename):
+    file_path = os.path.join(folder_path, filename)
+    print(f"Loading file: {file_path}")  # 디버깅: 파일 경로 출력
     # 문서 분할
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
-    split_documents = text_splitter.split_documents(docs)
-    print(f"문서 분할 완료: {len(split_documents)} 개 문서")
+    split_documents = text_splitter.split_documents(load_document(file_path))
+    for document in split_documents:
+        document.metadata["source_file"] = filename
+    return split_documents
+
+# 프로세스 풀 작업 단위 (예외는 문자열로 돌려받아 파일별로 보고)
+def _load_file_task(task):
+    folder_path, filename = task
+    try:
+        return filename, load_and_split(folder_path, filename), None
+    except Exception as e:
+        return filename, None, f"{type(e).__name__}: {e}"
+
+# 파일 파싱(PDF/DOCX/XLSX)은 CPU 작업이라 workers > 1이면 프로세스 풀로 병렬 처리
+# 결과는 filenames 순서대로 반환 -> {파일명: 청크 목록} (실패한 파일은 제외)
+def load_files(folder_path, filenames, workers=1):
+    tasks = [(folder_path, filename) for filename in filenames]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            results = list(executor.map(_load_file_task, tasks))
+    else:
+        results = [_load_file_task(task) for task in tasks]
+
+    loaded = {}
+    for filename, split_documents, error in results:
+        if error is not None:
+            print(f"{filename} 로드 중 오류: {error}")
+        else:
+            loaded[filename] = split_documents
+    return loaded
 
-    # 임베딩 및 벡터 스토어 생성
-    embeddings = OpenAIEmbeddings()
-    vectorstore = FAISS.from_documents(documents=split_documents, embedding=embeddings)
+# 카테고리별 하위 인덱스 생성: <output>/partitions/<카테고리>, 카테고리 없는 문서는 partitions/policy
+# 전체 인덱스에 저장된 벡터를 그대로 복사하므로 임베딩 호출은 없음
+def build_partitions(vectorstore, output_path):
+    vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    groups = {}
+    for position, docstore_id in sorted(vectorstore.index_to_docstore_id.items()):
+        document = vectorstore.docstore.search(docstore_id)
+        key = document.metadata.get("category") or POLICY_PARTITION
+        groups.setdefault(key, []).append((docstore_id, document, vectors[position]))
 
-    # 벡터 스토어 저장
+    partitions_path = os.path.join(output_path, PARTITIONS_DIR)
+    tmp_path = partitions_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    for key, items in sorted(groups.items()):
+        partition = FAISS.from_embeddings(
+            text_embeddings=[(document.page_content, vector.tolist()) for _, document, vector in items],
+            embedding=vectorstore.embeddings,
+            metadatas=[document.metadata for _, document, _ in items],
+            ids=[docstore_id for docstore_id, _, _ in items],
+        )
+        partition.save_local(os.path.join(tmp_path, key))
+        print(f"파티션 {key}: {len(items)}개 벡터")
+
+    # 이전 파티션을 새 파티션으로 교체
+    shutil.rmtree(partitions_path, ignore_errors=True)
+    if groups:
+        os.replace(tmp_path, partitions_path)
+    print(f"카테고리별 인덱스가 {partitions_path} 경로에 저장되었습니다.")
+
+# ANN recall 평가용 실제 질의 (색인하지 않은 요청 사유) 임베딩, 파일이 없으면 None
+def load_eval_queries(path, embeddings):
+    if not path:
+        return None
+    if not os.path.exists(path):
+        print(f"평가 질의 파일이 없어 저장된 벡터 일부로 평가합니다: {path}")
+        return None
+    with open(path, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32) if texts else None
+
+# 검색용 산출물 갱신: 카테고리별 인덱스, 메모리 매핑 형식, ANN 인덱스
+# ann: {"kind": "hnsw"|"ivfpq", "params": {...}, "eval_k": 3, "eval_queries": 200, "eval_queries_file": 경로 또는 None} 또는 None
+def publish_store(vectorstore, output_path, embeddings, partitioned=False, mmap=False, ann=None):
+    # 이미 파티션이 있으면 전체 인덱스와 어긋나지 않도록 함께 갱신
+    if partitioned or os.path.isdir(os.path.join(output_path, PARTITIONS_DIR)):
+        build_partitions(vectorstore, output_path)
+    # 메모리 매핑 형식(Lambda용)도 같은 내용으로 갱신 (ANN 인덱스는 이 형식에서만 사용)
+    if mmap or ann or mmap_store.is_mmap_store(output_path):
+        mmap_store.convert(output_path, embeddings)
+    query_vectors = load_eval_queries(ann.get("eval_queries_file"), embeddings) if ann else None
+    for store_path in mmap_store.store_paths(output_path):
+        if ann:
+            report = build_ann(
+                store_path, ann["kind"], ann["params"], k=ann["eval_k"], queries=ann["eval_queries"],
+                query_vectors=query_vectors,
+            )
+            mmap_store.set_index_file(store_path, index_file_name(ann["kind"]) if report else None)
+        else:
+            remove_ann_files(store_path)
+            # convert는 기존 ANN 지정을 유지하므로, ANN을 빼고 다시 만들 때는 지정도 지움
+            if mmap_store.is_mmap_store(store_path):
+                mmap_store.set_index_file(store_path, None)
+
+# manifest에 임베딩 설정이 없으면 예전 빌드(OpenAIEmbeddings)로 간주
+def same_embedding(recorded, embedding_config):
+    if recorded is None:
+        return embedding_config["backend"] == "openai"
+    return recorded == embedding_config
+
+# 로컬에서 데이터 처리 (변경된 파일만 반영)
+# embedding_backend를 지정하지 않으면 기존 인덱스의 embedding.json -> EMBEDDING_BACKEND -> openai
+def create_vectorstore_local(folder_path, output_path, rebuild=False, workers=1, partitioned=False, mmap=False, ann=None,
+                             embedding_backend=None, embedding_dim=None, embedding_svd=None):
+    embeddings = get_embeddings(
+        backend=embedding_backend, store_path=output_path, dim=embedding_dim, svd_components=embedding_svd, cached=False
+    )
+    embedding_config = describe(embeddings)
+    print("임베딩 설정:", embedding_config)
+    current = scan_folder(folder_path)
+
+    previous = load_manifest(output_path)
+    manifest = None if rebuild else previous
+    # 임베딩이 바뀌면 기존 벡터와 섞을 수 없으므로 전체 재생성
+    if manifest is not None and not same_embedding(manifest.get("embedding"), embedding_config):
+        print("임베딩 설정이 바뀌어 벡터 스토어를 새로 생성합니다.")
+        manifest = None
+    if manifest is not None and getattr(embeddings, "needs_fit", False):
+        print("SVD 투영 행렬이 없어 벡터 스토어를 새로 생성합니다.")
+        manifest = None
+    vectorstore = None
+    if manifest is not None and os.path.exists(os.path.join(output_path, "index.faiss")):
+        vectorstore = FAISS.load_local(output_path, embeddings=embeddings, allow_dangerous_deserialization=True)
+    else:
+        if not rebuild and previous is None and os.path.exists(output_path):
+            print("manifest가 없어 벡터 스토어를 새로 생성합니다.")
+        manifest = {"version": MANIFEST_VERSION, "files": {}, "ann": (previous or {}).get("ann")}
+    manifest["embedding"] = embedding_config
+    files = manifest["files"]
+
+    # ANN 설정은 manifest에 남겨서 다음 증분 빌드에서도 유지 (--index flat으로 해제)
+    ann_requested = ann is not None
+    if ann is None:
+        ann = manifest.get("ann")
+    elif ann["kind"] == "flat":
+        ann = None
+    manifest["ann"] = ann
+
+    removed = [name for name in files if name not in current]
+    changed = [name for name in current if name in files and files[name]["sha256"] != current[name]]
+    added = [name for name in current if name not in files]
+    print(f"추가 {len(added)}개, 변경 {len(changed)}개, 삭제 {len(removed)}개, 유지 {len(current) - len(added) - len(changed)}개")
+
+    if not (removed or changed or added):
+        print("변경된 파일이 없습니다.")
+        if vectorstore is not None and (partitioned or mmap or ann_requested):
+            save_manifest(output_path, manifest)
+            publish_store(vectorstore, output_path, embeddings, partitioned, mmap, ann)
+        return vectorstore
+
+    # 추가/변경 파일 로드 (로드에 실패한 변경 파일은 기존 벡터를 유지)
+    new_documents = load_files(folder_path, sorted(changed + added), workers=workers)
+
+    # 삭제/변경 파일의 기존 벡터 제거
+    stale_ids = []
+    for filename in removed + [name for name in changed if name in new_documents]:
+        stale_ids.extend(files.pop(filename)["ids"])
+    if stale_ids and vectorstore is not None:
+        vectorstore.delete(stale_ids)
+        print(f"기존 벡터 {len(stale_ids)}개 제거")
+
+    # 전체 재생성이면 SVD 투영 행렬을 새 코퍼스로 학습
+    if vectorstore is None and getattr(embeddings, "svd_components", 0):
+        os.makedirs(output_path, exist_ok=True)
+        texts = [document.page_content for split_documents in new_documents.values() for document in split_documents]
+        embeddings.fit_svd(texts, os.path.join(output_path, SVD_FILE))
+        print(f"SVD 투영 행렬 학습 완료: {embeddings.dim} -> {embeddings.svd_components}차원")
+
+    # 새 청크만 임베딩해서 추가
+    for filename, split_documents in new_documents.items():
+        ids = [str(uuid.uuid4()) for _ in split_documents]
+        if split_documents:
+            if vectorstore is None:
+                vectorstore = FAISS.from_documents(documents=split_documents, embedding=embeddings, ids=ids)
+            else:
+                vectorstore.add_documents(split_documents, ids=ids)
+        files[filename] = {"sha256": current[filename], "ids": ids}
+        print(f"{filename}: {len(split_documents)}개 청크 추가")
+
+    if vectorstore is None:
+        print("로드된 문서가 없습니다. 문제를 확인해 주세요.")
+        return None
+
+    # 벡터 스토어 저장 후 manifest 기록 (저장 도중 실패하면 다음 실행에서 다시 반영됨)
     vectorstore.save_local(output_path)
-    print(f"벡터 스토어가 {output_path} 경로에 저장되었습니다.")
+    save_config(output_path, embeddings)
+    save_manifest(output_path, manifest)
+    publish_store(vectorstore, output_path, embeddings, partitioned, mmap, ann)
+    print(f"벡터 스토어가 {output_path} 경로에 저장되었습니다. (총 {vectorstore.index.ntotal}개 벡터)")
+    return vectorstore
 
 if __name__ == '__main__':
     # 환경 변수 로드
     load_dotenv()
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="../d", help="로드할 파일들이 저장된 폴더 경로")
+    parser.add_argument("--output", default="./vectorstore", help="벡터 스토어를 저장할 경로")
+    parser.add_argument("--rebuild", action="store_true", help="manifest를 무시하고 전체 재생성")
+    parser.add_argument("--workers", type=int, default=1, help="파일 파싱 프로세스 수 (0이면 CPU 코어 수)")
+    parser.add_argument("--partitioned", action="store_true", help="카테고리별 하위 인덱스 + 공용(policy) 인덱스도 생성")
+    parser.add_argument("--mmap", action="store_true", help="pickle 없는 메모리 매핑 형식(store.json, docs.bin)도 생성")
+    # ANN 인덱스 (메모리 매핑 형식에서 사용, 빌드 후 ann_report.json에 recall@k/지연 시간 기록)
+    parser.add_argument("--index", choices=INDEX_KINDS, help="검색 인덱스 종류 (지정하지 않으면 이전 빌드 설정 유지)")
+    parser.add_argument("--hnsw-m", type=int, default=DEFAULT_PARAMS["hnsw"]["m"])
+    parser.add_argument("--ef-construction", type=int, default=DEFAULT_PARAMS["hnsw"]["ef_construction"])
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_PARAMS["hnsw"]["ef_search"])
+    parser.add_argument("--nlist", type=int, default=DEFAULT_PARAMS["ivfpq"]["nlist"])
+    parser.add_argument("--pq-m", type=int, default=DEFAULT_PARAMS["ivfpq"]["pq_m"])
+    parser.add_argument("--nbits", type=int, default=DEFAULT_PARAMS["ivfpq"]["nbits"])
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_PARAMS["ivfpq"]["nprobe"])
+    parser.add_argument("--eval-k", type=int, default=3, help="recall@k의 k")
+    parser.add_argument("--eval-queries", type=int, default=200, help="평가에 사용할 질의 수")
+    parser.add_argument("--eval-queries-file", help="색인하지 않은 실제 요청 사유 (한 줄에 하나, 없으면 저장된 벡터 일부를 떼어 평가)")
+    # 임베딩 백엔드 (hashed는 네트워크 없이 로컬 CPU로 계산, 바꾸면 전체 재생성)
+    parser.add_argument("--embedding-backend", choices=BACKENDS, help="지정하지 않으면 기존 인덱스 설정 유지")
+    parser.add_argument("--embedding-dim", type=int, help="hashed 해시 버킷 수 (기본 1024)")
+    parser.add_argument("--embedding-svd", type=int, help="hashed 벡터를 SVD로 줄일 차원 (0이면 사용 안 함)")
+    args = parser.parse_args()
+
+    ann = None
+    if args.index is not None:
+        params = {
+            "flat": {},
+            "hnsw": {"m": args.hnsw_m, "ef_construction": args.ef_construction, "ef_search": args.ef_search},
+            "ivfpq": {"nlist": args.nlist, "pq_m": args.pq_m, "nbits": args.nbits, "nprobe": args.nprobe},
+        }[args.index]
+        ann = {
+            "kind": args.index, "params": params, "eval_k": args.eval_k, "eval_queries": args.eval_queries,
+            "eval_queries_file": args.eval_queries_file,
+        }
+
     # 문서를 로드할 폴더 경로
-    folder_path = "../d"  # 로드할 파일들이 저장된 폴더 경로
-    output_path = "./vectorstore"  # 벡터 스토어를 저장할 경로
+    folder_path = args.folder  # 로드할 파일들이 저장된 폴더 경로
+    output_path = args.output  # 벡터 스토어를 저장할 경로
 
     # 폴더 경로와 벡터 스토어 저장 경로가 올바른지 확인
     if not os.path.exists(folder_path):
@@ -116,5 +395,8 @@ if __name__ == '__main__':
     else:
         # 벡터 스토어 생성 및 저장
         print("문서를 로드하고 벡터 스토어를 생성합니다...")
-        create_vectorstore_local(folder_path, output_path)
+        workers = args.workers or os.cpu_count() or 1
+        create_vectorstore_local(folder_path, output_path, rebuild=args.rebuild, workers=workers, partitioned=args.partitioned, mmap=args.mmap, ann=ann,
+            embedding_backend=args.embedding_backend, embedding_dim=args.embedding_dim, embedding_svd=args.embedding_svd,
+        )
         print("프로세스가 완료되었습니다.")
\ No newline at end of file
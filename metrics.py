@@ -0,0 +1,145 @@
+# 단계별 지연 시간 / 오류 / 캐시 결과 지표 (Prometheus text format)
+# 사용 예:
+#   with timed("model_call"):
+#       response = openai.ChatCompletion.create(...)
+#   Flask: Response(render(), mimetype=CONTENT_TYPE)
+
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 1ms ~ 30s (모델 호출은 수 초, 캐시/규칙은 수 ms 이하)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}  # labels -> [버킷별 개수, 합계, 개수]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# 판단 서버 공통 지표
+STAGE_SECONDS = Histogram(
+    "decision_stage_seconds",
+    "Time spent in each decision stage (prompt_build, vector_retrieval, model_call, output_parse, log_write, ...)",
+    ["stage"],
+)
+STAGE_ERRORS = Counter("decision_stage_errors_total", "Errors raised in each decision stage", ["stage"])
+CACHE_RESULTS = Counter("decision_cache_requests_total", "Decision cache lookups by outcome", ["outcome"])
+DECISION_TIERS = Counter("decision_tier_total", "Decisions by the tier that produced them", ["tier"])
+
+
+# 블록 실행 시간을 stage 라벨로 기록하고, 예외가 나면 오류 카운터 증가
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+# 여러 구간으로 나뉘어 실행되는 단계(예: 스트리밍 응답 수신)의 시간을 합산해서 한 번만 기록
+# 구간마다 with timer.running(): 으로 감싸고, 끝나면 timer.observe()
+class StageTimer:
+    def __init__(self, stage):
+        self.stage = stage
+        self.seconds = 0.0
+
+    @contextmanager
+    def running(self):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.inc(stage=self.stage)
+            raise
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def observe(self):
+        STAGE_SECONDS.observe(self.seconds, stage=self.stage)
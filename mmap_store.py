@@ -0,0 +1,199 @@
+# 메모리 매핑 벡터 스토어 (Lambda 콜드 스타트용)
+# FAISS.load_local은 index.faiss 전체를 읽고 index.pkl(docstore)을 unpickle한 뒤에야 검색이 가능하다.
+# 이 형식은 pickle 없이
+#   store.json   : 형식 버전, 문서 수, 차원, normalize_L2 여부, 내용 checksum(벡터 + 문서 id)
+#   index.faiss  : faiss.read_index(..., IO_FLAG_MMAP_IFC)로 메모리 매핑해서 연다
+#                  (store.json의 "index_file"이 있으면 그 인덱스 사용, 예: ann_index.py의 index.hnsw.faiss
+#                   "index_checksum"은 그 인덱스를 만들 때의 checksum)
+#   docs.bin     : 문서({"id", "page_content", "metadata"} JSON)를 이어 붙인 파일 (mmap, 필요한 문서만 읽음)
+#   offsets.npy  : docs.bin 내 문서 i의 위치 = offsets[i]:offsets[i + 1] (np.load mmap_mode='r')
+# 로 저장해서, 로드 시간과 상주 메모리가 문서 수에 비례하지 않게 한다.
+# 변환: python mmap_store.py convert ./langchain/vectorstore  (partitions/ 하위 인덱스도 함께 변환)
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+STORE_FILE = "store.json"
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "docs.bin"
+OFFSETS_FILE = "offsets.npy"
+FORMAT_VERSION = 1
+
+
+def is_mmap_store(path):
+    return os.path.exists(os.path.join(path, STORE_FILE))
+
+
+def _read_index(index_path):
+    import faiss
+
+    # IO_FLAG_MMAP_IFC: flat 벡터를 복사하지 않고 파일에 매핑 (faiss 1.8+), 없으면 IO_FLAG_MMAP
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+    try:
+        return faiss.read_index(index_path, flags)
+    except RuntimeError as e:
+        print(f"메모리 매핑으로 인덱스를 열 수 없어 전체를 읽습니다: {e}")
+        return faiss.read_index(index_path)
+
+
+class MmapDocstore:
+    def __init__(self, path):
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._file = open(os.path.join(path, DOCS_FILE), "rb")
+        # 빈 파일은 mmap할 수 없음
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] > 0 else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def record(self, position):
+        return json.loads(self._data[int(self.offsets[position]):int(self.offsets[position + 1])])
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class MmapVectorStore:
+    def __init__(self, path, embeddings=None):
+        with open(os.path.join(path, STORE_FILE), encoding="utf-8") as f:
+            self.info = json.load(f)
+        if self.info.get("version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 벡터 스토어 형식입니다: {path}")
+        self.path = path
+        self.embeddings = embeddings
+        self.index = _read_index(os.path.join(path, self.info.get("index_file", INDEX_FILE)))
+        self.docs = MmapDocstore(path)
+        self._normalize_L2 = self.info.get("normalize_L2", False)
+        if self.index.ntotal != len(self.docs):
+            raise ValueError(f"인덱스({self.index.ntotal})와 문서({len(self.docs)}) 수가 다릅니다: {path}")
+
+    # FAISS 위치 -> Document (요청된 문서만 docs.bin에서 읽음)
+    def document_at(self, position):
+        from langchain_core.documents import Document
+
+        record = self.docs.record(position)
+        return Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+
+    def close(self):
+        self.docs.close()
+
+
+# 인덱스 벡터와 위치별 문서 id의 checksum (ANN 인덱스가 같은 내용으로 만들어졌는지 확인용)
+def content_checksum(index, ids):
+    digest = hashlib.sha256()
+    if index.ntotal:
+        digest.update(np.ascontiguousarray(index.reconstruct_n(0, index.ntotal), dtype=np.float32).tobytes())
+    digest.update(json.dumps(list(ids), ensure_ascii=False, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# langchain FAISS 스토어 -> 메모리 매핑 형식 (index.faiss는 같은 경로에 다시 씀)
+# 기존 store.json에 ann_index.py가 지정한 index_file이 있으면, 그 인덱스를 만든 내용(checksum)이 같을 때만 유지
+def write_store(vectorstore, path):
+    import faiss
+
+    os.makedirs(path, exist_ok=True)
+    index_file, index_checksum = _previous_index_file(path)
+    offsets = [0]
+    tmp_docs = os.path.join(path, DOCS_FILE + ".tmp")
+    with open(tmp_docs, "wb") as f:
+        for position in range(vectorstore.index.ntotal):
+            docstore_id = vectorstore.index_to_docstore_id[position]
+            document = vectorstore.docstore.search(docstore_id)
+            record = {"id": docstore_id, "page_content": document.page_content, "metadata": document.metadata}
+            data = json.dumps(record, ensure_ascii=False, default=str).encode("utf-8")
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+
+    tmp_offsets = os.path.join(path, "offsets.tmp.npy")
+    np.save(tmp_offsets, np.asarray(offsets, dtype=np.int64))
+    tmp_index = os.path.join(path, INDEX_FILE + ".tmp")
+    faiss.write_index(vectorstore.index, tmp_index)
+
+    os.replace(tmp_docs, os.path.join(path, DOCS_FILE))
+    os.replace(tmp_offsets, os.path.join(path, OFFSETS_FILE))
+    os.replace(tmp_index, os.path.join(path, INDEX_FILE))
+    # store.json은 마지막에 기록 (이 파일이 있어야 mmap 형식으로 로드됨)
+    info = {
+        "version": FORMAT_VERSION,
+        "count": vectorstore.index.ntotal,
+        "dim": vectorstore.index.d,
+        "normalize_L2": bool(getattr(vectorstore, "_normalize_L2", False)),
+        "checksum": content_checksum(
+            vectorstore.index, (vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal))
+        ),
+    }
+    if index_file is not None:
+        if index_checksum == info["checksum"]:
+            info["index_file"] = index_file
+            info["index_checksum"] = index_checksum
+        else:
+            print(f"{index_file}을 만든 뒤 벡터 또는 문서가 바뀌어 {INDEX_FILE}을 사용합니다.")
+    with open(os.path.join(path, STORE_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+# 기존 store.json의 (index_file, index_checksum), 지정이 없거나 파일이 없으면 (None, None)
+def _previous_index_file(path):
+    store_path = os.path.join(path, STORE_FILE)
+    if not os.path.exists(store_path):
+        return None, None
+    with open(store_path, encoding="utf-8") as f:
+        info = json.load(f)
+    index_file = info.get("index_file")
+    if index_file and os.path.exists(os.path.join(path, index_file)):
+        return index_file, info.get("index_checksum")
+    return None, None
+
+
+# 검색에 사용할 인덱스 파일 지정 (None이면 index.faiss)
+# 지정한 인덱스는 현재 store.json 내용(checksum)으로 만든 것으로 기록
+def set_index_file(path, file_name=None):
+    store_path = os.path.join(path, STORE_FILE)
+    with open(store_path, encoding="utf-8") as f:
+        info = json.load(f)
+    info.pop("index_file", None)
+    info.pop("index_checksum", None)
+    if file_name is not None:
+        info["index_file"] = file_name
+        info["index_checksum"] = info.get("checksum")
+    with open(store_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    os.replace(store_path + ".tmp", store_path)
+
+
+# store_path와 partitions/ 하위 폴더 목록
+def store_paths(path):
+    from retrieval import PARTITIONS_DIR
+
+    paths = [path]
+    partitions_path = os.path.join(path, PARTITIONS_DIR)
+    if os.path.isdir(partitions_path):
+        paths += [os.path.join(partitions_path, key) for key in sorted(os.listdir(partitions_path))]
+    return paths
+
+
+# FAISS.load_local 형식 폴더(+ partitions/ 하위 폴더)를 메모리 매핑 형식으로 변환
+def convert(path, embeddings=None):
+    from langchain_community.vectorstores import FAISS
+
+    for store_path in store_paths(path):
+        # 변환 입력은 직접 만든 index.pkl이므로 역직렬화 허용
+        vectorstore = FAISS.load_local(store_path, embeddings=embeddings, allow_dangerous_deserialization=True)
+        info = write_store(vectorstore, store_path)
+        print(f"{store_path}: 문서 {info['count']}개 변환 완료")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "convert":
+        print("사용법: python mmap_store.py convert <벡터 스토어 경로>")
+        sys.exit(1)
+    convert(sys.argv[2])
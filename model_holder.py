@@ -0,0 +1,80 @@
+# sklearn 모델/벡터라이저를 한 번만 불러와서 공유하는 holder
+# - joblib mmap_mode='r'로 불러와 모델 배열을 메모리 매핑 → 여러 워커 프로세스가 같은 페이지 캐시를 공유
+# - 백그라운드 스레드가 파일 변경을 감지하면 새 버전을 불러온 뒤 참조를 한 번에 교체 (요청 중단 없음)
+
+import os
+import threading
+
+
+class ModelHolder:
+    def __init__(self, model_path='random_forest_model.pkl', vectorizer_path='tfidf_vectorizer.pkl',
+                 poll_interval=5.0, mmap_mode='r'):
+        self.model_path = model_path
+        self.vectorizer_path = vectorizer_path
+        self.poll_interval = poll_interval
+        self.mmap_mode = mmap_mode
+        self._stat = self._file_stat()
+        model, vectorizer = self._load()
+        # (모델, 벡터라이저, 버전)을 하나의 튜플로 두어 교체가 원자적으로 보이게 함
+        self._current = (model, vectorizer, 1)
+        self._stop = threading.Event()
+        self._watcher = None
+        if poll_interval:
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+
+    def _file_stat(self):
+        stats = []
+        for path in (self.model_path, self.vectorizer_path):
+            st = os.stat(path)
+            stats.append((st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def _load(self):
+        import joblib  # Lambda 등에서 cascade를 쓰지 않으면 import하지 않도록
+
+        model = joblib.load(self.model_path, mmap_mode=self.mmap_mode)
+        vectorizer = joblib.load(self.vectorizer_path, mmap_mode=self.mmap_mode)
+        return model, vectorizer
+
+    def get(self):
+        model, vectorizer, _ = self._current
+        return model, vectorizer
+
+    @property
+    def version(self):
+        return self._current[2]
+
+    def _watch(self):
+        pending = None
+        while not self._stop.wait(self.poll_interval):
+            try:
+                stat = self._file_stat()
+            except OSError:
+                continue  # 파일 교체 중
+            if stat == self._stat:
+                pending = None
+                continue
+            # 쓰기 도중인 파일을 읽지 않도록, 한 주기 동안 변화가 없을 때 불러옴
+            if stat != pending:
+                pending = stat
+                continue
+            try:
+                model, vectorizer = self._load()
+            except Exception as e:
+                print(f"모델 재로드 실패, 기존 모델 유지: {e}")
+                continue
+            self._current = (model, vectorizer, self._current[2] + 1)
+            self._stat = stat
+            pending = None
+            print(f"모델 교체 완료 (버전 {self._current[2]})")
+
+    def reload(self):
+        model, vectorizer = self._load()
+        self._stat = self._file_stat()
+        self._current = (model, vectorizer, self._current[2] + 1)
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
@@ -0,0 +1,166 @@
+# 카테고리별 프롬프트 registry
+# 요청 종류에 해당하는 카테고리(회의, 개인시간, 기타업무, 출장/이동/외근)의 규칙과 예시만 담은 프롬프트를 미리 만들어 두고,
+# request_type으로 골라서 사용한다. 카테고리를 알 수 없는 요청은 전체 규칙(all) 프롬프트를 사용한다.
+# - CHAT: app.py 파인튜닝 모델용 (승인/거절/보류)
+# - RAG: aws_lambda/lambda_main.py 검색 + gpt-4o용 ({context} 포함 PromptTemplate 문자열)
+
+import hashlib
+
+# tiktoken 인코딩은 처음 count_tokens를 부를 때 로드 (import 시점에 BPE 파일을 읽거나 내려받지 않음)
+# Lambda 이미지는 빌드 때 받아 둔 파일을 TIKTOKEN_CACHE_DIR로 사용 (aws_lambda/Dockerfile)
+# tiktoken이 없거나 인코딩을 받을 수 없으면 False로 기록하고 대략적인 추정치 사용
+_encoding = None
+
+ALL = "all"
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+        except Exception as e:
+            print(f"tiktoken 인코딩을 불러올 수 없어 토큰 수를 추정합니다: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # ASCII는 약 4글자당 1토큰, 한글 등은 글자당 약 1토큰으로 추정
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+class PromptRegistry:
+    def __init__(self, rule_engine, header, sections, footer, joiner=""):
+        self.rule_engine = rule_engine
+        self.templates = {key: header + section + footer for key, section in sections.items()}
+        self.templates[ALL] = header + joiner.join(sections.values()) + footer
+
+    # request_type에 맞는 (카테고리 키, 프롬프트) 반환
+    def select(self, request_type):
+        key = self.rule_engine.category_of(request_type)
+        if key not in self.templates:
+            key = ALL
+        return key, self.templates[key]
+
+    def token_counts(self):
+        return {key: count_tokens(template) for key, template in self.templates.items()}
+
+    # 캐시 버전 태그용 (프롬프트가 바뀌면 값이 바뀜)
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        for key in sorted(self.templates):
+            digest.update(key.encode("utf-8"))
+            digest.update(self.templates[key].encode("utf-8"))
+        return digest.hexdigest()
+
+
+CHAT_SYSTEM_PROMPT = "당신은 직원 요청 승인 시스템으로, 요청 정보를 바탕으로 승인, 거절, 보류 중 하나를 판단합니다. 또한, 거절할 시 거절사유도 함께 설명해주어야 합니다."
+
+CHAT_HEADER = (
+    "다음 요청 정보를 바탕으로 승인, 거절, 보류 중 하나를 판단하세요.\n"
+    "### 승인/거절/보류 조건:\n"
+)
+
+CHAT_SECTIONS = {
+    "meeting": (
+        "#### (업무) 회의 (휴게 X):\n"
+        "- **승인**: 요청 사유에 **회의 내용**, **회의 장소**, **참석자**가 모두 명확히 포함되어 있을 경우.\n"
+        "- **거절**: 회의 내용, 장소, 참석자 중 하나라도 누락되거나 불명확할 경우.\n"
+        "- **보류**: 요청 정보가 명백히 불충분하여 승인 또는 거절 여부를 판단할 수 없는 경우(예: 요청 사유가 단어 하나로만 이루어진 경우).\n"
+        "- **예시**:\n"
+        "  - 승인: '화장실 고도화 미팅, 우드룸, 이승재'\n"
+        "  - 승인: '흡연 방지 회의, 5층, 이승재'\n"
+        "  - 거절: '회의 참석'\n"
+        "  - 보류: '회의'\n\n"
+    ),
+    "personal": (
+        "#### (비업무) 개인시간 (휴게 O):\n"
+        "- **승인**: 요청 사유가 **흡연**, **화장실** 등 명확한 개인적 이유일 경우.\n"
+        "- **거절**: 개인시간으로 보기 어려운 업무적 사유일 경우.\n"
+        "- **보류**: 요청 사유가 애매하거나 개인적 이유인지 명확하지 않을 경우.\n"
+        "- **예시**:\n"
+        "  - 승인: '흡연'\n"
+        "  - 승인: '화장실'\n"
+        "  - 거절: '문서 검토'\n"
+        "  - 보류: '시간 필요'\n\n"
+    ),
+    "other_work": (
+        "#### (업무) 기타업무 (휴게 X):\n"
+        "- **승인**: 요청 사유가 구체적이고 명확히 설명된 경우.\n"
+        "- **거절**: 요청 사유가 구체적이지 않거나 설명이 부족할 경우.\n"
+        "- **보류**: 요청 사유가 매우 짧거나 모호하여 추가 정보가 없으면 판단이 불가능한 경우.\n"
+        "- **예시**:\n"
+        "  - 승인: '거래처 자료 전달 업무'\n"
+        "  - 거절: '업무 요청'\n"
+        "  - 보류: '업무 관련 요청'\n\n"
+    ),
+    "business_trip": (
+        "#### (업무) 출장/이동/외근 (휴게 X):\n"
+        "- **승인**: 요청 사유에 **출장/외근 장소**와 **내용**이 모두 명시되어 있고, 외근 신청서 문서번호가 'AUTON'으로 시작하며 연속된 숫자가 포함되어 있을 경우.\n"
+        "- **거절**: 장소와 내용 중 하나라도 명시되지 않거나 문서번호 형식이 맞지 않을 경우.\n"
+        "- **보류**: 요청 정보가 불충분하여 승인 또는 거절을 판단하기 명백히 어려운 경우.\n"
+        "- **예시**:\n"
+        "  - 승인: 'AUTON20240101, 서울 본사 미팅'\n"
+        "  - 거절: '출장 요청'\n"
+        "  - 보류: '서울 출장'\n\n"
+    ),
+}
+
+CHAT_FOOTER = (
+    "### 보류 기준:\n"
+    "1. 보류는 극히 제한적인 경우에만 사용합니다.\n"
+    "2. 보류는 요청 정보가 **명백히 불충분**하거나, 승인/거절을 명확히 판단할 수 없는 경우에만 선택하세요.\n"
+    "3. 승인과 거절 중 하나로 판단 가능한 경우에는 보류를 사용하지 마세요.\n\n"
+)
+
+RAG_HEADER = """
+    당신은 직원 요청 승인 시스템입니다. 요청 종류와 요청 사유를 바탕으로 승인, 거절 중 하나를 판단합니다. 아래 정보를 참고하여 요청을 판단하세요:
+
+    ### 문서 정보
+    {context}
+
+    ### 승인 기준:
+"""
+
+RAG_SECTIONS = {
+    "personal": """    - (비업무)개인시간_흡연 등 : 개인적 활동은 모두 승인.
+""",
+    "meeting": """    - (업무)회의 : 장소, 내용이 포함된 경우 승인. 하나라도 누락된 경우 거절. (요청사유가 구체적이지 않아도 승인해라.)
+        - 참고로 회의실 종류에는 '3층', '1층', '2층', '4층', '5층', '로지', 'ROSY', 'CLOVER', '클로버', '우드', 'WOOD', '오션', 'OCEAN' 등 층수 또는 명사형으로 되어있다.
+        - 참고로 회의실은 사내 회의실 외 단순히 '외부장소', '자리', '데스크', '타운홀' 등과 같이 영어로도 나온다. 그래서 장소는 명사형 및 외부장소, 자리라고 되어있어도 승인해라.
+""",
+    "other_work": """    - (업무)기타업무 : 사유가 설명된 경우 승인.
+""",
+    "business_trip": """    - (업무)출장,이동,외근 : 출장 관련 내용이나 장소가 명시되어 있어야 함.
+""",
+}
+
+RAG_FOOTER = """
+    ### 요청 세부사항
+    요청 종류: {request_type}
+    요청 사유: {request_reason}
+
+    ### 결정 형식
+    결정 및 이유를 아래 형식으로 작성하세요:
+    - 결정: (승인, 거절 중 하나)
+    - 사유: (거절 이유를 간단히 설명)
+
+    결정 및 이유:
+    """
+
+
+def chat_registry(rule_engine):
+    return PromptRegistry(rule_engine, CHAT_HEADER, CHAT_SECTIONS, CHAT_FOOTER)
+
+
+def rag_registry(rule_engine):
+    return PromptRegistry(rule_engine, RAG_HEADER, RAG_SECTIONS, RAG_FOOTER)
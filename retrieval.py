@@ -0,0 +1,167 @@
+# 벡터 검색 공용 함수
+# batch_similarity_search: 여러 요청 사유를 한 번의 임베딩 호출로 벡터화하고 FAISS 행렬 검색 한 번으로 top-k 문서를 찾는다.
+# (vectorstore.similarity_search를 요청마다 부르면 요청 수만큼 임베딩 API 왕복이 생김)
+# metadata 필터: dict({"category": "meeting"}, 값이 list면 포함 여부) 또는 metadata를 받는 함수.
+# langchain FAISS similarity_search(filter=...)에도 그대로 넘길 수 있다.
+# PartitionedVectorStore: make_vector.py --partitioned로 만든 카테고리별 인덱스(partitions/<카테고리>)와
+# 공용 인덱스(partitions/policy, 정책 문서 등 카테고리 없는 문서) 중 요청 카테고리에 해당하는 것만 검색한다.
+# *_with_score / with_score=True는 [(Document, FAISS 거리), ...]를 반환 (context_assembler.py에서 점수 컷에 사용).
+# 각 인덱스 폴더에 store.json이 있으면 pickle 없는 메모리 매핑 형식(mmap_store.py)으로 연다.
+
+import os
+
+import numpy as np
+
+from mmap_store import MmapVectorStore, is_mmap_store
+
+PARTITIONS_DIR = "partitions"
+POLICY_PARTITION = "policy"
+
+
+# 요청 카테고리와 같은 행 + 카테고리가 없는 문서(정책 문서 등)만 통과
+def category_filter(category):
+    if category is None:
+        return None
+    return lambda metadata: metadata.get("category") in (None, category)
+
+
+def metadata_matches(metadata, filter):
+    if filter is None:
+        return True
+    if callable(filter):
+        return filter(metadata)
+    for key, value in filter.items():
+        if isinstance(value, list):
+            if metadata.get(key) not in value:
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+
+# 검색 결과(유사도 순)에서 필터를 통과한 상위 k개
+def filter_documents(documents, filter, k=3):
+    return [doc for doc in documents if metadata_matches(doc.metadata, filter)][:k]
+
+
+def filter_scored_documents(scored_documents, filter, k=3):
+    return [(doc, distance) for doc, distance in scored_documents if metadata_matches(doc.metadata, filter)][:k]
+
+
+def _query_vectors(vectorstore, vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if getattr(vectorstore, "_normalize_L2", False):
+        import faiss
+        vectors = vectors.copy()
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+# 쿼리 벡터 행렬로 FAISS 검색 한 번 -> 쿼리마다 [(Document, 거리), ...] (가까운 순)
+def search_by_vectors(vectorstore, vectors, k):
+    if vectorstore.index.ntotal == 0:
+        return [[] for _ in range(len(vectors))]
+    distances, indices = vectorstore.index.search(_query_vectors(vectorstore, vectors), k)
+    results = []
+    for distance_row, index_row in zip(distances, indices):
+        docs = []
+        for distance, i in zip(distance_row, index_row):
+            if i == -1:  # 인덱스 문서 수가 k보다 적은 경우
+                continue
+            if isinstance(vectorstore, MmapVectorStore):
+                docs.append((vectorstore.document_at(int(i)), float(distance)))
+                continue
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)])
+            if not isinstance(doc, str):  # docstore에 없으면 안내 문자열이 반환됨
+                docs.append((doc, float(distance)))
+        results.append(docs)
+    return results
+
+
+# queries -> {query: [Document, ...]} (중복/빈 문자열은 제외)
+# 나중에 filter_documents로 거를 경우 fetch_k개를 후보로 가져옴
+def batch_similarity_search(vectorstore, embeddings, queries, k=3, fetch_k=None):
+    unique_queries = list(dict.fromkeys(query for query in queries if query))
+    if not unique_queries:
+        return {}
+
+    vectors = embeddings.embed_documents(unique_queries)
+    rows = search_by_vectors(vectorstore, vectors, max(k, fetch_k or 0))
+    return {query: [doc for doc, _ in row] for query, row in zip(unique_queries, rows)}
+
+
+# 메모리 매핑 형식이면 MmapVectorStore, 아니면 FAISS.load_local (index.pkl)
+def load_vectorstore(path, embeddings):
+    if is_mmap_store(path):
+        return MmapVectorStore(path, embeddings)
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS.load_local(path, embeddings=embeddings, allow_dangerous_deserialization=True)
+
+
+# partitions/<카테고리> 폴더의 인덱스를 모두 로드 (없으면 빈 dict)
+def load_partitions(path, embeddings):
+    partitions = {}
+    partitions_path = os.path.join(path, PARTITIONS_DIR)
+    if os.path.isdir(partitions_path):
+        for key in sorted(os.listdir(partitions_path)):
+            partitions[key] = load_vectorstore(os.path.join(partitions_path, key), embeddings)
+    return partitions
+
+
+class PartitionedVectorStore:
+    def __init__(self, full, partitions, embeddings):
+        self.full = full  # 전체 인덱스 (파티션이 없거나 카테고리를 모르는 요청용)
+        self.partitions = partitions
+        self.embeddings = embeddings
+
+    @classmethod
+    def load(cls, path, embeddings):
+        return cls(load_vectorstore(path, embeddings), load_partitions(path, embeddings), embeddings)
+
+    # 요청 카테고리에서 검색할 인덱스 목록 (None이면 전체 인덱스 + 카테고리 필터)
+    def stores_for(self, category):
+        if not self.partitions or category is None:
+            return None
+        return [store for store in (self.partitions.get(category), self.partitions.get(POLICY_PARTITION)) if store is not None]
+
+    # 같은 카테고리의 쿼리끼리 행렬 검색하고 파티션별 결과를 거리순으로 합침
+    def _search(self, category, queries, vectors, k, fetch_k):
+        stores = self.stores_for(category)
+        if stores is None:
+            search_filter = category_filter(category)
+            rows = search_by_vectors(self.full, vectors, max(k, fetch_k or 0) if search_filter else k)
+            return [filter_scored_documents(row, search_filter, k) for row in rows]
+
+        merged = [[] for _ in queries]
+        for store in stores:
+            for i, row in enumerate(search_by_vectors(store, vectors, k)):
+                merged[i].extend(row)
+        return [sorted(row, key=lambda item: item[1])[:k] for row in merged]
+
+    def similarity_search_with_score(self, query, category=None, k=3, fetch_k=None):
+        vector = self.embeddings.embed_query(query)
+        return self._search(category, [query], [vector], k, fetch_k)[0]
+
+    def similarity_search(self, query, category=None, k=3, fetch_k=None):
+        return [doc for doc, _ in self.similarity_search_with_score(query, category, k, fetch_k)]
+
+    # [(카테고리, 요청 사유), ...] -> {(카테고리, 요청 사유): [Document, ...]} (임베딩 호출은 한 번)
+    def batch_similarity_search(self, requests, k=3, fetch_k=None, with_score=False):
+        requests = list(dict.fromkeys((category, query) for category, query in requests if query))
+        if not requests:
+            return {}
+
+        unique_queries = list(dict.fromkeys(query for _, query in requests))
+        vectors = dict(zip(unique_queries, self.embeddings.embed_documents(unique_queries)))
+
+        groups = {}
+        for category, query in requests:
+            groups.setdefault(category, []).append(query)
+
+        results = {}
+        for category, queries in groups.items():
+            rows = self._search(category, queries, [vectors[query] for query in queries], k, fetch_k)
+            for query, row in zip(queries, rows):
+                results[(category, query)] = row if with_score else [doc for doc, _ in row]
+        return results
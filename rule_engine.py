@@ -0,0 +1,155 @@
+# 규칙 기반 판단 (LLM 호출 전 단계)
+# decision_rules.json 한 곳에서 설정을 읽어 정규식으로 컴파일하고,
+# 기계적으로 판단 가능한 요청(개인시간, 회의실이 명시된 회의, AUTON 문서번호가 있는 출장)은 바로 승인한다.
+# 판단이 애매한 요청은 None을 반환하여 LLM으로 넘긴다.
+# 프롬프트 종류(prompt_kind: app.py "chat" / Lambda "rag")마다 승인 조건이 다른 경우
+# (예: chat 프롬프트는 회의 참석자 필요) decision_rules.json의 require_attendee에 종류를 적는다.
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, namedtuple
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "decision_rules.json")
+
+RuleDecision = namedtuple("RuleDecision", ["decision", "reason", "rule"])
+
+_separators = re.compile(r"[\s,./·:;()\[\]_\-]+")
+
+# 단어 경계 판단용 (한글/영문/숫자가 이어지면 같은 단어)
+_WORD_CHARS = "0-9A-Za-z가-힣"
+
+
+def _alternation(terms):
+    # 긴 단어부터 매칭되도록 정렬
+    terms = sorted((unicodedata.normalize('NFKC', t) for t in terms), key=len, reverse=True)
+    return "|".join(re.escape(t) for t in terms)
+
+
+def _compile_terms(terms):
+    return re.compile(_alternation(terms), re.IGNORECASE) if terms else None
+
+
+# 단어 단위로만 매칭 (예: CLOVER는 "CLOVER 회의실"에는 매칭, "CLOVERFIELD"에는 매칭 안 됨)
+# suffixes: 단어 뒤에 붙어도 되는 말 (예: "우드룸", "3층에서")
+def _compile_words(terms, suffixes=()):
+    if not terms:
+        return None
+    suffix = f"(?:{_alternation(suffixes)})?" if suffixes else ""
+    return re.compile(
+        f"(?<![{_WORD_CHARS}])(?:{_alternation(terms)}){suffix}(?![{_WORD_CHARS}])", re.IGNORECASE
+    )
+
+
+# 매칭된 부분을 제외한 나머지 내용 길이 (구분자 제외)
+def _remaining_chars(text, *patterns):
+    for pattern in patterns:
+        if pattern is not None:
+            text = pattern.sub(" ", text)
+    return len(_separators.sub("", text))
+
+
+class RuleEngine:
+    def __init__(self, config, prompt_kind=None):
+        self.config = config
+        self.prompt_kind = prompt_kind
+        self.categories = []
+        for key, category in config["categories"].items():
+            compiled = dict(category)
+            compiled["key"] = key
+            compiled["keywords"] = [unicodedata.normalize('NFKC', k) for k in category.get("keywords", [])]
+            compiled["rooms_re"] = _compile_words(category.get("rooms", []), category.get("room_suffixes", []))
+            compiled["attendees_re"] = _compile_terms(category.get("attendee_titles", []))
+            compiled["generic_re"] = _compile_words(category.get("generic_words", []))
+            pattern = category.get("document_pattern")
+            compiled["document_re"] = re.compile(pattern, re.IGNORECASE) if pattern else None
+            self.categories.append(compiled)
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path=RULES_PATH, prompt_kind=None):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), prompt_kind)
+
+    # 요청 종류 문자열에서 카테고리 찾기 (예: '(업무)회의 (휴게 X)' -> meeting)
+    def match_category(self, request_type):
+        request_type = unicodedata.normalize('NFKC', request_type or "")
+        for category in self.categories:
+            if any(keyword in request_type for keyword in category["keywords"]):
+                return category
+        return None
+
+    def category_of(self, request_type):
+        category = self.match_category(request_type)
+        return category["key"] if category else None
+
+    # 규칙 판단 결과만 계산 (통계에 기록하지 않음, 사전 필터링용)
+    def evaluate(self, request_type, request_reason):
+        category = self.match_category(request_type)
+        reason = unicodedata.normalize('NFKC', request_reason or "").strip()
+        result = None
+        if category is not None and reason:
+            rule = category.get("rule")
+            if rule == "always_approve":
+                result = RuleDecision("승인", category.get("reason", ""), f"{category['key']}:{rule}")
+            elif rule == "meeting":
+                result = self._decide_meeting(category, reason)
+            elif rule == "document_number":
+                result = self._decide_document_number(category, reason)
+        return result
+
+    def decide(self, request_type, request_reason):
+        result = self.evaluate(request_type, request_reason)
+        with self._lock:
+            self.counts[result.rule if result else "deferred"] += 1
+        return result
+
+    def _decide_meeting(self, category, reason):
+        rooms_re = category["rooms_re"]
+        if rooms_re is None or not rooms_re.search(reason):
+            return None
+        attendees_re = category["attendees_re"]
+        if self.prompt_kind in category.get("require_attendee", []) and (
+            attendees_re is None or not attendees_re.search(reason)
+        ):
+            return None
+        # 장소, 참석자, "회의"/"참석" 같은 일반적인 말 외에 회의 내용이 있어야 승인
+        if _remaining_chars(reason, rooms_re, attendees_re, category["generic_re"]) < category.get("min_content_chars", 1):
+            return None
+        return RuleDecision("승인", category.get("reason", ""), f"{category['key']}:meeting")
+
+    def _decide_document_number(self, category, reason):
+        document_re = category["document_re"]
+        if document_re is None or not document_re.search(reason):
+            return None
+        if _remaining_chars(reason, document_re) < category.get("min_content_chars", 1):
+            return None
+        return RuleDecision("승인", category.get("reason", ""), f"{category['key']}:document_number")
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        deferred = counts.get("deferred", 0)
+        return {
+            "total": total,
+            "decided_locally": total - deferred,
+            "deferred_to_llm": deferred,
+            "local_rate": round((total - deferred) / total, 4) if total else 0.0,
+            "by_rule": counts,
+        }
+
+
+_default_engines = {}
+
+
+# 모듈 단위로 프롬프트 종류마다 한 번만 로드해서 재사용
+def get_rule_engine(path=None, prompt_kind=None):
+    if path is not None:
+        return RuleEngine.from_file(path, prompt_kind)
+    if prompt_kind not in _default_engines:
+        _default_engines[prompt_kind] = RuleEngine.from_file(os.getenv("DECISION_RULES_PATH", RULES_PATH), prompt_kind)
+    return _default_engines[prompt_kind]
@@ -2,6 +2,7 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import accuracy_score
 import joblib  # 모델 저장 및 불러오기 위해 joblib 사용
 
@@ -36,7 +37,8 @@ X_train_vec = vectorizer.fit_transform(X_train)
 X_test_vec = vectorizer.transform(X_test)
 
 # 5. 모델 학습
-model = RandomForestClassifier(random_state=42)
+# cascade(app.py, lambda_main.py)에서 승인 확률을 임계값과 비교하므로 확률을 보정(isotonic)해서 학습
+model = CalibratedClassifierCV(RandomForestClassifier(random_state=42), method='isotonic', cv=3)
 model.fit(X_train_vec, y_train)
 
 # 6. 모델 저장
@@ -0,0 +1,65 @@
+# ann_index HNSW / IVF-PQ 생성과 recall 보고 확인 (python -m pytest test_ann_index.py)
+import json
+import os
+
+import faiss
+import numpy as np
+
+import ann_index
+
+
+def random_vectors(count, dim=32, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_flat_and_hnsw_find_the_exact_neighbours():
+    vectors = random_vectors(2000)
+    queries = random_vectors(50, seed=1)
+    flat, _ = ann_index.build_index(vectors, "flat")
+    assert ann_index.evaluate(flat, vectors, queries, k=3)["recall_at_k"] == 1.0
+
+    hnsw, params = ann_index.build_index(vectors, "hnsw", {"ef_search": 128})
+    assert params["ef_search"] == 128
+    report = ann_index.evaluate(hnsw, vectors, queries, k=3)
+    assert report["recall_at_k"] >= 0.95
+    assert report["queries"] == 50
+
+
+def test_holdout_split_keeps_queries_out_of_the_index():
+    vectors = random_vectors(100)
+    base, held_out = ann_index.holdout_split(vectors, queries=50)
+    assert len(held_out) == 20  # 최대 전체의 20%
+    assert len(base) + len(held_out) == 100
+    assert not (held_out[:, None, :] == base[None, :, :]).all(axis=2).any()
+
+
+def test_ivfpq_adjusts_params_to_the_data():
+    vectors = random_vectors(2000, dim=30)
+    index, params = ann_index.build_index(vectors, "ivfpq")
+    assert params["nlist"] == 2000 // 39
+    assert 30 % params["pq_m"] == 0
+    assert index.ntotal == 2000
+
+    small, params = ann_index.build_index(random_vectors(100), "ivfpq")
+    assert params["fallback"] == "flat"
+    assert isinstance(small, faiss.IndexFlatL2)
+
+
+def test_build_ann_writes_index_and_report(tmp_path):
+    path = str(tmp_path)
+    flat = faiss.IndexFlatL2(32)
+    flat.add(random_vectors(500))
+    faiss.write_index(flat, os.path.join(path, "index.faiss"))
+
+    report = ann_index.build_ann(path, "hnsw", k=3, queries=20)
+    assert os.path.exists(os.path.join(path, ann_index.index_file_name("hnsw")))
+    with open(os.path.join(path, ann_index.REPORT_FILE), encoding="utf-8") as f:
+        assert json.load(f) == report
+    assert report["count"] == 500 and report["dim"] == 32
+    assert (report["query_source"], report["queries"]) == ("held_out", 20)
+
+    report = ann_index.build_ann(path, "hnsw", k=3, query_vectors=random_vectors(7, seed=1))
+    assert (report["query_source"], report["queries"]) == ("external", 7)
+
+    ann_index.remove_ann_files(path)
+    assert sorted(os.listdir(path)) == ["index.faiss"]
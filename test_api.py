@@ -3,27 +3,44 @@ from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score
-import joblib
-from flask import Flask, request, render_template, jsonify
+import os
+import threading
+from flask import Flask, Response, request, render_template, jsonify
+from model_holder import ModelHolder
+from metrics import CONTENT_TYPE, render as render_metrics, timed
 
 app = Flask(__name__)
 
+# 모델과 벡터라이저는 첫 예측 때 한 번만 불러오고, 파일이 바뀌면 자동으로 교체
+# (import 시점에는 불러오지 않으므로 모델 파일 없이도 모듈을 import 할 수 있음)
+model_holder = None
+_model_holder_lock = threading.Lock()
+
 # 모델과 벡터라이저 불러오기
 def load_model_and_vectorizer():
-    model = joblib.load('random_forest_model.pkl')  # 저장된 모델 불러오기
-    vectorizer = joblib.load('tfidf_vectorizer.pkl')  # 저장된 벡터라이저 불러오기
-    return model, vectorizer
+    global model_holder
+    if model_holder is None:
+        with _model_holder_lock:
+            if model_holder is None:
+                model_holder = ModelHolder(
+                    'random_forest_model.pkl',
+                    'tfidf_vectorizer.pkl',
+                    poll_interval=float(os.getenv("MODEL_POLL_INTERVAL", "5")),
+                )
+    return model_holder.get()
 
 # 예측 함수
 def predict_status(new_request, new_reason):
-    model, vectorizer = load_model_and_vectorizer()  # 모델과 벡터라이저 불러오기
+    model, vectorizer = load_model_and_vectorizer()  # 공유 모델 참조 (파일을 다시 읽지 않음)
     
     # 입력 텍스트 생성
     input_text = new_request + ' ' + new_reason
-    input_vec = vectorizer.transform([input_text])  # 벡터화
+    with timed("vectorize"):
+        input_vec = vectorizer.transform([input_text])  # 벡터화
     
     # 예측
-    prediction = model.predict(input_vec)
+    with timed("predict"):
+        prediction = model.predict(input_vec)
     return '승인됨' if prediction[0] == 1 else '거절됨'
 
 # 기본 페이지 렌더링
@@ -45,6 +62,11 @@ def predict():
     result = predict_status(request_category, reason)
     return render_template('index.html', decision=result)
 
+# 단계별 지표 (Prometheus)
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype=CONTENT_TYPE)
+
 # 서버 실행
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
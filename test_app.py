@@ -0,0 +1,179 @@
+# app.py 배치/스트리밍 판단 확인 (python -m pytest test_app.py)
+# 모델 호출은 가짜 응답으로 대체하고, 캐시와 판단 로그는 임시 폴더에 만든다.
+import json
+import os
+import tempfile
+import threading
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DECISION_CACHE_PATH", os.path.join(_tmp, "decision_cache.sqlite3"))
+os.environ.setdefault("DECISION_LOG_PATH", os.path.join(_tmp, "decisions.sqlite3"))
+os.environ.setdefault("CASCADE_ENABLED", "0")
+
+import openai  # noqa: E402
+
+import app  # noqa: E402
+import metrics  # noqa: E402
+
+OTHER_WORK = "(업무)기타업무"
+PERSONAL = "(비업무)개인시간_흡연 등"
+
+
+# 요청 사유에 fail_on이 들어 있으면 예외, 아니면 answer를 반환하는 가짜 모델
+def fake_model(monkeypatch, answer="승인", fail_on=None, delay=0):
+    calls = []
+    active = [0, 0]  # 현재 동시 호출 수, 최대 동시 호출 수
+    lock = threading.Lock()
+
+    def create(model, messages, **kwargs):
+        content = messages[-1]["content"]
+        with lock:
+            calls.append(content)
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        try:
+            time.sleep(delay)
+            if fail_on and fail_on in content:
+                raise RuntimeError("model down")
+            return {"choices": [{"message": {"content": f" {answer} "}}]}
+        finally:
+            with lock:
+                active[0] -= 1
+
+    monkeypatch.setattr(openai.ChatCompletion, "create", create)
+    return calls, active
+
+
+def test_batch_deduplicates_and_keeps_input_order(monkeypatch):
+    calls, _ = fake_model(monkeypatch)
+    items = [
+        {"request_type": OTHER_WORK, "request_reason": "배치 거래처 자료 전달"},
+        {"request_type": OTHER_WORK, "request_reason": "배치 다른 업무"},
+        {"request_type": OTHER_WORK},
+        {"request_type": OTHER_WORK, "request_reason": "배치  거래처 자료 전달 "},
+        "잘못된 항목",
+    ]
+    results = app.decide_batch(items, concurrency=4)
+
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert len(calls) == 2  # 같은 요청은 한 번만 판단
+    assert results[0]["decision"] == results[3]["decision"] == "승인"
+    assert results[3]["request_reason"] == "배치  거래처 자료 전달 "
+    assert results[1]["decision"] == "승인"
+    assert "error" in results[2] and "error" in results[4]
+
+
+def test_batch_reports_errors_per_item(monkeypatch):
+    fake_model(monkeypatch, fail_on="실패")
+    results = app.decide_batch([
+        {"request_type": OTHER_WORK, "request_reason": "오류 확인 정상 요청"},
+        {"request_type": OTHER_WORK, "request_reason": "오류 확인 실패 요청"},
+    ])
+    assert results[0]["decision"] == "승인"
+    assert results[1]["error"].startswith("오류:")
+    assert "decision" not in results[1]
+
+
+def test_batch_respects_concurrency_limit(monkeypatch):
+    calls, active = fake_model(monkeypatch, delay=0.05)
+    items = [{"request_type": OTHER_WORK, "request_reason": f"동시 실행 확인 {i}"} for i in range(6)]
+    results = app.decide_batch(items, concurrency=2)
+    assert len(calls) == 6
+    assert active[1] == 2
+    assert all(result["decision"] == "승인" for result in results)
+
+
+def test_batch_route_validates_payload():
+    client = app.app.test_client()
+    assert client.post("/decide/batch", json={"items": []}).status_code == 400
+    assert client.post("/decide/batch", json={"items": [{}], "concurrency": "많이"}).status_code == 400
+
+
+# stream=True 호출에 chunks를 delta 청크로 돌려주는 가짜 모델
+def fake_stream(monkeypatch, chunks, error=None):
+    calls = []
+
+    def create(model, messages, stream=False, **kwargs):
+        calls.append(stream)
+        if error:
+            raise error
+        return iter([{"choices": [{"delta": {"content": chunk}}]} for chunk in chunks] + [{"choices": [{"delta": {}}]}])
+
+    monkeypatch.setattr(openai.ChatCompletion, "create", create)
+    return calls
+
+
+def stream_events(request_type, request_reason):
+    response = app.app.test_client().get(
+        "/decide/stream", query_string={"request_type": request_type, "request_reason": request_reason}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_sends_label_before_explanation(monkeypatch):
+    calls = fake_stream(monkeypatch, ["거절", "\n", "사유: 회의 ", "장소가 없습니다."])
+    events = stream_events(OTHER_WORK, "스트리밍 라벨 확인")
+
+    assert calls == [True]
+    assert events[0] == ("label", {"label": "거절"})
+    assert [event for event, _ in events[1:]] == ["delta"] * 4 + ["done"]
+    assert "".join(data["text"] for event, data in events if event == "delta") == "거절\n사유: 회의 장소가 없습니다."
+    assert events[-1][1] == {"decision": "거절\n사유: 회의 장소가 없습니다."}
+
+
+def test_stream_label_split_across_chunks_is_still_first(monkeypatch):
+    fake_stream(monkeypatch, ["결정: 거", "절\n", "사유: 내용 없음"])
+    events = stream_events(OTHER_WORK, "스트리밍 나뉜 라벨 확인")
+    assert events == [
+        ("label", {"label": "거절"}),
+        ("delta", {"text": "결정: 거절\n"}),
+        ("delta", {"text": "사유: 내용 없음"}),
+        ("done", {"decision": "결정: 거절\n사유: 내용 없음"}),
+    ]
+
+
+def test_stream_without_label_sends_text_at_the_end(monkeypatch):
+    fake_stream(monkeypatch, ["판단할 ", "수 없습니다."])
+    events = stream_events(OTHER_WORK, "스트리밍 라벨 없음 확인")
+    assert events == [("delta", {"text": "판단할 수 없습니다."}), ("done", {"decision": "판단할 수 없습니다."})]
+
+
+def stage_seconds(stage):
+    prefix = f'decision_stage_seconds_sum{{stage="{stage}"}} '
+    lines = [line for line in metrics.render().splitlines() if line.startswith(prefix)]
+    return float(lines[0][len(prefix):]) if lines else 0.0
+
+
+def test_stream_model_call_excludes_time_spent_sending_events(monkeypatch):
+    fake_stream(monkeypatch, ["승인", " 사유 없음"])
+    before = stage_seconds("model_call")
+    for _ in app.stream_decision(OTHER_WORK, "스트리밍 시간 확인"):
+        time.sleep(0.05)  # 느린 클라이언트
+    assert stage_seconds("model_call") - before < 0.05
+
+
+def test_stream_local_decision_skips_model(monkeypatch):
+    calls = fake_stream(monkeypatch, [])
+    events = stream_events(PERSONAL, "흡연")
+    assert calls == []
+    assert [event for event, _ in events] == ["label", "delta", "done"]
+    assert events[0][1] == {"label": "승인"}
+
+
+def test_stream_reports_model_error(monkeypatch):
+    fake_stream(monkeypatch, [], error=RuntimeError("model down"))
+    events = stream_events(OTHER_WORK, "스트리밍 오류 확인")
+    assert events == [("error", {"error": "오류: model down"})]
+
+
+def test_stream_route_requires_fields():
+    client = app.app.test_client()
+    assert client.get("/decide/stream", query_string={"request_type": OTHER_WORK}).status_code == 400
+    assert b'data-stream-url="/decide/stream"' in client.get("/").data
@@ -0,0 +1,95 @@
+# async_app.py 스트리밍 판단 확인 (python -m pytest test_async_app.py)
+# 모델 호출은 가짜 응답으로 대체하고, 캐시와 판단 로그는 임시 폴더에 만든다.
+import asyncio
+import json
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DECISION_CACHE_PATH", os.path.join(_tmp, "decision_cache.sqlite3"))
+os.environ.setdefault("DECISION_LOG_PATH", os.path.join(_tmp, "decisions.sqlite3"))
+os.environ.setdefault("CASCADE_ENABLED", "0")
+
+import openai  # noqa: E402
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+import async_app  # noqa: E402
+
+OTHER_WORK = "(업무)기타업무"
+PERSONAL = "(비업무)개인시간_흡연 등"
+
+
+# stream=True 호출에 chunks를 delta 청크로 돌려주는 가짜 모델
+def fake_stream(monkeypatch, chunks, error=None):
+    calls = []
+
+    async def acreate(model, messages, stream=False, **kwargs):
+        calls.append(stream)
+        if error:
+            raise error
+
+        async def generate():
+            for chunk in chunks:
+                yield {"choices": [{"delta": {"content": chunk}}]}
+            yield {"choices": [{"delta": {}}]}
+
+        return generate()
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", acreate)
+    return calls
+
+
+# 테스트 서버에 GET 요청 -> (상태 코드, Content-Type, 본문)
+def get(path, params=None):
+    async def run():
+        async with TestClient(TestServer(async_app.create_app())) as client:
+            response = await client.get(path, params=params)
+            return response.status, response.content_type, await response.text()
+
+    return asyncio.run(run())
+
+
+def stream_events(request_type, request_reason):
+    status, content_type, body = get(
+        "/decide/stream", {"request_type": request_type, "request_reason": request_reason}
+    )
+    assert status == 200
+    assert content_type == "text/event-stream"
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_sends_label_before_explanation(monkeypatch):
+    calls = fake_stream(monkeypatch, ["결정: 거", "절\n", "사유: 회의 장소가 없습니다."])
+    events = stream_events(OTHER_WORK, "비동기 스트리밍 라벨 확인")
+
+    assert calls == [True]
+    assert events == [
+        ("label", {"label": "거절"}),
+        ("delta", {"text": "결정: 거절\n"}),
+        ("delta", {"text": "사유: 회의 장소가 없습니다."}),
+        ("done", {"decision": "결정: 거절\n사유: 회의 장소가 없습니다."}),
+    ]
+
+
+def test_stream_local_decision_skips_model(monkeypatch):
+    calls = fake_stream(monkeypatch, [])
+    events = stream_events(PERSONAL, "흡연")
+    assert calls == []
+    assert events == [("label", {"label": "승인"}), ("delta", {"text": "승인"}), ("done", {"decision": "승인"})]
+
+
+def test_stream_reports_model_error(monkeypatch):
+    fake_stream(monkeypatch, [], error=RuntimeError("model down"))
+    events = stream_events(OTHER_WORK, "비동기 스트리밍 오류 확인")
+    assert events == [("error", {"error": "오류: model down"})]
+
+
+def test_stream_route_requires_fields_and_index_links_it():
+    assert get("/decide/stream", {"request_type": OTHER_WORK})[0] == 400
+    status, _, html = get("/")
+    assert status == 200
+    assert 'data-stream-url="/decide/stream"' in html
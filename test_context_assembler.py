@@ -0,0 +1,54 @@
+# context_assembler 중복 제거/점수 컷/토큰 예산 확인 (python -m pytest test_context_assembler.py)
+from langchain_core.documents import Document
+
+from context_assembler import ContextAssembler, similarity_from_distance
+from prompt_registry import count_tokens
+
+
+def scored(*items):
+    return [(Document(page_content=text), distance) for text, distance in items]
+
+
+def test_similarity_from_distance():
+    assert similarity_from_distance(0.0) == 1.0
+    assert similarity_from_distance(2.0) == 0.0
+
+
+def test_orders_by_distance_and_drops_low_scores():
+    assembler = ContextAssembler(max_tokens=500, min_score=0.3, near_duplicate=0.85)
+    context = assembler.assemble(scored(("두 번째", 0.4), ("첫 번째", 0.1), ("관련 없음", 1.8)))
+    assert context == "첫 번째\n두 번째"
+    assert assembler.stats()["below_min_score"] == 1
+
+
+def test_drops_exact_and_near_duplicates():
+    assembler = ContextAssembler(max_tokens=500, min_score=0.0, near_duplicate=0.8)
+    base = "요청: (업무)회의 / 사유: 3층 로지 회의실 주간 업무 회의 / 결과: 승인"
+    context = assembler.assemble(scored(
+        (base, 0.1),
+        ("  " + base.upper() + " ", 0.2),
+        (base.replace("승인", "승인."), 0.3),
+        ("요청: (업무)출장 / 사유: AUTON1234 고객사 미팅 / 결과: 승인", 0.4),
+    ))
+    assert context.split("\n") == [base, "요청: (업무)출장 / 사유: AUTON1234 고객사 미팅 / 결과: 승인"]
+    stats = assembler.stats()
+    assert stats["duplicates"] == 1
+    assert stats["near_duplicates"] == 1
+
+
+def test_respects_token_budget():
+    texts = [f"과거 요청 {i} " + "내용 " * 10 for i in range(5)]
+    budget = count_tokens(texts[0]) * 2 + count_tokens("\n")
+    assembler = ContextAssembler(max_tokens=budget, min_score=0.0, near_duplicate=1.01)
+    context = assembler.assemble(scored(*[(text, 0.1 * i) for i, text in enumerate(texts)]))
+    assert count_tokens(context) <= budget
+    assert context.split("\n") == [texts[0].strip(), texts[1].strip()]
+    assert assembler.stats()["over_budget"] == 3
+
+
+def test_truncates_first_chunk_longer_than_budget():
+    assembler = ContextAssembler(max_tokens=10, min_score=0.0)
+    context = assembler.assemble(scored(("아주 긴 정책 문서 " * 20, 0.1)))
+    assert context
+    assert count_tokens(context) <= 10
+    assert assembler.stats()["truncated"] == 1
@@ -0,0 +1,59 @@
+# decision_cache 저장/만료/버전 확인 (python -m pytest test_decision_cache.py)
+import time
+
+from decision_cache import DecisionCache, make_key, make_version
+
+
+def test_key_ignores_whitespace_case_and_width():
+    assert make_key("(업무)회의", "주간  회의 ABC") == make_key("(업무)회의 ", "주간 회의 abc")
+    assert make_key("(업무)회의", "주간 회의") != make_key("(업무)기타업무", "주간 회의")
+
+
+def test_decision_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = DecisionCache(path, version="v1")
+    assert cache.get("(업무)회의", "주간 회의") is None
+    cache.set("(업무)회의", "주간 회의", "승인")
+    cache.close()
+
+    cache = DecisionCache(path, version="v1")
+    assert cache.get("(업무)회의", "주간  회의") == "승인"
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+
+def test_version_change_invalidates(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = DecisionCache(path, version=make_version("model-a", "prompt"))
+    cache.set("(업무)회의", "주간 회의", "승인")
+    cache.close()
+
+    cache = DecisionCache(path, version=make_version("model-b", "prompt"))
+    assert cache.get("(업무)회의", "주간 회의") is None
+    cache.close()
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = DecisionCache(str(tmp_path / "cache.db"), version="v1", ttl=0.05)
+    cache.set("(업무)회의", "주간 회의", "승인")
+    time.sleep(0.1)
+    assert cache.get("(업무)회의", "주간 회의") is None
+    assert cache.stats()["size"] == 0
+    cache.close()
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = DecisionCache(path, version="v1", max_entries=2)
+    cache.set("t", "a", "승인")
+    cache.set("t", "b", "거절")
+    assert cache.get("t", "a") == "승인"  # a가 최근 사용
+    cache.set("t", "c", "보류")
+    assert cache.get("t", "b") is None
+    assert cache.get("t", "a") == "승인"
+    cache.close()
+
+    cache = DecisionCache(path, version="v1", max_entries=2)
+    assert cache.stats()["size"] == 2
+    assert cache.get("t", "c") == "보류"
+    cache.close()
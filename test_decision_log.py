@@ -0,0 +1,85 @@
+# decision_log 저장/엑셀 내보내기 확인 (python -m pytest test_decision_log.py)
+import threading
+
+import pandas as pd
+import pytest
+
+from decision_log import COLUMNS, DecisionLog
+
+
+def test_export_round_trip(tmp_path):
+    log = DecisionLog(str(tmp_path / "decisions.sqlite3"))
+    rows = [
+        ("(업무)회의", "3층 로지 주간 회의", "승인"),
+        ("(업무)기타업무", "업무 요청", "거절"),
+        ("(비업무)개인시간_흡연 등", "흡연", "승인"),
+    ]
+    log.append(*rows[0])
+    log.append_many(rows[1:])
+    path = log.export_xlsx(str(tmp_path / "export.xlsx"))
+    log.close()
+
+    df = pd.read_excel(path)
+    assert list(df.columns) == COLUMNS
+    assert list(df[COLUMNS[1:]].itertuples(index=False, name=None)) == rows
+    assert df['시간'].notna().all()
+
+
+def test_rows_survive_reopen(tmp_path):
+    path = str(tmp_path / "decisions.sqlite3")
+    log = DecisionLog(path)
+    log.append("(업무)회의", "재시작 전", "승인")
+    log.close()
+
+    log = DecisionLog(path)
+    log.append("(업무)회의", "재시작 후", "보류")
+    df = pd.read_excel(log.export_xlsx(str(tmp_path / "export.xlsx")))
+    log.close()
+    assert list(df['요청 사유']) == ["재시작 전", "재시작 후"]
+
+
+def test_concurrent_appends_are_all_written(tmp_path):
+    log = DecisionLog(str(tmp_path / "decisions.sqlite3"), batch_size=7)
+
+    def write(worker):
+        for i in range(50):
+            log.append("(업무)기타업무", f"{worker}-{i}", "승인")
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    df = pd.read_excel(log.export_xlsx(str(tmp_path / "export.xlsx")))
+    log.close()
+    assert len(df) == 200
+    assert len(set(df['요청 사유'])) == 200
+
+
+def test_existing_workbook_is_imported_once(tmp_path):
+    workbook = str(tmp_path / "user_requests.xlsx")
+    history = pd.DataFrame(
+        [["2024-01-02 09:00:00", "(업무)회의", "예전 기록", "승인"], ["2024-01-02 10:00:00", "(업무)기타업무", None, "보류"]],
+        columns=COLUMNS,
+    )
+    history.to_excel(workbook, index=False)
+
+    path = str(tmp_path / "decisions.sqlite3")
+    log = DecisionLog(path, export_path=workbook)
+    log.append("(업무)회의", "새 기록", "승인")
+    log.export_xlsx()
+    log.close()
+
+    log = DecisionLog(path, export_path=workbook)  # 이미 가져온 뒤에는 다시 가져오지 않음
+    df = pd.read_excel(log.export_xlsx())
+    log.close()
+    assert list(df['요청 사유'].fillna("")) == ["예전 기록", "", "새 기록"]
+    assert list(df['시간'][:2]) == ["2024-01-02 09:00:00", "2024-01-02 10:00:00"]
+
+
+def test_unreadable_workbook_is_not_overwritten(tmp_path):
+    workbook = tmp_path / "user_requests.xlsx"
+    pd.DataFrame({"다른 컬럼": [1]}).to_excel(workbook, index=False)
+    with pytest.raises(ValueError):
+        DecisionLog(str(tmp_path / "decisions.sqlite3"), export_path=str(workbook))
+    assert list(pd.read_excel(workbook).columns) == ["다른 컬럼"]
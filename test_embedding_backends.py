@@ -0,0 +1,51 @@
+# embedding_backends hashed 임베딩 / 설정 기록 확인 (python -m pytest test_embedding_backends.py)
+import numpy as np
+import pytest
+
+from embedding_backends import HashedNgramEmbeddings, describe, get_embeddings, save_config
+from embedding_cache import CachedEmbeddings
+
+
+def test_hashed_vectors_are_deterministic_and_normalized():
+    embeddings = HashedNgramEmbeddings(dim=256)
+    first = embeddings.embed_documents(["3층 로지 회의실 주간 회의", ""])
+    again = HashedNgramEmbeddings(dim=256).embed_query("3층 로지 회의실 주간 회의")
+    assert first[0] == again
+    assert len(again) == 256
+    assert np.linalg.norm(first[0]) == pytest.approx(1.0, abs=1e-5)
+    assert not any(first[1])  # 빈 문장은 0 벡터
+
+
+def test_similar_reasons_are_closer_than_unrelated_ones():
+    embeddings = HashedNgramEmbeddings(dim=1024)
+    base, similar, unrelated = np.asarray(embeddings.embed_documents([
+        "3층 로지 회의실 주간 업무 회의", "3층 로지 회의실 주간 회의", "AUTON1234 고객사 외근",
+    ]))
+    assert base @ similar > base @ unrelated
+
+
+def test_svd_projection_is_saved_and_required(tmp_path):
+    texts = [f"회의실 {i}층 주간 회의" for i in range(20)] + [f"AUTON{i} 외근" for i in range(20)]
+    embeddings = HashedNgramEmbeddings(dim=128, svd_components=8, svd_path=str(tmp_path / "svd.npz"))
+    assert embeddings.needs_fit
+    with pytest.raises(ValueError):
+        embeddings.embed_query("회의")
+
+    embeddings.fit_svd(texts)
+    vector = embeddings.embed_query("회의실 3층 주간 회의")
+    assert len(vector) == 8
+    reloaded = HashedNgramEmbeddings(dim=128, svd_components=8, svd_path=str(tmp_path / "svd.npz"))
+    assert not reloaded.needs_fit
+    assert reloaded.embed_query("회의실 3층 주간 회의") == vector
+
+
+def test_store_config_selects_the_same_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BACKEND", "openai")
+    save_config(str(tmp_path), HashedNgramEmbeddings(dim=64, ngram_range=(2, 3)))
+    embeddings = get_embeddings(store_path=str(tmp_path))
+    assert isinstance(embeddings, HashedNgramEmbeddings)
+    assert (embeddings.dim, embeddings.ngram_range) == (64, (2, 3))
+    assert describe(CachedEmbeddings(embeddings, path=str(tmp_path / "cache.bin"))) == embeddings.describe()
+
+    with pytest.raises(ValueError):
+        get_embeddings(backend="word2vec")
@@ -0,0 +1,113 @@
+# embedding_cache.CachedEmbeddings 동작 확인 (python -m pytest test_embedding_cache.py)
+import os
+
+from embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings:
+    model = "counting"
+
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.calls = 0
+
+    def _vector(self, text):
+        return [float(len(text) + i) for i in range(self.dim)]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._vector(text)
+
+
+def test_hit_is_served_from_file_after_restart(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    underlying = CountingEmbeddings()
+    CachedEmbeddings(underlying, path=path).embed_query("회의실 예약")
+
+    cache = CachedEmbeddings(underlying, path=path)
+    assert cache.embed_query("회의실 예약") == underlying._vector("회의실 예약")
+    assert underlying.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_embed_documents_embeds_only_missing_texts(tmp_path):
+    underlying = CountingEmbeddings()
+    cache = CachedEmbeddings(underlying, path=str(tmp_path / "cache.bin"))
+    cache.embed_query("흡연")
+    vectors = cache.embed_documents(["흡연", "외근 미팅", "외근 미팅"])
+    assert vectors == [underlying._vector("흡연"), underlying._vector("외근 미팅"), underlying._vector("외근 미팅")]
+    assert underlying.calls == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_entry_is_dropped_when_full(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = CachedEmbeddings(CountingEmbeddings(), path=path, max_entries=3)
+    for text in ("문장 0", "문장 1", "문장 2"):
+        cache.embed_query(text)
+    cache.embed_query("문장 0")  # 문장 1이 가장 오래 사용하지 않은 항목이 됨
+    cache.embed_query("문장 3")
+    assert cache.stats()["size"] <= 3
+
+    reloaded = CachedEmbeddings(CountingEmbeddings(), path=path, max_entries=3)
+    reloaded.embed_query("문장 0")
+    reloaded.embed_query("문장 1")
+    assert reloaded.stats()["hits"] == 1
+    assert reloaded.stats()["misses"] == 1
+
+
+def test_compaction_keeps_low_water_mark_and_resumes_appending(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = CachedEmbeddings(CountingEmbeddings(), path=path, max_entries=10)
+    for i in range(10):
+        cache.embed_query(f"문장 {i}")
+    full_size = os.path.getsize(path)
+
+    cache.embed_query("문장 10")  # max_entries 초과 -> low_water(9)개로 다시 씀
+    assert cache.stats()["size"] == 9
+    compacted_size = os.path.getsize(path)
+    assert compacted_size < full_size
+
+    cache.embed_query("문장 11")  # 여유가 생겼으므로 파일 끝에 추가만 함
+    assert cache.stats()["size"] == 10
+    assert os.path.getsize(path) > compacted_size
+
+    # 가장 오래된 항목이 먼저 빠짐
+    reloaded = CachedEmbeddings(CountingEmbeddings(), path=path, max_entries=10)
+    assert reloaded.stats()["size"] == 10
+    reloaded.embed_query("문장 0")
+    assert reloaded.stats()["misses"] == 1
+
+
+def test_oversized_file_is_compacted_once_on_load(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = CachedEmbeddings(CountingEmbeddings(), path=path, max_entries=100)
+    cache.embed_documents([f"문장 {i}" for i in range(50)])
+
+    reloaded = CachedEmbeddings(CountingEmbeddings(), path=path, max_entries=20)
+    assert reloaded.stats()["size"] == 18
+    size = os.path.getsize(path)
+    CachedEmbeddings(CountingEmbeddings(), path=path, max_entries=20)
+    assert os.path.getsize(path) == size
+
+
+def test_dimension_change_starts_a_new_file(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    CachedEmbeddings(CountingEmbeddings(dim=4), path=path).embed_query("출장")
+
+    # 차원을 미리 알면 불러올 때 버림
+    cache = CachedEmbeddings(CountingEmbeddings(dim=8), path=path, dim=8)
+    assert cache.stats()["size"] == 0
+    assert len(cache.embed_query("출장")) == 8
+
+    # 모르면 첫 임베딩 결과의 차원으로 확인
+    cache = CachedEmbeddings(CountingEmbeddings(dim=3), path=path)
+    assert len(cache.embed_query("외근")) == 3
+    assert cache.stats()["size"] == 1
+    reloaded = CachedEmbeddings(CountingEmbeddings(dim=3), path=path)
+    assert reloaded.embed_query("외근") == [2.0, 3.0, 4.0]
+    assert reloaded.stats()["hits"] == 1
@@ -0,0 +1,113 @@
+# lambda_main warm 컨테이너 상태 재사용 확인 (python -m pytest test_lambda_runtime.py)
+# S3는 가짜 클라이언트로 대체하고, 벡터 스토어는 hashed 임베딩으로 임시 폴더에 만든다.
+import hashlib
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+from langchain_community.vectorstores import FAISS
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aws_lambda")
+sys.path.insert(0, LAMBDA_DIR)
+
+import lambda_main  # noqa: E402
+from embedding_backends import HashedNgramEmbeddings, save_config  # noqa: E402
+
+# 모듈 import 시점에 올라오면 안 되는 패키지 (처음 사용할 때 import)
+HEAVY_MODULES = [
+    "boto3", "faiss", "joblib", "langchain_community", "langchain_core", "langchain_openai", "numpy", "pandas",
+    "selenium", "sklearn",
+]
+
+
+def build_store(path, texts):
+    embeddings = HashedNgramEmbeddings(dim=32)
+    FAISS.from_texts(texts, embeddings).save_local(path)
+    save_config(path, embeddings)
+
+
+# 새 프로세스에서 lambda_main만 import 했을 때 올라온 무거운 패키지
+def test_import_does_not_load_heavy_packages():
+    code = (
+        "import sys, lambda_main; "
+        f"print(sorted({{name.split('.')[0] for name in sys.modules}} & set({HEAVY_MODULES!r})))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=LAMBDA_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+# get_object에 IfNoneMatch가 현재 ETag와 같으면 304를 돌려주는 가짜 S3
+class FakeS3:
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.body = None
+        self.etag = None
+        self.downloads = 0
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        if self.body is None:
+            raise self.exceptions.NoSuchKey()
+        if IfNoneMatch == self.etag:
+            from botocore.exceptions import ClientError
+            raise ClientError({"Error": {"Code": "304"}}, "GetObject")
+        self.downloads += 1
+        return {"Body": io.BytesIO(self.body.encode("utf-8")), "ETag": self.etag}
+
+    def put_object(self, Bucket, Key, Body):
+        self.body = Body
+        self.etag = '"%s"' % hashlib.md5(Body.encode("utf-8")).hexdigest()
+        return {"ETag": self.etag}
+
+
+def test_index_is_reloaded_only_when_files_change(tmp_path):
+    path = str(tmp_path / "vectorstore")
+    build_store(path, ["3층 회의실 주간 회의", "고객사 외근"])
+    runtime = lambda_main.LambdaRuntime(path)
+
+    first = runtime.health_check()
+    assert first["status"] == "ok"
+    assert first["index_reloaded"] and first["documents"] == 2
+    assert runtime.health_check()["index_reloaded"] is False
+
+    build_store(path, ["3층 회의실 주간 회의", "고객사 외근", "흡연"])
+    report = runtime.health_check()
+    assert report["index_reloaded"] and report["documents"] == 3
+    assert report["index_version"] != first["index_version"]
+
+
+def test_missing_index_reports_error_and_recovers(tmp_path):
+    path = str(tmp_path / "vectorstore")
+    runtime = lambda_main.LambdaRuntime(path)
+    assert runtime.health_check()["status"] == "error"
+
+    build_store(path, ["3층 회의실 주간 회의"])
+    report = runtime.health_check()
+    assert report["status"] == "ok" and report["index_reloaded"]
+
+
+def test_results_are_downloaded_only_when_etag_changes(monkeypatch, tmp_path):
+    boto3 = pytest.importorskip("boto3")
+    s3 = FakeS3()
+    monkeypatch.setattr(boto3, "client", lambda name: s3)
+    runtime = lambda_main.LambdaRuntime(str(tmp_path / "vectorstore"))
+
+    empty = runtime.load_results()  # 파일이 없으면 빈 CSV를 만든다
+    assert list(empty.columns) == lambda_main.RESULT_COLUMNS
+    assert s3.body is not None
+
+    empty.loc[0] = [1, "(업무)기타업무", "거래처 자료 전달", "승인", "", "2026-01-01 09:00:00"]
+    runtime.save_results(empty)
+    again = runtime.load_results()  # 저장한 ETag 그대로라서 받지 않음
+    assert s3.downloads == 0
+    assert len(again) == 1 and again["요청사유"][0] == "거래처 자료 전달"
+
+    s3.body += "2,(업무)기타업무,다른 업무,승인,,2026-01-01 10:00:00\n"
+    s3.etag = '"changed"'
+    changed = runtime.load_results()
+    assert s3.downloads == 1
+    assert len(changed) == 2
@@ -0,0 +1,237 @@
+# make_vector 증분 업데이트(manifest 비교), 엑셀 행 문서 변환, 병렬 파싱, 카테고리별 인덱스, mmap 형식/ANN 인덱스 갱신, 임베딩 설정 변경 확인 (python -m pytest test_make_vector.py)
+# 네트워크 없이 hashed 임베딩으로 인덱스를 만든다.
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# make_vector가 import하는 패키지가 없으면 건너뜀
+for module in ("langchain_openai", "langchain.document_loaders", "docx"):
+    pytest.importorskip(module)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "langchain"))
+import make_vector  # noqa: E402
+from embedding_backends import HashedNgramEmbeddings, get_embeddings  # noqa: E402
+import mmap_store  # noqa: E402
+from retrieval import PARTITIONS_DIR, PartitionedVectorStore  # noqa: E402
+
+
+# HashedNgramEmbeddings가 임베딩한 문장 기록
+@pytest.fixture(autouse=True)
+def embedded(monkeypatch):
+    texts = []
+    embed_documents = HashedNgramEmbeddings.embed_documents
+
+    def recording(self, batch):
+        texts.extend(batch)
+        return embed_documents(self, batch)
+
+    monkeypatch.setattr(HashedNgramEmbeddings, "embed_documents", recording)
+    return texts
+
+
+def write(folder, name, text):
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def build(folder, output, **kwargs):
+    kwargs.setdefault("embedding_backend", "hashed")
+    kwargs.setdefault("embedding_dim", 64)
+    return make_vector.create_vectorstore_local(str(folder), str(output), **kwargs)
+
+
+def contents(vectorstore):
+    return sorted(document.page_content for document in vectorstore.docstore._dict.values())
+
+
+def test_only_changed_files_are_reembedded(tmp_path, embedded):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    write(folder, "b.txt", "외근 신청서 작성 방법")
+    build(folder, output)
+    manifest = make_vector.load_manifest(str(output))
+    assert sorted(manifest["files"]) == ["a.txt", "b.txt"]
+    kept_ids = manifest["files"]["a.txt"]["ids"]
+
+    embedded.clear()
+    write(folder, "b.txt", "외근 신청서는 AUTON 문서번호 필요")
+    write(folder, "c.txt", "흡연은 개인시간으로 신청")
+    vectorstore = build(folder, output)
+    manifest = make_vector.load_manifest(str(output))
+
+    assert sorted(embedded) == sorted(["외근 신청서는 AUTON 문서번호 필요", "흡연은 개인시간으로 신청"])
+    assert manifest["files"]["a.txt"]["ids"] == kept_ids  # 바뀌지 않은 파일은 그대로
+    assert contents(vectorstore) == sorted(["회의실 예약 규정", "외근 신청서는 AUTON 문서번호 필요", "흡연은 개인시간으로 신청"])
+    assert vectorstore.index.ntotal == 3
+
+
+def test_unchanged_folder_embeds_nothing(tmp_path, embedded):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    build(folder, output)
+
+    embedded.clear()
+    build(folder, output)
+    assert embedded == []
+
+
+def test_removed_file_vectors_are_deleted(tmp_path):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    write(folder, "b.txt", "외근 신청서 작성 방법")
+    build(folder, output)
+
+    os.remove(folder / "b.txt")
+    vectorstore = build(folder, output)
+    assert contents(vectorstore) == ["회의실 예약 규정"]
+    assert sorted(make_vector.load_manifest(str(output))["files"]) == ["a.txt"]
+
+
+def test_rebuild_ignores_manifest(tmp_path):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    build(folder, output)
+    old_ids = make_vector.load_manifest(str(output))["files"]["a.txt"]["ids"]
+
+    vectorstore = build(folder, output, rebuild=True)
+    assert make_vector.load_manifest(str(output))["files"]["a.txt"]["ids"] != old_ids
+    assert contents(vectorstore) == ["회의실 예약 규정"]
+
+
+
+def test_embedding_change_forces_full_rebuild(tmp_path):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    build(folder, output)
+    old_ids = make_vector.load_manifest(str(output))["files"]["a.txt"]["ids"]
+
+    vectorstore = build(folder, output, embedding_dim=128)
+    manifest = make_vector.load_manifest(str(output))
+    assert manifest["embedding"]["dim"] == 128
+    assert manifest["files"]["a.txt"]["ids"] != old_ids
+    assert vectorstore.index.d == 128
+
+    # 백엔드를 지정하지 않으면 embedding.json의 설정을 그대로 사용
+    vectorstore = make_vector.create_vectorstore_local(str(folder), str(output))
+    assert make_vector.load_manifest(str(output))["files"]["a.txt"]["ids"] == manifest["files"]["a.txt"]["ids"]
+
+def test_request_sheet_becomes_one_document_per_row(tmp_path):
+    path = str(tmp_path / "requests.xlsx")
+    pd.DataFrame({
+        "요청": ["요청 / (업무)회의", "요청 / (비업무)개인시간_흡연 등", "요청 / (업무)회의", "연차"],
+        "요청 사유": ["3층 로지 주간 회의", "흡연", None, "가족 행사"],
+        "상태": ["승인", "승인", "거절", "승인"],
+        "승인권자 노트": [None, "", "사유 없음", None],
+    }).to_excel(path, index=False)
+
+    documents = make_vector.load_excel(path)
+    assert len(documents) == 3  # 사유 없는 행 제외
+    meeting, personal, leave = documents
+    assert meeting.page_content == "요청: (업무)회의\n요청 사유: 3층 로지 주간 회의\n상태: 승인"
+    assert meeting.metadata["category"] == "meeting"
+    assert meeting.metadata["row"] == 2
+    assert personal.metadata["category"] == "personal"
+    assert leave.metadata["category"] is None
+    assert leave.metadata["row"] == 5
+
+
+def test_other_sheet_rows_are_joined_per_row(tmp_path):
+    path = str(tmp_path / "policy.xlsx")
+    pd.DataFrame({"항목": ["흡연", "회의"], "기준": ["개인시간", None]}).to_excel(path, index=False)
+    documents = make_vector.load_excel(path)
+    assert [document.page_content for document in documents] == ["흡연 개인시간", "회의 "]
+    assert [document.metadata["row"] for document in documents] == [2, 3]
+
+
+def test_parallel_loading_matches_serial(tmp_path):
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    write(folder, "b.txt", "외근 신청서 작성 방법")
+    pd.DataFrame({"요청": ["(업무)회의"], "요청 사유": ["3층 로지 주간 회의"]}).to_excel(folder / "c.xlsx", index=False)
+    names = ["a.txt", "b.txt", "c.xlsx"]
+
+    serial = make_vector.load_files(str(folder), names, workers=1)
+    parallel = make_vector.load_files(str(folder), names, workers=3)
+    assert list(parallel) == names
+    for name in names:
+        assert [(d.page_content, d.metadata) for d in parallel[name]] == [(d.page_content, d.metadata) for d in serial[name]]
+
+
+def test_broken_file_is_left_out_of_manifest(tmp_path):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    (folder / "broken.xlsx").write_bytes(b"not a workbook")
+
+    vectorstore = build(folder, output, workers=2)
+    assert contents(vectorstore) == ["회의실 예약 규정"]
+    assert sorted(make_vector.load_manifest(str(output))["files"]) == ["a.txt"]  # 다음 실행에서 다시 시도
+
+
+def test_partitions_follow_the_full_index(tmp_path):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "policy.txt", "회의실은 사전 예약")
+    pd.DataFrame({
+        "요청": ["(업무)회의", "(비업무)개인시간_흡연 등"],
+        "요청 사유": ["3층 로지 주간 회의", "흡연"],
+    }).to_excel(folder / "history.xlsx", index=False)
+    build(folder, output, partitioned=True)
+    assert sorted(os.listdir(output / PARTITIONS_DIR)) == ["meeting", "personal", "policy"]
+
+    # 파티션이 있으면 이후 증분 업데이트에서도 함께 갱신
+    write(folder, "policy.txt", "회의실은 전날까지 예약")
+    build(folder, output)
+    store = PartitionedVectorStore.load(str(output), get_embeddings(store_path=str(output)))
+    assert sum(partition.index.ntotal for partition in store.partitions.values()) == store.full.index.ntotal == 3
+    policy = store.partitions["policy"]
+    assert [doc.page_content for doc in policy.docstore._dict.values()] == ["회의실은 전날까지 예약"]
+
+
+def test_mmap_store_is_kept_in_sync(tmp_path):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    build(folder, output, mmap=True)
+    assert mmap_store.is_mmap_store(str(output))
+
+    write(folder, "b.txt", "외근 신청서 작성 방법")
+    build(folder, output)
+    store = mmap_store.MmapVectorStore(str(output))
+    assert sorted(store.document_at(i).page_content for i in range(store.index.ntotal)) == [
+        "외근 신청서 작성 방법", "회의실 예약 규정",
+    ]
+    store.close()
+
+
+def store_index_file(output):
+    with open(os.path.join(output, mmap_store.STORE_FILE), encoding="utf-8") as f:
+        return json.load(f).get("index_file")
+
+
+def test_ann_setting_is_kept_until_flat_is_requested(tmp_path):
+    folder, output = tmp_path / "docs", tmp_path / "store"
+    folder.mkdir()
+    write(folder, "a.txt", "회의실 예약 규정")
+    ann = {"kind": "hnsw", "params": {"m": 8, "ef_construction": 40, "ef_search": 16}, "eval_k": 1, "eval_queries": 5}
+    build(folder, output, ann=ann)
+    assert store_index_file(output) == "index.hnsw.faiss"
+
+    write(folder, "b.txt", "외근 신청서 작성 방법")
+    build(folder, output)  # manifest의 ANN 설정으로 다시 만듦
+    assert store_index_file(output) == "index.hnsw.faiss"
+    store = mmap_store.MmapVectorStore(str(output))
+    assert store.index.ntotal == 2
+    store.close()
+
+    build(folder, output, ann={"kind": "flat", "params": {}, "eval_k": 1, "eval_queries": 5})
+    assert store_index_file(output) is None
+    assert not os.path.exists(output / "index.hnsw.faiss")
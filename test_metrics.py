@@ -0,0 +1,47 @@
+# metrics 히스토그램/카운터 출력 확인 (python -m pytest test_metrics.py)
+import pytest
+
+from metrics import Counter, Histogram, StageTimer, render, timed
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "test", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, stage="model_call")
+    lines = histogram.render()
+    assert 'test_latency_seconds_bucket{stage="model_call",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="model_call",le="1.0"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="model_call",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{stage="model_call"} 4' in lines
+    assert 'test_latency_seconds_sum{stage="model_call"} 6.05' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("test_events_total", "test", ["outcome"])
+    counter.inc(outcome='say "hi"')
+    counter.inc(2, outcome='say "hi"')
+    assert 'test_events_total{outcome="say \\"hi\\""} 3.0' in counter.render()
+
+
+def test_timed_records_duration_and_errors():
+    with timed("test_stage"):
+        pass
+    with pytest.raises(ValueError):
+        with timed("test_stage"):
+            raise ValueError("boom")
+    text = render()
+    assert 'decision_stage_seconds_count{stage="test_stage"} 2' in text
+    assert 'decision_stage_errors_total{stage="test_stage"} 1.0' in text
+
+
+def test_stage_timer_sums_intervals_into_one_observation():
+    timer = StageTimer("test_split_stage")
+    with timer.running():
+        pass
+    with pytest.raises(ValueError):
+        with timer.running():
+            raise ValueError("boom")
+    timer.observe()
+    text = render()
+    assert 'decision_stage_seconds_count{stage="test_split_stage"} 1' in text
+    assert 'decision_stage_errors_total{stage="test_split_stage"} 1.0' in text
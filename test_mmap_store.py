@@ -0,0 +1,152 @@
+# mmap_store 변환/로드 확인 (python -m pytest test_mmap_store.py)
+import json
+import os
+import shutil
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+import mmap_store
+from retrieval import PARTITIONS_DIR, PartitionedVectorStore
+
+TEXTS = ["3층 로지 회의실 주간 회의", "AUTON1234 외근 고객사 미팅", "개인시간 흡연", "기타업무 자료 정리"]
+CATEGORIES = ["meeting", "business_trip", "personal", None]
+
+
+# 글자 빈도 벡터 (네트워크 없이 같은 문장은 항상 같은 벡터)
+class CharEmbeddings(Embeddings):
+    def _vector(self, text):
+        vector = [0.0] * 64
+        for ch in text:
+            vector[ord(ch) % 64] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def build_faiss(texts=TEXTS):
+    return FAISS.from_texts(texts, CharEmbeddings(), metadatas=[{"row": i} for i in range(len(texts))])
+
+
+def test_round_trip_keeps_documents_and_vectors(tmp_path):
+    vectorstore = build_faiss()
+    path = str(tmp_path / "store")
+    info = mmap_store.write_store(vectorstore, path)
+    assert info["count"] == len(TEXTS)
+    assert "index_file" not in info
+
+    store = mmap_store.MmapVectorStore(path)
+    try:
+        for position in range(len(TEXTS)):
+            document = store.document_at(position)
+            original = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+            assert document.page_content == original.page_content
+            assert document.metadata == original.metadata
+            assert document.id == vectorstore.index_to_docstore_id[position]
+        query = np.asarray([vectorstore.embeddings.embed_query(TEXTS[1])], dtype=np.float32)
+        assert store.index.search(query, 1)[1][0][0] == 1
+    finally:
+        store.close()
+
+
+def test_converted_store_searches_like_pickle(tmp_path):
+    embeddings = CharEmbeddings()
+    path = str(tmp_path / "store")
+    metadatas = [{"category": category} for category in CATEGORIES]
+    FAISS.from_texts(TEXTS, embeddings, metadatas=metadatas).save_local(path)
+    FAISS.from_texts(TEXTS[:1], embeddings, metadatas=metadatas[:1]).save_local(os.path.join(path, PARTITIONS_DIR, "meeting"))
+    FAISS.from_texts(TEXTS[3:], embeddings, metadatas=metadatas[3:]).save_local(os.path.join(path, PARTITIONS_DIR, "policy"))
+
+    pickled = PartitionedVectorStore.load(path, embeddings)
+    mmap_store.convert(path, embeddings)
+    assert mmap_store.is_mmap_store(path)
+    assert mmap_store.is_mmap_store(os.path.join(path, PARTITIONS_DIR, "meeting"))
+    mapped = PartitionedVectorStore.load(path, embeddings)
+    assert isinstance(mapped.full, mmap_store.MmapVectorStore)
+
+    for category in ("meeting", "personal", None):
+        expected = pickled.similarity_search("회의실 흡연", category, k=2, fetch_k=4)
+        docs = mapped.similarity_search("회의실 흡연", category, k=2, fetch_k=4)
+        assert [(doc.page_content, doc.metadata) for doc in docs] == [(doc.page_content, doc.metadata) for doc in expected]
+
+
+def test_index_file_selects_the_search_index(tmp_path):
+    path = str(tmp_path / "store")
+    mmap_store.write_store(build_faiss(), path)
+    hnsw = faiss.IndexHNSWFlat(64, 8)
+    hnsw.add(faiss.read_index(os.path.join(path, mmap_store.INDEX_FILE)).reconstruct_n(0, len(TEXTS)))
+    faiss.write_index(hnsw, os.path.join(path, "index.hnsw.faiss"))
+
+    mmap_store.set_index_file(path, "index.hnsw.faiss")
+    store = mmap_store.MmapVectorStore(path)
+    assert isinstance(store.index, faiss.IndexHNSWFlat)
+    store.close()
+
+    mmap_store.set_index_file(path, None)
+    store = mmap_store.MmapVectorStore(path)
+    assert isinstance(store.index, faiss.IndexFlatL2)
+    store.close()
+
+
+def test_rewrite_keeps_ann_index_file_built_from_the_same_content(tmp_path):
+    vectorstore = build_faiss()
+    path = str(tmp_path / "store")
+    mmap_store.write_store(vectorstore, path)
+    shutil.copy(os.path.join(path, mmap_store.INDEX_FILE), os.path.join(path, "index.hnsw.faiss"))
+    mmap_store.set_index_file(path, "index.hnsw.faiss")
+
+    # Docker 빌드처럼 같은 내용으로 다시 변환해도 ANN 지정이 유지됨
+    info = mmap_store.write_store(vectorstore, path)
+    assert info["index_file"] == "index.hnsw.faiss"
+    with open(os.path.join(path, mmap_store.STORE_FILE), encoding="utf-8") as f:
+        stored = json.load(f)
+    assert stored["index_file"] == "index.hnsw.faiss"
+    assert stored["index_checksum"] == stored["checksum"]
+
+
+def test_rewrite_drops_ann_index_file_when_content_changes(tmp_path):
+    path = str(tmp_path / "store")
+    mmap_store.write_store(build_faiss(), path)
+    shutil.copy(os.path.join(path, mmap_store.INDEX_FILE), os.path.join(path, "index.hnsw.faiss"))
+    mmap_store.set_index_file(path, "index.hnsw.faiss")
+
+    # 문서 수와 차원은 같고 내용만 바뀐 경우
+    info = mmap_store.write_store(build_faiss(TEXTS[:-1] + ["출장 이동 보고"]), path)
+    assert "index_file" not in info
+    store = mmap_store.MmapVectorStore(path)
+    assert isinstance(store.index, faiss.IndexFlatL2)
+    assert store.document_at(len(TEXTS) - 1).page_content == "출장 이동 보고"
+    store.close()
+
+
+def test_rewrite_drops_ann_index_file_with_different_count(tmp_path):
+    path = str(tmp_path / "store")
+    mmap_store.write_store(build_faiss(), path)
+    faiss.write_index(faiss.IndexFlatL2(64), os.path.join(path, "index.hnsw.faiss"))
+    mmap_store.set_index_file(path, "index.hnsw.faiss")
+
+    info = mmap_store.write_store(build_faiss(TEXTS + ["출장 이동"]), path)
+    assert "index_file" not in info
+    store = mmap_store.MmapVectorStore(path)
+    assert store.index.ntotal == len(TEXTS) + 1
+    store.close()
+
+
+def test_ann_index_file_without_checksum_is_dropped(tmp_path):
+    vectorstore = build_faiss()
+    path = str(tmp_path / "store")
+    mmap_store.write_store(vectorstore, path)
+    shutil.copy(os.path.join(path, mmap_store.INDEX_FILE), os.path.join(path, "index.hnsw.faiss"))
+    with open(os.path.join(path, mmap_store.STORE_FILE), encoding="utf-8") as f:
+        info = json.load(f)
+    info["index_file"] = "index.hnsw.faiss"  # checksum 기록 전에 만든 store.json
+    with open(os.path.join(path, mmap_store.STORE_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f)
+
+    assert "index_file" not in mmap_store.write_store(vectorstore, path)
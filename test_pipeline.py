@@ -0,0 +1,90 @@
+# aws_lambda/pipeline.py 판단 파이프라인 확인 (python -m pytest test_pipeline.py)
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "aws_lambda"))
+
+from pipeline import DecisionPipeline  # noqa: E402
+
+
+# 동시에 실행 중인 판단 수를 세는 가짜 판단 함수
+def slow_decide(delay=0.05):
+    active = [0, 0]  # 현재 동시 실행 수, 최대 동시 실행 수
+    lock = threading.Lock()
+
+    def decide(request_type, request_reason):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        try:
+            time.sleep(delay)
+            if "실패" in request_reason:
+                raise RuntimeError("model down")
+            return f"승인:{request_reason}"
+        finally:
+            with lock:
+                active[0] -= 1
+
+    return decide, active
+
+
+def test_all_submitted_rows_come_back_with_their_key():
+    decide, _ = slow_decide()
+    pipeline = DecisionPipeline(decide, workers=3)
+    for row_id in range(5):
+        pipeline.submit(row_id, "(업무)기타업무", f"요청 {row_id}")
+    results = []
+    while pipeline.pending:
+        results.extend(pipeline.completed(block=True))
+    pipeline.close()
+
+    assert sorted(key for key, _, _ in results) == [0, 1, 2, 3, 4]
+    assert all(result == f"승인:요청 {key}" and error is None for key, result, error in results)
+    assert pipeline.report()["decided"] == 5
+
+
+def test_failed_decision_is_reported_per_row():
+    decide, _ = slow_decide(delay=0)
+    pipeline = DecisionPipeline(decide, workers=2)
+    pipeline.submit("ok", "(업무)기타업무", "정상 요청")
+    pipeline.submit("bad", "(업무)기타업무", "실패 요청")
+    results = {}
+    while pipeline.pending:
+        results.update((key, (result, error)) for key, result, error in pipeline.completed(block=True))
+    pipeline.close()
+
+    assert results["ok"] == ("승인:정상 요청", None)
+    assert results["bad"][0] is None and isinstance(results["bad"][1], RuntimeError)
+    report = pipeline.report()
+    assert (report["submitted"], report["decided"], report["failed"]) == (2, 1, 1)
+
+
+def test_workers_overlap_and_pending_is_bounded():
+    decide, active = slow_decide(delay=0.1)
+    pipeline = DecisionPipeline(decide, workers=4, max_pending=4)
+    start = time.perf_counter()
+    for row_id in range(4):
+        assert not pipeline.full
+        pipeline.submit(row_id, "(업무)기타업무", f"요청 {row_id}")
+    assert pipeline.full
+    while pipeline.pending:
+        pipeline.completed(block=True)
+    pipeline.close()
+
+    assert active[1] == 4
+    assert time.perf_counter() - start < 0.35  # 순차 실행이면 0.4초 이상
+    assert pipeline.report()["stage_seconds"]["decide"] >= 0.4
+
+
+def test_stage_time_is_recorded_even_on_error():
+    pipeline = DecisionPipeline(lambda *args: None, workers=1)
+    try:
+        with pipeline.stage("scrape"):
+            time.sleep(0.02)
+            raise ValueError("row disappeared")
+    except ValueError:
+        pass
+    pipeline.close()
+    assert pipeline.stage_seconds["scrape"] >= 0.02
@@ -0,0 +1,72 @@
+# prompt_registry 카테고리별 프롬프트 선택 확인 (python -m pytest test_prompt_registry.py)
+import sys
+import types
+
+import prompt_registry
+from prompt_registry import ALL, CHAT_SECTIONS, PromptRegistry, chat_registry, count_tokens, rag_registry
+from rule_engine import RuleEngine
+
+
+def registry():
+    return chat_registry(RuleEngine.from_file())
+
+
+def test_selects_only_the_matching_category():
+    prompts = registry()
+    key, prompt = prompts.select("(업무)회의 (휴게 X)")
+    assert key == "meeting"
+    assert CHAT_SECTIONS["meeting"] in prompt
+    assert CHAT_SECTIONS["personal"] not in prompt
+    assert count_tokens(prompt) < count_tokens(prompts.templates[ALL])
+
+
+def test_unknown_type_uses_all_rules():
+    key, prompt = registry().select("연차")
+    assert key == ALL
+    assert all(section in prompt for section in CHAT_SECTIONS.values())
+
+
+def test_rag_prompt_keeps_template_fields():
+    _, prompt = rag_registry(RuleEngine.from_file()).select("(업무)출장,이동,외근")
+    for field in ("{context}", "{request_type}", "{request_reason}"):
+        assert field in prompt
+
+
+def test_fingerprint_changes_with_prompt_text():
+    rules = RuleEngine.from_file()
+    base = PromptRegistry(rules, "머리말\n", {"meeting": "회의 규칙\n"}, "맺음말\n")
+    same = PromptRegistry(rules, "머리말\n", {"meeting": "회의 규칙\n"}, "맺음말\n")
+    changed = PromptRegistry(rules, "머리말\n", {"meeting": "회의 규칙 변경\n"}, "맺음말\n")
+    assert base.fingerprint() == same.fingerprint()
+    assert base.fingerprint() != changed.fingerprint()
+    assert set(base.token_counts()) == {"meeting", ALL}
+
+
+# get_encoding 호출 수를 세는 가짜 tiktoken (fail이면 BPE 파일을 받을 수 없는 경우)
+def fake_tiktoken(monkeypatch, fail=False):
+    calls = []
+
+    def get_encoding(name):
+        calls.append(name)
+        if fail:
+            raise OSError("network unreachable")
+        return types.SimpleNamespace(encode=lambda text: text.split())
+
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding))
+    monkeypatch.setattr(prompt_registry, "_encoding", None)
+    return calls
+
+
+def test_encoding_is_loaded_once_on_first_count(monkeypatch):
+    calls = fake_tiktoken(monkeypatch)
+    assert calls == []
+    assert count_tokens("3층 로지 주간 회의") == 4
+    assert count_tokens("흡연") == 1
+    assert calls == ["cl100k_base"]
+
+
+def test_unavailable_encoding_falls_back_to_estimate(monkeypatch):
+    calls = fake_tiktoken(monkeypatch, fail=True)
+    assert count_tokens("abcd회의") == 3
+    assert count_tokens("abcd회의") == 3
+    assert calls == ["cl100k_base"]  # 실패한 뒤에는 다시 시도하지 않음
@@ -0,0 +1,133 @@
+# retrieval 일괄 검색 / metadata 필터 / 카테고리별 인덱스 확인 (python -m pytest test_retrieval.py)
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from retrieval import (
+    POLICY_PARTITION, PartitionedVectorStore, batch_similarity_search, category_filter, filter_documents,
+    metadata_matches,
+)
+
+TEXTS = ["3층 로지 회의실 주간 회의", "AUTON1234 외근 고객사 미팅", "개인시간 흡연", "기타업무 자료 정리"]
+CATEGORIES = ["meeting", "business_trip", "personal", None]
+
+
+# 글자 빈도 벡터 (네트워크 없이 같은 문장은 항상 같은 벡터)
+class CharEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text):
+        vector = [0.0] * 64
+        for ch in text:
+            vector[ord(ch) % 64] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._vector(text)
+
+
+def test_batch_search_matches_single_searches_with_one_embedding_call():
+    embeddings = CharEmbeddings()
+    vectorstore = FAISS.from_texts(TEXTS, embeddings)
+    embeddings.calls = 0
+
+    queries = ["회의실 예약", "외근 미팅", "회의실 예약", ""]
+    results = batch_similarity_search(vectorstore, embeddings, queries, k=2)
+    assert embeddings.calls == 1
+    assert sorted(results) == ["외근 미팅", "회의실 예약"]
+    for query, docs in results.items():
+        expected = vectorstore.similarity_search(query, k=2)
+        assert [doc.page_content for doc in docs] == [doc.page_content for doc in expected]
+
+
+def test_k_larger_than_index_returns_every_document():
+    embeddings = CharEmbeddings()
+    vectorstore = FAISS.from_texts(TEXTS, embeddings)
+    results = batch_similarity_search(vectorstore, embeddings, ["흡연"], k=10)
+    assert sorted(doc.page_content for doc in results["흡연"]) == sorted(TEXTS)
+
+
+def test_empty_queries_skip_embedding():
+    embeddings = CharEmbeddings()
+    vectorstore = FAISS.from_texts(TEXTS, embeddings)
+    embeddings.calls = 0
+    assert batch_similarity_search(vectorstore, embeddings, ["", ""]) == {}
+    assert embeddings.calls == 0
+
+
+def test_metadata_filters():
+    assert metadata_matches({"category": "meeting"}, None)
+    assert metadata_matches({"category": "meeting", "status": "승인"}, {"status": "승인"})
+    assert not metadata_matches({"category": "meeting"}, {"category": ["personal", "other_work"]})
+    meeting = category_filter("meeting")
+    assert meeting({"category": "meeting"}) and meeting({})
+    assert not meeting({"category": "personal"})
+    assert category_filter(None) is None
+
+
+def test_fetch_k_leaves_room_for_category_filter():
+    embeddings = CharEmbeddings()
+    vectorstore = FAISS.from_texts(TEXTS, embeddings, metadatas=[{"category": c} for c in CATEGORIES])
+    query = "3층 로지 회의실 흡연"
+    results = batch_similarity_search(vectorstore, embeddings, [query], k=1, fetch_k=4)
+    assert len(results[query]) == 4
+    docs = filter_documents(results[query], category_filter("personal"), k=2)
+    assert [doc.metadata["category"] for doc in docs] in (["personal", None], [None, "personal"])
+
+
+def partitioned_store(embeddings):
+    metadatas = [{"category": c} for c in CATEGORIES]
+    full = FAISS.from_texts(TEXTS, embeddings, metadatas=metadatas)
+    partitions = {}
+    for text, metadata in zip(TEXTS, metadatas):
+        key = metadata["category"] or POLICY_PARTITION
+        partitions.setdefault(key, ([], []))
+        partitions[key][0].append(text)
+        partitions[key][1].append(metadata)
+    partitions = {key: FAISS.from_texts(texts, embeddings, metadatas=m) for key, (texts, m) in partitions.items()}
+    return PartitionedVectorStore(full, partitions, embeddings)
+
+
+def test_partition_search_uses_category_and_policy_only():
+    store = partitioned_store(CharEmbeddings())
+    docs = store.similarity_search("3층 로지 회의실 흡연", "personal", k=3)
+    assert sorted(doc.metadata["category"] or "" for doc in docs) == ["", "personal"]
+    assert store.stores_for("meeting") == [store.partitions["meeting"], store.partitions[POLICY_PARTITION]]
+
+
+def test_partition_search_matches_filtered_full_search():
+    embeddings = CharEmbeddings()
+    store = partitioned_store(embeddings)
+    unpartitioned = PartitionedVectorStore(store.full, {}, embeddings)
+    for category in ("meeting", "personal", "business_trip", None):
+        expected = unpartitioned.similarity_search("회의실 외근 흡연", category, k=2, fetch_k=4)
+        docs = store.similarity_search("회의실 외근 흡연", category, k=2, fetch_k=4)
+        assert [doc.page_content for doc in docs] == [doc.page_content for doc in expected]
+
+
+def test_partition_batch_search_embeds_once():
+    embeddings = CharEmbeddings()
+    store = partitioned_store(embeddings)
+    embeddings.calls = 0
+    requests = [("meeting", "회의실 예약"), ("personal", "흡연"), ("meeting", "회의실 예약"), ("personal", "")]
+    results = store.batch_similarity_search(requests, k=2)
+    assert embeddings.calls == 1
+    assert sorted(results) == [("meeting", "회의실 예약"), ("personal", "흡연")]
+    for (category, query), docs in results.items():
+        expected = store.similarity_search(query, category, k=2)
+        assert [doc.page_content for doc in docs] == [doc.page_content for doc in expected]
+
+
+def test_scored_results_are_sorted_by_distance():
+    store = partitioned_store(CharEmbeddings())
+    scored = store.similarity_search_with_score("3층 로지 회의실", "meeting", k=2)
+    distances = [distance for _, distance in scored]
+    assert distances == sorted(distances)
+    assert scored[0][0].page_content == TEXTS[0]
+    batch = store.batch_similarity_search([("meeting", "3층 로지 회의실")], k=2, with_score=True)
+    assert batch[("meeting", "3층 로지 회의실")] == scored
@@ -0,0 +1,57 @@
+# aws_lambda/row_extraction.py 행 읽기 확인 (python -m pytest test_row_extraction.py)
+# 스크립트는 브라우저에서만 실행되므로, execute_script 호출과 결과 처리만 가짜 driver로 확인한다.
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "aws_lambda"))
+
+from row_extraction import (  # noqa: E402
+    OPEN_DETAIL_SCRIPT,
+    POPUP_NOTES_SCRIPT,
+    ROWS_SCRIPT,
+    extract_rows,
+    open_detail,
+    popup_notes,
+)
+
+
+# execute_script 호출 (스크립트, 인자)를 기록하고 result를 반환
+class FakeDriver:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append((script, args))
+        return self.result
+
+
+def test_rows_are_read_with_one_script_call():
+    rows = [
+        {"row_id": "101", "detail": "(업무)회의 | 3층 로지 주간 회의", "notes": ["3층 로지 주간 회의 홍길동"]},
+        {"row_id": "102", "detail": "(개인)병원", "notes": []},
+    ]
+    driver = FakeDriver(json.dumps(rows, ensure_ascii=False))
+    assert extract_rows(driver) == rows
+    assert driver.calls == [(ROWS_SCRIPT, ())]
+
+
+def test_empty_table_gives_no_rows():
+    assert extract_rows(FakeDriver(None)) == []
+    assert extract_rows(FakeDriver("[]")) == []
+
+
+def test_open_detail_passes_the_row_id_and_reports_missing_rows():
+    driver = FakeDriver(True)
+    assert open_detail(driver, "101") is True
+    assert driver.calls == [(OPEN_DETAIL_SCRIPT, ("101",))]
+    assert open_detail(FakeDriver(None), "999") is False
+
+
+def test_popup_notes_reads_the_open_popup():
+    popup = object()
+    driver = FakeDriver(["3층 로지 주간 회의 홍길동"])
+    assert popup_notes(driver, popup) == ["3층 로지 주간 회의 홍길동"]
+    assert driver.calls == [(POPUP_NOTES_SCRIPT, (popup,))]
+    assert popup_notes(FakeDriver(None), popup) == []
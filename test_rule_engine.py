@@ -0,0 +1,79 @@
+# rule_engine 규칙 판단 확인 (python -m pytest test_rule_engine.py)
+from rule_engine import RuleEngine
+
+MEETING = "요청 / (업무)회의"
+
+
+def engine():
+    return RuleEngine.from_file()
+
+
+def test_category_matching():
+    rules = engine()
+    assert rules.category_of("(비업무)개인시간_흡연 등") == "personal"
+    assert rules.category_of(MEETING) == "meeting"
+    assert rules.category_of("(업무)출장,이동,외근") == "business_trip"
+    assert rules.category_of("연차") is None
+
+
+def test_personal_time_is_always_approved():
+    decision = engine().decide("(비업무)개인시간_흡연 등", "흡연")
+    assert decision.decision == "승인"
+    assert decision.rule == "personal:always_approve"
+
+
+def test_meeting_needs_room_and_content():
+    rules = engine()
+    assert rules.decide(MEETING, "3층 로지 회의실 주간 업무 회의").decision == "승인"
+    assert rules.decide(MEETING, "자리에서 코드 리뷰").decision == "승인"
+    assert rules.decide(MEETING, "우드룸 디자인 검토").decision == "승인"
+    assert rules.decide(MEETING, "3층 로지") is None  # 장소만 있고 내용 없음
+    assert rules.decide(MEETING, "주간 업무 회의") is None  # 장소 없음
+
+
+def test_generic_meeting_words_are_not_content():
+    rules = engine()
+    for reason in ("3층 회의", "우드 회의", "회의 참석 3층", "회의 자리", "CLOVER 회의실 미팅"):
+        assert rules.decide(MEETING, reason) is None, reason
+
+
+def test_rooms_match_whole_words_only():
+    rules = engine()
+    assert rules.decide(MEETING, "CLOVERFIELD 프로젝트 논의") is None
+    assert rules.decide(MEETING, "13층 프로젝트 논의") is None
+    assert rules.decide(MEETING, "CLOVER 프로젝트 논의").decision == "승인"
+
+
+def test_chat_prompt_also_needs_an_attendee():
+    chat = RuleEngine.from_file(prompt_kind="chat")
+    assert chat.decide(MEETING, "3층 로지 회의실 주간 업무 회의") is None
+    assert chat.decide(MEETING, "흡연 방지 회의, 5층, 김 팀장").decision == "승인"
+    assert chat.decide(MEETING, "5층 김 팀장 회의 참석") is None  # 참석자만 있고 내용 없음
+    rag = RuleEngine.from_file(prompt_kind="rag")
+    assert rag.decide(MEETING, "3층 로지 회의실 주간 업무 회의").decision == "승인"
+
+
+def test_business_trip_needs_document_number():
+    rules = engine()
+    assert rules.decide("(업무)출장,이동,외근", "AUTON1234 고객사 미팅").decision == "승인"
+    assert rules.decide("(업무)출장,이동,외근", "고객사 미팅") is None
+    assert rules.decide("(업무)출장,이동,외근", "AUTON1234") is None
+
+
+def test_other_work_and_empty_reason_are_deferred():
+    rules = engine()
+    assert rules.decide("(업무)기타업무", "자료 정리") is None
+    assert rules.decide(MEETING, "  ") is None
+
+
+def test_evaluate_does_not_count_and_decide_does():
+    rules = engine()
+    assert rules.evaluate(MEETING, "3층 로지 회의실 주간 업무 회의").decision == "승인"
+    assert rules.stats()["total"] == 0
+
+    rules.decide(MEETING, "3층 로지 회의실 주간 업무 회의")
+    rules.decide("(업무)기타업무", "자료 정리")
+    stats = rules.stats()
+    assert stats["total"] == 2
+    assert stats["decided_locally"] == 1
+    assert stats["deferred_to_llm"] == 1
@@ -0,0 +1,110 @@
+# aws_lambda/waits.py 대기 엔진 확인 (python -m pytest test_waits.py)
+# 브라우저 대신 execute_script 결과를 순서대로 돌려주는 가짜 driver를 쓴다.
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from selenium.common.exceptions import TimeoutException  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "aws_lambda"))
+
+from waits import NETWORK_HOOK_SCRIPT, WaitEngine  # noqa: E402
+
+
+# execute_script를 부를 때마다 states의 다음 (진행 중 요청 수, 마지막 요청 후 ms, readyState, 시작된 요청 수)를 반환
+class FakeDriver:
+    def __init__(self, states=()):
+        self.states = list(states)
+        self.scripts = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        if script == NETWORK_HOOK_SCRIPT:
+            return None
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+
+# CDP 명령을 지원하는 Chrome 같은 가짜 driver
+class FakeChromeDriver(FakeDriver):
+    def __init__(self, states=()):
+        super().__init__(states)
+        self.cdp_commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp_commands.append((command, params))
+
+
+def test_until_returns_the_condition_value_and_records_the_wait():
+    engine = WaitEngine(FakeDriver(), timeout=1, poll=0.01)
+    checks = iter([None, False, "팝업"])
+    assert engine.until("popup_open", lambda driver: next(checks)) == "팝업"
+    report = engine.summary()["popup_open"]
+    assert report["count"] == 1 and report["timeouts"] == 0
+    assert report["max"] >= 0.02
+
+
+def test_timeout_raises_unless_optional():
+    engine = WaitEngine(FakeDriver(), timeout=0.05, poll=0.01)
+    with pytest.raises(TimeoutException):
+        engine.until("approve_modal", lambda driver: False)
+    assert engine.until("approve_modal", lambda driver: False, required=False) is None
+    assert engine.summary()["approve_modal"]["timeouts"] == 2
+
+
+def test_network_idle_waits_for_pending_requests_and_quiet_period():
+    driver = FakeDriver([
+        [0, 0, "loading", 0],
+        [1, 0, "complete", 1],
+        [0, 100, "complete", 1],
+        [0, 400, "complete", 1],
+    ])
+    engine = WaitEngine(driver, timeout=1, poll=0.01, idle_ms=300)
+    assert engine.network_idle("filter_apply")
+    assert len(driver.scripts) == 4
+
+
+def test_network_idle_since_waits_for_a_request_started_after_the_click():
+    driver = FakeDriver([
+        [0, 5000, "complete", 3],  # request_count() (클릭 전)
+        [0, 5000, "complete", 3],  # 클릭 직후, 필터 요청이 아직 시작되지 않음
+        [1, 0, "complete", 4],
+        [0, 400, "complete", 4],
+    ])
+    engine = WaitEngine(driver, timeout=1, poll=0.01, idle_ms=300)
+    before = engine.request_count()
+    assert before == 3
+    assert engine.network_idle("filter_apply", since=before)
+    assert len(driver.scripts) == 4
+
+
+def test_hook_is_registered_for_new_documents_once_when_cdp_is_available():
+    driver = FakeChromeDriver()
+    engine = WaitEngine(driver)
+    engine.install_network_hook()
+    engine.install_network_hook()
+    assert driver.cdp_commands == [("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_HOOK_SCRIPT})]
+    assert driver.scripts == [NETWORK_HOOK_SCRIPT] * 2
+
+    plain = FakeDriver()
+    WaitEngine(plain).install_network_hook()
+    assert plain.scripts == [NETWORK_HOOK_SCRIPT]
+
+
+def test_network_idle_timeout_does_not_raise():
+    engine = WaitEngine(FakeDriver([[2, 0, "complete", 2]]), timeout=0.05, poll=0.01)
+    assert engine.network_idle("approve") is None
+    assert engine.summary()["approve"]["timeouts"] == 1
+
+
+def test_summary_reports_percentiles_per_step():
+    engine = WaitEngine(FakeDriver())
+    engine.durations["login"] = [0.1 * i for i in range(1, 21)]
+    report = engine.summary()["login"]
+    assert report["count"] == 20
+    assert report["p50"] == pytest.approx(1.1)
+    assert report["p95"] == pytest.approx(1.9)
+    assert report["max"] == pytest.approx(2.0)
+    assert engine.total_seconds() == pytest.approx(21.0)